@@ -0,0 +1,30 @@
+"""Add id_allocations table for block-allocated order numbers
+
+Revision ID: 5e07b1c9d2a4
+Revises: a3c9d7e41f20
+Create Date: 2026-10-18 11:34:07.552190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e07b1c9d2a4'
+down_revision = 'a3c9d7e41f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    id_allocations = op.create_table('id_allocations',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('next_value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # 36 ** 7, i.e. order number "10000000" plus its check digit
+    op.bulk_insert(id_allocations, [{'name': 'order_number', 'next_value': 78364164096}])
+
+
+def downgrade() -> None:
+    op.drop_table('id_allocations')
@@ -0,0 +1,40 @@
+"""Add composite and expression indexes for hot read paths
+
+Revision ID: a3c9d7e41f20
+Revises: ef3810298a86
+Create Date: 2026-10-18 10:02:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9d7e41f20'
+down_revision = 'ef3810298a86'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_messages_conversation_id_created_at_id', 'messages', ['conversation_id', 'created_at', 'id']),
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id']),
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at']),
+    ('ix_order_items_order_id_id', 'order_items', ['order_id', 'id']),
+    ('ix_products_updated_at', 'products', ['updated_at']),
+    ('ix_products_name_lower', 'products', [sa.text('lower(name)')]),
+]
+
+
+def upgrade() -> None:
+    # Build concurrently on PostgreSQL so live tables aren't locked against writes;
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,26 @@
+"""Add (category, id) index for catalog API pages
+
+Revision ID: c8f2a6d4e913
+Revises: 5e07b1c9d2a4
+Create Date: 2026-10-18 11:40:12.502871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f2a6d4e913'
+down_revision = '5e07b1c9d2a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_category_id', 'products', ['category', 'id'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_category_id', table_name='products', postgresql_concurrently=True)
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import chat
+from app.api.api_v1.endpoints import chat, metrics, products
 
 api_router = APIRouter()
 
-api_router.include_router(chat.router, prefix="/chat", tags=["chat"]) 
\ No newline at end of file
+api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(products.router, prefix="/products", tags=["products"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
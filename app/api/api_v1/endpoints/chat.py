@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from app.core.config import settings
 from app.db.base import get_db
 from app.services.ai_service import AIService
+from app.services.history_cache import history_cache
 from app.schemas.chat import MessageCreate, MessageResponse, ConversationResponse
 from app.db.models import Conversation, Message, User
+from app.utils.deadlines import deadline_in
+from app.utils.pagination import decode_cursor, encode_cursor
 from datetime import datetime
+import json
 
 router = APIRouter()
 ai_service = AIService()
@@ -13,26 +20,34 @@ ai_service = AIService()
 @router.post("/conversations/", response_model=ConversationResponse)
 async def create_conversation(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new conversation"""
     conversation = Conversation(user_id=user_id)
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation, attribute_names=["id", "created_at", "updated_at", "messages"])
     return conversation
 
 @router.post("/conversations/{conversation_id}/messages/", response_model=MessageResponse)
 async def create_message(
     conversation_id: int,
     message: MessageCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Send a message in a conversation"""
-    # Get conversation history
-    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
+    deadline = deadline_in(settings.CHAT_REQUEST_TIMEOUT_SECONDS)
+    
+    # Cached conversations are known to exist; others are checked once
+    if not history_cache.contains(conversation_id):
+        exists = (await db.execute(
+            select(Conversation.id).filter(Conversation.id == conversation_id)
+        )).scalar()
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    # Get conversation history for context, from memory after the first turn
+    history_dict = await history_cache.get_window(db, conversation_id)
     
     # Save user message
     user_message = Message(
@@ -42,21 +57,8 @@ async def create_message(
     )
     db.add(user_message)
     
-    # Get conversation history for context
-    history = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at.desc()).limit(10).all()
-    
-    history_dict = [
-        {
-            "content": msg.content,
-            "is_from_user": msg.is_from_user
-        }
-        for msg in reversed(history)
-    ]
-    
     # Get AI response
-    ai_response = await ai_service.process_message(message.content, history_dict)
+    ai_response = await ai_service.process_message(message.content, history_dict, deadline)
     
     # Save AI response
     ai_message = Message(
@@ -67,20 +69,84 @@ async def create_message(
     db.add(ai_message)
     
     # Update conversation timestamp
-    conversation.updated_at = datetime.utcnow()
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(updated_at=datetime.utcnow())
+    )
     
-    db.commit()
-    db.refresh(ai_message)
+    await db.commit()
+    
+    # Only committed turns go into the cached window
+    history_cache.append(conversation_id, user_message.content, True)
+    history_cache.append(conversation_id, ai_message.content, False)
     
     return ai_message
 
 @router.get("/conversations/{conversation_id}/messages/", response_model=List[MessageResponse])
 async def get_conversation_messages(
     conversation_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=settings.TRANSCRIPT_MAX_PAGE_SIZE),
+    stream: bool = Query(False, description="Stream every message after the cursor as NDJSON"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all messages in a conversation"""
-    messages = db.query(Message).filter(
+    """
+    Get the messages in a conversation, oldest first
+    
+    Pages are keyset-paginated on (created_at, id); when more messages
+    remain, the X-Next-Cursor header holds the cursor for the next page.
+    With stream=true the rest of the transcript is streamed as NDJSON,
+    read from the database in chunks through a server-side cursor.
+    """
+    cursor = None
+    if after:
+        try:
+            cursor = decode_cursor(after, datetime, int)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    query = transcript_query(conversation_id, cursor)
+    
+    if stream:
+        return StreamingResponse(
+            _stream_transcript(db, query),
+            media_type="application/x-ndjson"
+        )
+    
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    return [MessageResponse.model_validate(row, from_attributes=True) for row in rows]
+
+def transcript_query(conversation_id: int, after: Optional[Tuple[datetime, int]] = None):
+    """Messages of a conversation in keyset order, starting after the (created_at, id) position"""
+    query = select(
+        Message.id,
+        Message.conversation_id,
+        Message.content,
+        Message.is_from_user,
+        Message.created_at
+    ).filter(
         Message.conversation_id == conversation_id
-    ).order_by(Message.created_at.asc()).all()
-    return messages 
\ No newline at end of file
+    ).order_by(Message.created_at.asc(), Message.id.asc())
+    if after is not None:
+        query = query.filter(tuple_(Message.created_at, Message.id) > tuple_(*after))
+    return query
+
+async def _stream_transcript(db: AsyncSession, query):
+    """Yield NDJSON lines for every row of the query, one chunk of rows at a time"""
+    result = await db.stream(query.execution_options(yield_per=settings.TRANSCRIPT_STREAM_CHUNK_SIZE))
+    async for rows in result.partitions():
+        yield "".join(
+            json.dumps({
+                "id": row.id,
+                "conversation_id": row.conversation_id,
+                "content": row.content,
+                "is_from_user": row.is_from_user,
+                "created_at": row.created_at.isoformat() if row.created_at else None
+            }) + "\n"
+            for row in rows
+        )
@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from typing import Dict
+from app.db.session import get_pool_stats
+from app.services.catalog_index import catalog_index
+from app.services.history_cache import history_cache
+from app.services.intent_router import intent_router
+from app.services.inventory import inventory
+from app.services.order_numbers import order_numbers
+from app.services.prefetch import prefetcher
+from app.services.ai_service import prompt_builder
+from app.utils.gemini_utils import gemini_hedger, gemini_limiter, model_registry, replay_store, reply_parser, token_usage
+from app.utils.response_cache import response_cache
+from app.utils.single_flight import single_flight
+
+router = APIRouter()
+
+@router.get("/")
+async def get_metrics() -> Dict:
+    """Get runtime statistics for the agent's shared components"""
+    return {
+        "gemini_models": model_registry.stats(),
+        "gemini_limiter": gemini_limiter.stats(),
+        "gemini_hedging": gemini_hedger.stats(),
+        "gemini_replay": replay_store.stats(),
+        "gemini_parsing": reply_parser.stats(),
+        "gemini_tokens": token_usage.stats(),
+        "prompt_builder": prompt_builder.stats(),
+        "response_cache": response_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "intent_router": intent_router.stats(),
+        "database_pool": get_pool_stats(),
+        "catalog_index": catalog_index.stats(),
+        "history_cache": history_cache.stats(),
+        "inventory": inventory.stats(),
+        "order_numbers": order_numbers.stats(),
+        "prefetch": prefetcher.stats(),
+    }
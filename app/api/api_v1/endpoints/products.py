@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.config import settings
+from app.db.base import get_db
+from app.db.models import Product
+from app.schemas.product import ProductResponse
+from app.services.catalog_index import catalog_index
+from app.utils.http_cache import cache_control, etag_matches, make_etag, not_modified
+from app.utils.pagination import decode_cursor, encode_cursor
+
+router = APIRouter()
+
+def _cache_control() -> str:
+    return cache_control(
+        settings.PRODUCTS_CACHE_MAX_AGE_SECONDS,
+        stale_while_revalidate=settings.PRODUCTS_STALE_WHILE_REVALIDATE_SECONDS,
+    )
+
+@router.get("/", response_model=List[ProductResponse])
+async def list_products(
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor by the previous page"),
+    limit: int = Query(50, ge=1, le=settings.PRODUCTS_MAX_PAGE_SIZE),
+    category: Optional[str] = Query(None, description="Only products in this category"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List products in id order
+
+    Pages are keyset-paginated on id; when more products remain, the
+    X-Next-Cursor header holds the cursor for the next page. The ETag
+    covers the id and updated_at of every product on the page, so a
+    client or CDN revalidating an unchanged page gets a 304.
+    """
+    after_id = None
+    if after:
+        try:
+            (after_id,) = decode_cursor(after, int)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    products = (await db.execute(products_query(category, after_id).limit(limit + 1))).scalars().all()
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(products[-1].id)
+
+    etag = make_etag(next_cursor, *(value for product in products for value in (product.id, product.updated_at)))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, _cache_control())
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _cache_control()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return products
+
+@router.get("/{product_id}", response_model=ProductResponse)
+async def get_product(
+    product_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get one product
+
+    Served from the catalog index once it is loaded, so a lookup, and a
+    revalidation in particular, usually doesn't touch the database.
+    """
+    product = catalog_index.get(product_id) if catalog_index.loaded else None
+    if product is None:
+        product = (await db.execute(select(Product).filter(Product.id == product_id))).scalars().first()
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    etag = make_etag(product.id, product.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, _cache_control())
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _cache_control()
+    return product
+
+def products_query(category: Optional[str] = None, after: Optional[int] = None):
+    """Products in keyset order, starting after the given id; uses ix_products_category_id when filtered"""
+    query = select(Product)
+    if category is not None:
+        query = query.filter(Product.category == category)
+    if after is not None:
+        query = query.filter(Product.id > after)
+    return query.order_by(Product.id)
@@ -1,15 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Optional
 from app.db.session import get_db
 from app.services.ai_service import AIService
-from app.db.models import Product, Order, User, OrderItem
+from app.services.intent_router import intent_router
+from app.services.inventory import inventory, parse_quantity
+from app.services.order_numbers import order_numbers
+from app.services.prefetch import Prefetch, prefetcher
+from app.core.config import settings
+from app.core.security import get_current_user_id
+from app.db.models import Order, OrderItem
+from app.utils.deadlines import deadline_in
 from pydantic import BaseModel
 from datetime import datetime
+import json
+import time
 
 router = APIRouter()
 ai_service = AIService()
 
+# Anonymous chat orders are placed for the demo customer
+DEMO_USER_ID = 1
+
 class ChatRequest(BaseModel):
     message: str
     conversation_history: List[Dict]
@@ -18,18 +31,216 @@ class ChatResponse(BaseModel):
     response: str
     debug_info: Dict
 
+async def resolve_agent_response(
+    message: str,
+    conversation_history: List[Dict],
+    deadline: Optional[float] = None,
+    reads: Optional[Prefetch] = None
+) -> Dict:
+    """
+    Decide the action for a message, asking the LLM only when needed
+    
+    High-confidence intents are resolved by the intent router; everything
+    else goes through AIService.process_message, with the reads the
+    message will likely need started alongside the model call.
+    """
+    if settings.INTENT_ROUTER_ENABLED:
+        routed = intent_router.route(message)
+        if routed is not None:
+            return routed
+    
+    if reads is not None:
+        reads.start()
+    start = time.perf_counter()
+    agent_response = await ai_service.process_message(message, conversation_history, deadline)
+    intent_router.record_llm_latency(time.perf_counter() - start)
+    return agent_response
+
+async def execute_action(
+    agent_response: Dict,
+    db: AsyncSession,
+    reads: Optional[Prefetch] = None,
+    user_id: Optional[int] = None
+) -> Optional[Dict]:
+    """
+    Run the database work for the agent's action_needed on behalf of `user_id`
+    
+    Rewrites agent_response["response"] with the real data where the action
+    succeeds and returns the database_query debug entry (None if no query
+    produced a result). Reads covered by `reads` come from its prefetch.
+    For an authenticated user, order lookups and cancellations only ever
+    see the user's own orders; anonymous requests need the (unguessable)
+    order number.
+    """
+    if reads is None:
+        reads = prefetcher.reads(user_id=user_id)
+    action = agent_response.get("action_needed")
+    action_data = agent_response.get("action_data") or {}
+    database_query = None
+    
+    # Handle different types of queries
+    if action == "Look up product information":
+        product_name = action_data.get("product")
+        if product_name:
+            product = await reads.product(db, product_name)
+            if product:
+                database_query = {
+                    "type": "product_lookup",
+                    "product_name": product_name,
+                    "result": {
+                        "name": product.name,
+                        "price": product.price,
+                        "stock": product.stock,
+                        "description": product.description
+                    }
+                }
+                # Update agent response with actual product data
+                agent_response["response"] = f"The {product.name} is priced at ${product.price} and we have {product.stock} in stock. {product.description}"
+    
+    elif action == "Check order status":
+        # In a real application, you would extract the order number from the message
+        # For demo purposes, we'll just show the most recent order
+        order = await reads.latest_order(db)
+        if order:
+            database_query = {
+                "type": "order_lookup",
+                "order_id": order.id,
+                "result": {
+                    "status": order.status,
+                    "total_amount": order.total_amount,
+                    "items": [item.to_dict() for item in order.items]
+                }
+            }
+            # Update agent response with actual order data
+            agent_response["response"] = f"Your order is currently {order.status}. The total amount is ${order.total_amount}."
+    
+    elif action == "Cancel order":
+        # Extract order number from the message or conversation history
+        order_number = action_data.get("order_number")
+        if order_number:
+            order = await reads.order_status(db, order_number)
+            if order and order.status == "Cancelled":
+                agent_response["response"] = f"Your order {order_number} has already been cancelled."
+            elif order:
+                # Update order status to Cancelled and put its items back in stock
+                cancelled = await inventory.cancel_order(db, order.id, user_id)
+                await db.commit()
+                
+                database_query = {
+                    "type": "order_cancellation",
+                    "order_number": order_number,
+                    "result": {
+                        "status": "Cancelled",
+                        "order_id": order.id
+                    }
+                }
+                
+                if cancelled:
+                    agent_response["response"] = f"Your order {order_number} has been cancelled successfully."
+                else:
+                    agent_response["response"] = f"Your order {order_number} has already been cancelled."
+            else:
+                agent_response["response"] = f"I couldn't find an order with the number {order_number}. Please check and try again."
+        else:
+            agent_response["response"] = "I need the order number to cancel your order. Please provide it."
+    
+    elif action == "Place order":
+        # Extract order details from the message or conversation history
+        product_name = action_data.get("product")
+        quantity = parse_quantity(action_data.get("quantity", 1))
+        shipping_address = action_data.get("shipping_address")
+        payment_method = action_data.get("payment_method", "Credit Card")
+        
+        if product_name and shipping_address and quantity is None:
+            agent_response["response"] = "How many would you like to order? Please give a whole number."
+        elif product_name and shipping_address:
+            product = await reads.product(db, product_name)
+            if product:
+                # Allocate the order number before this transaction writes anything
+                order_number = await order_numbers.next(db.bind)
+                
+                # Create new order; the total comes from the reserved price
+                new_order = Order(
+                    user_id=user_id if user_id is not None else DEMO_USER_ID,
+                    order_number=order_number,
+                    status="Pending",
+                    payment_method=payment_method,
+                    shipping_address=shipping_address,
+                    created_at=datetime.utcnow(),
+                    updated_at=datetime.utcnow()
+                )
+                db.add(new_order)
+                await db.flush()  # Get the order ID without committing
+                
+                # Reserve stock last: the product row stays locked until the commit
+                reservation = await inventory.reserve(db, product.id, quantity)
+                if reservation is None:
+                    await db.rollback()
+                    agent_response["response"] = f"Sorry, we don't have {quantity} of the {product.name} in stock right now."
+                    return database_query
+                
+                # Check if cash on delivery is valid (under $100) at the price actually charged
+                total_amount = reservation.price * quantity
+                if payment_method == "Cash on Delivery" and total_amount >= 100:
+                    # Rolling back puts the reserved stock back
+                    await db.rollback()
+                    agent_response["response"] = "Cash on Delivery is only available for orders under $100. Your order total is ${:.2f}. Please choose a different payment method.".format(total_amount)
+                    return database_query
+                new_order.total_amount = total_amount
+                
+                # Create order item
+                order_item = OrderItem(
+                    order_id=new_order.id,
+                    product_id=product.id,
+                    quantity=quantity,
+                    price=reservation.price
+                )
+                db.add(order_item)
+                
+                await db.commit()
+                
+                database_query = {
+                    "type": "order_placement",
+                    "order_number": order_number,
+                    "result": {
+                        "order_id": new_order.id,
+                        "product": product_name,
+                        "quantity": quantity,
+                        "total_amount": total_amount,
+                        "payment_method": payment_method,
+                        "shipping_address": shipping_address
+                    }
+                }
+                
+                agent_response["response"] = f"Your order has been placed successfully! Your order number is {order_number}. Total amount: ${total_amount:.2f}. Payment method: {payment_method}. Shipping address: {shipping_address}."
+            else:
+                agent_response["response"] = f"I couldn't find a product named {product_name}. Please check the product name and try again."
+        else:
+            agent_response["response"] = "I need the product name and shipping address to place your order. Please provide them."
+    
+    return database_query
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    user_id: Optional[int] = Depends(get_current_user_id)
+):
+    # The model gets whatever is left of the request budget
+    deadline = deadline_in(settings.CHAT_REQUEST_TIMEOUT_SECONDS)
+    reads = prefetcher.reads(request.message, db.bind, user_id)
     debug_info = {
         "database_query": None,
         "agent_processing": None
     }
     
     try:
-        # Process the message with the AI service
-        agent_response = await ai_service.process_message(
+        # Resolve the action, falling back to the AI service when unsure
+        agent_response = await resolve_agent_response(
             request.message,
-            request.conversation_history
+            request.conversation_history,
+            deadline,
+            reads
         )
         
         # Extract action and data from agent response
@@ -37,136 +248,7 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         action_data = agent_response.get("action_data", {})
         
         # Handle different types of queries
-        if action == "Look up product information":
-            product_name = action_data.get("product")
-            if product_name:
-                product = db.query(Product).filter(Product.name == product_name).first()
-                if product:
-                    debug_info["database_query"] = {
-                        "type": "product_lookup",
-                        "product_name": product_name,
-                        "result": {
-                            "name": product.name,
-                            "price": product.price,
-                            "stock": product.stock,
-                            "description": product.description
-                        }
-                    }
-                    # Update agent response with actual product data
-                    agent_response["response"] = f"The {product.name} is priced at ${product.price} and we have {product.stock} in stock. {product.description}"
-        
-        elif action == "Check order status":
-            # In a real application, you would extract the order number from the message
-            # For demo purposes, we'll just show the most recent order
-            order = db.query(Order).order_by(Order.created_at.desc()).first()
-            if order:
-                debug_info["database_query"] = {
-                    "type": "order_lookup",
-                    "order_id": order.id,
-                    "result": {
-                        "status": order.status,
-                        "total_amount": order.total_amount,
-                        "items": [
-                            {
-                                "product_id": item.product_id,
-                                "quantity": item.quantity,
-                                "price": item.price
-                            } for item in order.items
-                        ]
-                    }
-                }
-                # Update agent response with actual order data
-                agent_response["response"] = f"Your order is currently {order.status}. The total amount is ${order.total_amount}."
-        
-        elif action == "Cancel order":
-            # Extract order number from the message or conversation history
-            order_number = action_data.get("order_number")
-            if order_number:
-                order = db.query(Order).filter(Order.order_number == order_number).first()
-                if order:
-                    # Update order status to Cancelled
-                    order.status = "Cancelled"
-                    db.commit()
-                    
-                    debug_info["database_query"] = {
-                        "type": "order_cancellation",
-                        "order_number": order_number,
-                        "result": {
-                            "status": "Cancelled",
-                            "order_id": order.id
-                        }
-                    }
-                    
-                    agent_response["response"] = f"Your order {order_number} has been cancelled successfully."
-                else:
-                    agent_response["response"] = f"I couldn't find an order with the number {order_number}. Please check and try again."
-            else:
-                agent_response["response"] = "I need the order number to cancel your order. Please provide it."
-        
-        elif action == "Place order":
-            # Extract order details from the message or conversation history
-            product_name = action_data.get("product")
-            quantity = action_data.get("quantity", 1)
-            shipping_address = action_data.get("shipping_address")
-            payment_method = action_data.get("payment_method", "Credit Card")
-            
-            if product_name and shipping_address:
-                product = db.query(Product).filter(Product.name == product_name).first()
-                if product:
-                    # Check if cash on delivery is valid (under $100)
-                    total_amount = product.price * quantity
-                    if payment_method == "Cash on Delivery" and total_amount >= 100:
-                        agent_response["response"] = "Cash on Delivery is only available for orders under $100. Your order total is ${:.2f}. Please choose a different payment method.".format(total_amount)
-                    else:
-                        # Generate order number
-                        order_number = ai_service.generate_order_number()
-                        
-                        # Create new order
-                        new_order = Order(
-                            user_id=1,  # Default user for demo
-                            order_number=order_number,
-                            status="Pending",
-                            total_amount=total_amount,
-                            payment_method=payment_method,
-                            shipping_address=shipping_address,
-                            created_at=datetime.utcnow(),
-                            updated_at=datetime.utcnow()
-                        )
-                        db.add(new_order)
-                        db.flush()  # Get the order ID without committing
-                        
-                        # Create order item
-                        order_item = OrderItem(
-                            order_id=new_order.id,
-                            product_id=product.id,
-                            quantity=quantity,
-                            price=product.price
-                        )
-                        db.add(order_item)
-                        
-                        # Update product stock
-                        product.stock -= quantity
-                        
-                        db.commit()
-                        
-                        debug_info["database_query"] = {
-                            "type": "order_placement",
-                            "order_number": order_number,
-                            "result": {
-                                "order_id": new_order.id,
-                                "product": product_name,
-                                "quantity": quantity,
-                                "total_amount": total_amount,
-                                "payment_method": payment_method,
-                                "shipping_address": shipping_address
-                            }
-                        }
-                        
-                        agent_response["response"] = f"Your order has been placed successfully! Your order number is {order_number}. Total amount: ${total_amount:.2f}. Payment method: {payment_method}. Shipping address: {shipping_address}."
-                else:
-                    agent_response["response"] = f"I couldn't find a product named {product_name}. Please check the product name and try again."
-            else:
-                agent_response["response"] = "I need the product name and shipping address to place your order. Please provide them."
+        debug_info["database_query"] = await execute_action(agent_response, db, reads, user_id)
         
         debug_info["agent_processing"] = {
             "original_response": agent_response,
@@ -180,4 +262,79 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         )
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        reads.close()
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    user_id: Optional[int] = Depends(get_current_user_id)
+):
+    """
+    Stream the agent's reply as newline-delimited JSON
+    
+    Emits {"type": "delta", "text": ...} frames while the reply is being
+    generated, then one {"type": "final", ...} frame carrying the action and
+    the response after any database work has been applied.
+    """
+    deadline = deadline_in(settings.CHAT_REQUEST_TIMEOUT_SECONDS)
+    reads = prefetcher.reads(request.message, db.bind, user_id)
+    
+    async def frames():
+        try:
+            async for frame in reply_frames():
+                yield frame
+        finally:
+            reads.close()
+    
+    async def reply_frames():
+        agent_response = None
+        if settings.INTENT_ROUTER_ENABLED:
+            agent_response = intent_router.route(request.message)
+        
+        if agent_response is None:
+            reads.start()
+            start = time.perf_counter()
+            async for event, payload in ai_service.stream_message(
+                request.message,
+                request.conversation_history,
+                deadline
+            ):
+                if event == "delta":
+                    yield json.dumps({"type": "delta", "text": payload}) + "\n"
+                else:
+                    agent_response = payload
+            intent_router.record_llm_latency(time.perf_counter() - start)
+        
+        action = agent_response.get("action_needed")
+        action_data = agent_response.get("action_data", {})
+        debug_info = {
+            "database_query": None,
+            "agent_processing": None
+        }
+        try:
+            debug_info["database_query"] = await execute_action(agent_response, db, reads, user_id)
+        except Exception as e:
+            await db.rollback()
+            agent_response["response"] = "I apologize, but I couldn't complete that request. Please try again."
+        
+        debug_info["agent_processing"] = {
+            "original_response": agent_response,
+            "action_taken": action,
+            "action_data": action_data
+        }
+        yield json.dumps({
+            "type": "final",
+            "response": agent_response["response"],
+            "action_needed": action,
+            "action_data": action_data,
+            "debug_info": debug_info
+        }, default=str) + "\n"
+    
+    return StreamingResponse(
+        frames(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Float
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Float, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -39,6 +39,11 @@ class Message(Base):
     
     conversation = relationship("Conversation", back_populates="messages")
 
+    __table_args__ = (
+        # Transcript pages and history windows: filter by conversation, keyset on (created_at, id)
+        Index("ix_messages_conversation_id_created_at_id", "conversation_id", "created_at", "id"),
+    )
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -56,6 +61,12 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        # Most recent orders, globally and per customer
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+    )
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -70,6 +81,13 @@ class Product(Base):
 
     order_items = relationship("OrderItem", back_populates="product")
 
+    __table_args__ = (
+        # Incremental catalog refreshes
+        Index("ix_products_updated_at", "updated_at"),
+        # Keyset pages of the catalog API within a category
+        Index("ix_products_category_id", "category", "id"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
@@ -80,4 +98,19 @@ class OrderItem(Base):
     price = Column(Float)
     
     order = relationship("Order", back_populates="items")
-    product = relationship("Product", back_populates="order_items") 
\ No newline at end of file
+    product = relationship("Product", back_populates="order_items")
+
+    __table_args__ = (
+        # Items of a batch of orders, in insertion order
+        Index("ix_order_items_order_id_id", "order_id", "id"),
+    )
+
+# Case-insensitive product name lookups
+Index("ix_products_name_lower", func.lower(Product.name))
+
+class IdAllocation(Base):
+    """High-water mark of an id range handed out in blocks (see app.services.order_numbers)"""
+    __tablename__ = "id_allocations"
+
+    name = Column(String, primary_key=True)
+    next_value = Column(BigInteger, nullable=False)
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from typing import Iterator, List, Union
+
+class QueryCounter:
+    """Collects the SQL statements an engine executes while it is active"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+def _sync_engine(engine: Union[Engine, AsyncEngine]) -> Engine:
+    return engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+@contextmanager
+def count_queries(engine: Union[Engine, AsyncEngine]) -> Iterator[QueryCounter]:
+    """Count statements executed on `engine` inside the block"""
+    target = _sync_engine(engine)
+    counter = QueryCounter()
+    event.listen(target, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(target, "before_cursor_execute", counter._before_cursor_execute)
+
+@contextmanager
+def assert_max_queries(engine: Union[Engine, AsyncEngine], expected: int) -> Iterator[QueryCounter]:
+    """
+    Fail if the block executes more than `expected` statements
+
+    Use it around read paths that must not degrade into N+1 loading.
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > expected:
+        statements = "\n".join(f"  {statement}" for statement in counter.statements)
+        raise AssertionError(f"Expected at most {expected} queries, got {counter.count}:\n{statements}")
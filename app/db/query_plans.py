@@ -0,0 +1,76 @@
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+import json
+import re
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN wrapper around a statement, rendered for the connection's dialect"""
+    inherit_cache = False
+
+    def __init__(self, statement: Executable):
+        self.statement = statement
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    if compiler.dialect.name == "postgresql":
+        prefix = "EXPLAIN (FORMAT JSON) "
+    elif compiler.dialect.name == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        prefix = "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+class PlanNode(NamedTuple):
+    description: str
+    table: Optional[str]
+    full_scan: bool
+
+def explain(conn: Connection, statement: Executable) -> List[PlanNode]:
+    """The plan `statement` would run with, one entry per plan node"""
+    rows = conn.execute(Explain(statement)).all()
+    if conn.dialect.name == "postgresql":
+        plan = rows[0][0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return [
+            PlanNode(_describe_pg_node(node), node.get("Relation Name"), node["Node Type"] == "Seq Scan")
+            for node in _walk_pg_plan(plan[0]["Plan"])
+        ]
+    if conn.dialect.name == "sqlite":
+        nodes = []
+        for row in rows:
+            match = _SQLITE_FULL_SCAN.match(row[-1])
+            nodes.append(PlanNode(row[-1], match.group(1) if match else None, match is not None))
+        return nodes
+    return [PlanNode(" ".join(str(value) for value in row), None, False) for row in rows]
+
+def sequential_scans(conn: Connection, statement: Executable, tables: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Plan nodes that read a whole table instead of going through an index
+
+    Only tables in `tables` are reported when it is given, so small lookup
+    tables can be left to the planner's judgement.
+    """
+    watched = set(tables) if tables is not None else None
+    return [
+        node.description
+        for node in explain(conn, statement)
+        if node.full_scan and (watched is None or node.table in watched)
+    ]
+
+def _walk_pg_plan(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk_pg_plan(child)
+
+def _describe_pg_node(node: Dict[str, Any]) -> str:
+    parts = [node["Node Type"]]
+    if "Relation Name" in node:
+        parts.append(f"on {node['Relation Name']}")
+    if "Index Name" in node:
+        parts.append(f"using {node['Index Name']}")
+    return " ".join(parts)
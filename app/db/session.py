@@ -1,22 +1,85 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
-import os
-from dotenv import load_dotenv
+from typing import Any, Dict
+from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, pool_status
 
-load_dotenv()
+# Async drivers used by the request handlers for each sync URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+def make_async_url(url: str) -> str:
+    """Translate a sync database URL into its async-driver equivalent"""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def _engine_options(url: str, is_async: bool) -> Dict[str, Any]:
+    """Pool and connection settings shared by every engine the app builds"""
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        # SQLite has no server-side connection budget; keep the dialect's default pool
+        return {}
+
+    options: Dict[str, Any] = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if is_async:
+        options["poolclass"] = InstrumentedAsyncQueuePool
+        if backend == "postgresql":
+            options["connect_args"] = {"timeout": settings.DB_CONNECT_TIMEOUT}
+    elif backend == "postgresql":
+        options["connect_args"] = {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+    return options
+
+def _track_pool_events(engine: Engine) -> None:
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None)
+    if metrics is None:
+        return
+    event.listen(pool, "connect", lambda dbapi_connection, record: metrics.record_connect())
+    event.listen(pool, "invalidate", lambda dbapi_connection, record, exception: metrics.record_invalidation())
+
+def build_async_engine(url: str = settings.DATABASE_URL) -> AsyncEngine:
+    """Create the async engine used by request handlers"""
+    async_url = make_async_url(url)
+    engine = create_async_engine(async_url, **_engine_options(async_url, is_async=True))
+    _track_pool_events(engine.sync_engine)
+    return engine
+
+def build_sync_engine(url: str = settings.DATABASE_URL) -> Engine:
+    """Create a sync engine for scripts and migrations; request handlers never use it"""
+    return create_engine(url, **_engine_options(url, is_async=False))
+
+# The one pool the request handlers draw from
+async_engine = build_async_engine()
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Sync engine for scripts and migrations. It connects lazily, so app workers
+# that only serve requests never open connections through it.
+engine = build_sync_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+def get_pool_stats() -> Dict[str, Any]:
+    """Live statistics for the request handlers' connection pool"""
+    return pool_status(async_engine.sync_engine.pool)
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -1,15 +1,59 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from app.core.config import settings
 from app.api.api_v1.api import api_router
 from app.api import chat
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.catalog_index import catalog_index
+from app.services.ai_service import prompt_builder
+from app.services.intent_router import intent_router
+from app.utils.compression import StreamingGZipMiddleware
+from app.utils.gemini_utils import model_registry, structured_output_config
+from app.utils.static_files import PrecompressedStaticFiles
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Configure the Gemini client once per process and open its connection
+    model_registry.configure()
+    if settings.GEMINI_WARMUP_ON_STARTUP:
+        await model_registry.warm_up(
+            settings.GEMINI_MODEL_NAME,
+            structured_output_config(),
+            prompt_builder.system_instruction
+        )
+    
+    # Load the product catalog and teach the intent router its names
+    try:
+        async with AsyncSessionLocal() as db:
+            await catalog_index.load(db)
+        intent_router.load_products(catalog_index.names())
+    except Exception as e:
+        logger.warning("Could not load the product catalog index: %s", e)
+    refresh_task = asyncio.create_task(catalog_index.refresh_forever(
+        AsyncSessionLocal,
+        settings.CATALOG_REFRESH_SECONDS,
+        on_names_changed=intent_router.load_products,
+    ))
+    yield
+    
+    refresh_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await refresh_task
+    
+    # Close pooled connections so the database sees a clean disconnect
+    await async_engine.dispose()
 
 app = FastAPI(
     title="E-commerce Customer Service Agent",
     description="AI-powered customer service agent for e-commerce platforms",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Set up CORS middleware
@@ -21,8 +65,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Compress JSON and anything else not already compressed
+app.add_middleware(
+    StreamingGZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
+)
+
+# Serve the fingerprinted, precompressed build when there is one, the sources otherwise
+static_dir = settings.STATIC_BUILD_DIR
+if not os.path.isfile(os.path.join(static_dir, "index.html")):
+    static_dir = settings.STATIC_SOURCE_DIR
+static_files = PrecompressedStaticFiles(directory=static_dir)
+app.mount("/static", static_files, name="static")
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
@@ -31,5 +86,5 @@ app.include_router(api_router, prefix="/api/v1")
 app.include_router(chat.router, prefix="/api")
 
 @app.get("/")
-async def read_root():
-    return FileResponse("app/static/index.html") 
\ No newline at end of file
+async def read_root(request: Request):
+    return await static_files.get_response("index.html", request.scope) 
\ No newline at end of file
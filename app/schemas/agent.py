@@ -0,0 +1,61 @@
+from enum import Enum
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, Optional, Union
+
+class ActionType(str, Enum):
+    """The actions app/api/chat.py has a handler for"""
+    LOOK_UP_PRODUCT = "Look up product information"
+    CHECK_ORDER_STATUS = "Check order status"
+    CANCEL_ORDER = "Cancel order"
+    PLACE_ORDER = "Place order"
+
+class ActionData(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    product: Optional[str] = None
+    # Kept as given when it isn't a number; the order handler validates it
+    quantity: Optional[Union[int, str]] = None
+    shipping_address: Optional[str] = None
+    payment_method: Optional[str] = None
+    order_number: Optional[str] = None
+
+class AgentReply(BaseModel):
+    """A structured reply from the model"""
+    response: str
+    action_needed: Optional[ActionType] = None
+    action_data: Optional[ActionData] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The plain dict the chat handlers work with; unset action fields are left out"""
+        return {
+            "response": self.response,
+            "action_needed": self.action_needed.value if self.action_needed else None,
+            "action_data": self.action_data.model_dump(exclude_none=True) if self.action_data else None,
+        }
+
+def response_schema() -> Dict[str, Any]:
+    """AgentReply as a Gemini response schema (the OpenAPI subset the API accepts)"""
+    return {
+        "type": "object",
+        "properties": {
+            "response": {"type": "string"},
+            "action_needed": {
+                "type": "string",
+                "format": "enum",
+                "enum": [action.value for action in ActionType],
+                "nullable": True,
+            },
+            "action_data": {
+                "type": "object",
+                "nullable": True,
+                "properties": {
+                    "product": {"type": "string"},
+                    "quantity": {"type": "integer"},
+                    "shipping_address": {"type": "string"},
+                    "payment_method": {"type": "string"},
+                    "order_number": {"type": "string"},
+                },
+            },
+        },
+        "required": ["response"],
+    }
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class ProductResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    price: float
+    stock: int
+    category: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,56 +1,165 @@
 from app.core.config import settings
-from app.utils.gemini_utils import generate_structured_response
-from typing import List, Dict
-import random
-import string
+from app.utils.gemini_utils import (
+    JSON_INSTRUCTIONS,
+    generate_structured_response_async,
+    parse_gemini_response,
+    stream_structured_response_async,
+)
+from app.utils.json_stream import IncrementalFieldExtractor
+from app.utils.prompt_builder import BuiltPrompt, PromptBuilder, compile_instruction
+from app.utils.response_cache import ResponseCache, may_request_mutation, response_cache
+from app.utils.single_flight import single_flight
+from app.utils.deadlines import time_left
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import asyncio
+
+SYSTEM_PROMPT = """You are a helpful e-commerce customer service agent. 
+Your role is to assist customers with their inquiries about orders, products 
+and general questions. Be professional, friendly, and concise in your responses.
+
+Available actions:
+- Check order status
+- Look up product information
+- Cancel order
+- Place order
+
+For order cancellation, you need the order number.
+For order placement, you need the product name, quantity, and shipping address.
+For cash on delivery, the order total must be under $100.
+"""
+
+# The static prefix is compiled once and sent as the system instruction,
+# so only history and the customer message change between turns
+prompt_builder = PromptBuilder(
+    compile_instruction(SYSTEM_PROMPT, JSON_INSTRUCTIONS),
+    history_token_budget=settings.PROMPT_HISTORY_TOKEN_BUDGET,
+)
 
 class AIService:
     def __init__(self):
-        # Define the system prompt
-        self.system_prompt = """You are a helpful e-commerce customer service agent. 
-        Your role is to assist customers with their inquiries about orders, products, 
-        returns, and general questions. Be professional, friendly, and concise in your responses.
-        
-        Available actions:
-        - Check order status
-        - Look up product information
-        - Process returns
-        - Cancel order
-        - Place order
-        - Answer general questions
-        
-        For order cancellation, you need the order number.
-        For order placement, you need the product name, quantity, and shipping address.
-        For cash on delivery, the order total must be under $100.
-        
-        Respond in JSON format with the following structure:
-        {
-            "response": "Your response to the customer",
-            "action_needed": "action_type or null",
-            "action_data": {} or null
-        }"""
+        self.system_prompt = SYSTEM_PROMPT
+        self.prompt_builder = prompt_builder
+        self.response_cache = response_cache
+        self.single_flight = single_flight
     
-    async def process_message(self, message: str, conversation_history: List[Dict]) -> Dict:
+    async def process_message(
+        self,
+        message: str,
+        conversation_history: List[Dict],
+        deadline: Optional[float] = None
+    ) -> Dict:
         """
         Process a customer message and generate an appropriate response
+        
+        `deadline` is a time.monotonic() value; a reply that isn't ready by
+        then is replaced by the fallback response.
         """
         try:
-            # Create the full prompt with the customer message
-            full_prompt = f"{self.system_prompt}\n\nCustomer message: {message}"
+            # Fit the newest history into the token budget behind the static prefix
+            prompt = self.prompt_builder.build(message, conversation_history)
+            
+            # Serve repeated questions from the cache
+            cache_key = None
+            if settings.RESPONSE_CACHE_ENABLED:
+                cache_key = self._cache_key(message, prompt)
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Generate response without blocking the event loop
+            async def generate() -> Dict:
+                return await generate_structured_response_async(
+                    prompt=prompt.contents,
+                    model_name=settings.GEMINI_MODEL_NAME,
+                    system_instruction=prompt.system_instruction,
+                    deadline=deadline
+                )
+            
+            # Identical questions already in flight share that call; anything
+            # that may place or cancel an order is always processed on its own
+            if settings.SINGLE_FLIGHT_ENABLED and not may_request_mutation(message):
+                key = cache_key or self._cache_key(message, prompt)
+                shared = self.single_flight.do(key, generate, shareable=ResponseCache.is_cacheable)
+                # A merged call runs on the first caller's deadline; each caller still stops at its own
+                response = await (shared if deadline is None else asyncio.wait_for(shared, time_left(deadline)))
+            else:
+                self.single_flight.bypass()
+                response = await generate()
             
-            # Generate response using the utility function
-            return generate_structured_response(
-                prompt=full_prompt,
-                conversation_history=conversation_history,
-                model_name="gemini-2.0-flash"  # Use Gemini 2.0 Flash model
-            )
+            # State-changing replies are skipped by the cache itself
+            if cache_key is not None:
+                self.response_cache.set(cache_key, response)
+            
+            return response
             
         except Exception as e:
-            return {
-                "response": "I apologize, but I'm having trouble processing your request. Please try again or contact human support.",
-                "action_needed": None,
-                "action_data": None
-            }
+            return self._fallback_response()
+    
+    async def stream_message(
+        self,
+        message: str,
+        conversation_history: List[Dict],
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Process a customer message, streaming the reply text as it is generated
+        
+        Yields ("delta", text) events for each piece of the "response" field,
+        followed by exactly one ("final", response_dict) event once the JSON
+        object is complete.
+        """
+        prompt = self.prompt_builder.build(message, conversation_history)
+        cache_key = None
+        if settings.RESPONSE_CACHE_ENABLED:
+            cache_key = self._cache_key(message, prompt)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield "delta", cached.get("response", "")
+                yield "final", cached
+                return
+        
+        extractor = IncrementalFieldExtractor("response")
+        chunks = []
+        streamed = []
+        try:
+            async for chunk in stream_structured_response_async(
+                prompt=prompt.contents,
+                model_name=settings.GEMINI_MODEL_NAME,
+                system_instruction=prompt.system_instruction,
+                deadline=deadline
+            ):
+                chunks.append(chunk)
+                delta = extractor.feed(chunk)
+                if delta:
+                    streamed.append(delta)
+                    yield "delta", delta
+        except Exception as e:
+            # Keep whatever the customer has already seen; never cache a cut-off reply
+            fallback = self._fallback_response()
+            if streamed:
+                fallback["response"] = "".join(streamed)
+            else:
+                yield "delta", fallback["response"]
+            yield "final", fallback
+            return
+        
+        response = parse_gemini_response(extractor.raw if extractor.complete else "".join(chunks))
+        if cache_key is not None:
+            self.response_cache.set(cache_key, response)
+        yield "final", response
+    
+    def _cache_key(self, message: str, prompt: BuiltPrompt) -> Tuple[str, str]:
+        """Cache and single-flight key covering exactly what the model is sent"""
+        return self.response_cache.make_key(
+            message, settings.GEMINI_MODEL_NAME, prompt.system_instruction, prompt.context
+        )
+    
+    def _fallback_response(self) -> Dict:
+        return {
+            "response": "I apologize, but I'm having trouble processing your request. Please try again or contact human support.",
+            "action_needed": None,
+            "action_data": None
+        }
     
     async def get_product_info(self, product_id: int) -> Dict:
         """
@@ -77,11 +186,3 @@ class AIService:
             "status": "Processing",
             "estimated_delivery": "2024-01-01"
         }
-    
-    def generate_order_number(self) -> str:
-        """
-        Generate a unique order number
-        """
-        # Generate a random 8-character alphanumeric string
-        chars = string.ascii_uppercase + string.digits
-        return ''.join(random.choice(chars) for _ in range(8)) 
\ No newline at end of file
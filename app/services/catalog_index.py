@@ -0,0 +1,348 @@
+from app.core.config import settings
+from app.db.models import Product
+from app.utils.response_cache import normalize_message
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Set
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ProductRecord:
+    """Detached, read-only copy of a product row held by the catalog index"""
+    __slots__ = ("id", "name", "description", "price", "stock", "category", "updated_at")
+
+    id: int
+    name: str
+    description: Optional[str]
+    price: float
+    stock: int
+    category: Optional[str]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, product: Product) -> "ProductRecord":
+        return cls(
+            id=product.id,
+            name=product.name,
+            description=product.description,
+            price=product.price,
+            stock=product.stock,
+            category=product.category,
+            updated_at=product.updated_at,
+        )
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class CatalogIndex:
+    """
+    In-process product catalog with normalized, prefix and fuzzy name lookup
+
+    Loaded once at startup and kept current by incremental refreshes on
+    updated_at plus commit hooks for changes made by this process. Lookups
+    never touch the database.
+
+    Only rows read from the database advance the refresh watermark, and each
+    refresh re-reads `overlap_seconds` before it: rows committed late with an
+    older updated_at (or by a host with a slower clock) are still picked up,
+    and rows already indexed are skipped.
+    """
+
+    def __init__(self, fuzzy_threshold: float = 0.5, overlap_seconds: float = 5.0):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.loaded = False
+        # Bumped whenever the set of indexed names changes
+        self.names_version = 0
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, ProductRecord] = {}
+        self._id_by_key: Dict[str, int] = {}
+        self._id_by_compact: Dict[str, int] = {}
+        self._sorted_keys: List[str] = []
+        self._trigram_ids: Dict[str, Set[int]] = {}
+        self._trigram_counts: Dict[int, int] = {}
+        self._watermark: Optional[datetime] = None
+        self._stats = {
+            "exact_hits": 0,
+            "prefix_hits": 0,
+            "fuzzy_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "rows_refreshed": 0,
+            "invalidations": 0,
+            "last_refresh_seconds": None,
+        }
+
+    async def load(self, db: AsyncSession) -> None:
+        """Load the full catalog, replacing anything already indexed"""
+        products = (await db.execute(select(Product))).scalars().all()
+        with self._lock:
+            self._by_id.clear()
+            self._id_by_key.clear()
+            self._id_by_compact.clear()
+            self._sorted_keys.clear()
+            self._trigram_ids.clear()
+            self._trigram_counts.clear()
+            self._watermark = None
+        records = [ProductRecord.from_model(product) for product in products]
+        self.upsert_many(records)
+        self._advance_watermark(records)
+        self.loaded = True
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """Pull products changed since the last load or refresh; returns the number of rows applied"""
+        start = time.perf_counter()
+        query = select(Product)
+        if self._watermark is not None:
+            query = query.filter(Product.updated_at >= self._watermark - self.overlap)
+        records = [ProductRecord.from_model(product) for product in (await db.execute(query)).scalars()]
+        # The overlap re-reads rows already indexed; only apply new or newer ones
+        with self._lock:
+            changed = [record for record in records if self._is_newer(record)]
+        self.upsert_many(changed)
+        self._advance_watermark(records)
+        self.loaded = True
+        with self._lock:
+            self._stats["refreshes"] += 1
+            self._stats["rows_refreshed"] += len(changed)
+            self._stats["last_refresh_seconds"] = time.perf_counter() - start
+        return len(changed)
+
+    def upsert_many(self, records: Iterable[ProductRecord]) -> None:
+        with self._lock:
+            for record in records:
+                previous = self._by_id.get(record.id)
+                if previous is None or previous.name != record.name:
+                    if previous is not None:
+                        self._unindex_name(previous)
+                    self._index_name(record)
+                self._by_id[record.id] = record
+
+    async def refresh_forever(self, session_factory, interval: float, on_names_changed=None) -> None:
+        """Refresh every `interval` seconds until cancelled, calling on_names_changed(names) when names change"""
+        notified_version = self.names_version
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as db:
+                    await self.refresh(db)
+            except Exception as e:
+                logger.warning("Catalog index refresh failed: %s", e)
+                continue
+            # Also covers names added through the commit hooks since the last pass
+            if on_names_changed is not None and self.names_version != notified_version:
+                notified_version = self.names_version
+                on_names_changed(self.names())
+
+    def upsert(self, record: ProductRecord) -> None:
+        self.upsert_many([record])
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            previous = self._by_id.pop(product_id, None)
+            if previous is not None:
+                self._unindex_name(previous)
+
+    def get(self, product_id: int) -> Optional[ProductRecord]:
+        return self._by_id.get(product_id)
+
+    def names(self) -> List[str]:
+        return [record.name for record in self._by_id.values() if record.name]
+
+    def resolve(self, name: str) -> Optional[ProductRecord]:
+        """Resolve a possibly paraphrased product name to a catalog record"""
+        key = normalize_message(name or "")
+        if not key:
+            return None
+
+        product_id = self._id_by_key.get(key)
+        if product_id is None:
+            product_id = self._id_by_compact.get(key.replace(" ", ""))
+        if product_id is not None:
+            self._count("exact_hits")
+            return self._by_id.get(product_id)
+
+        prefix_matches = self._prefix_matches(key)
+        if len(prefix_matches) == 1:
+            self._count("prefix_hits")
+            return self._by_id.get(prefix_matches[0])
+        if prefix_matches:
+            # Several names start with the query ("smart"); guessing would be wrong half the time
+            self._count("misses")
+            return None
+
+        product_id = self._fuzzy_match(key)
+        if product_id is not None:
+            self._count("fuzzy_hits")
+            return self._by_id.get(product_id)
+
+        self._count("misses")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "loaded": self.loaded,
+                "products": len(self._by_id),
+                "watermark": self._watermark.isoformat() if self._watermark else None,
+            }
+
+    def _prefix_matches(self, key: str, limit: int = 2) -> List[int]:
+        """Ids of up to `limit` catalog names starting with the query (e.g. "laptop" -> "Laptop Pro")"""
+        keys = self._sorted_keys
+        index = bisect_left(keys, key)
+        matches = []
+        while index < len(keys) and keys[index].startswith(key) and len(matches) < limit:
+            matches.append(self._id_by_key[keys[index]])
+            index += 1
+        return matches
+
+    def _fuzzy_match(self, key: str) -> Optional[int]:
+        """Best trigram-Jaccard match above the threshold, if it is unambiguous"""
+        query = _trigrams(key)
+        overlaps: Dict[int, int] = {}
+        for gram in query:
+            for product_id in self._trigram_ids.get(gram, ()):
+                overlaps[product_id] = overlaps.get(product_id, 0) + 1
+
+        query_size = len(query)
+        scored = [
+            (overlap / (query_size + self._trigram_counts[product_id] - overlap), product_id)
+            for product_id, overlap in overlaps.items()
+        ]
+        if not scored:
+            return None
+
+        scored.sort(reverse=True)
+        best_score, best_id = scored[0]
+        if best_score < self.fuzzy_threshold:
+            return None
+        if len(scored) > 1 and scored[1][0] == best_score:
+            return None
+        return best_id
+
+    def _index_name(self, record: ProductRecord) -> None:
+        key = normalize_message(record.name or "")
+        if not key:
+            return
+        self.names_version += 1
+        if key not in self._id_by_key:
+            insort(self._sorted_keys, key)
+        self._id_by_key[key] = record.id
+        self._id_by_compact[key.replace(" ", "")] = record.id
+        grams = _trigrams(key)
+        for gram in grams:
+            self._trigram_ids.setdefault(gram, set()).add(record.id)
+        self._trigram_counts[record.id] = len(grams)
+
+    def _unindex_name(self, record: ProductRecord) -> None:
+        key = normalize_message(record.name or "")
+        if not key:
+            return
+        if self._id_by_key.get(key) == record.id:
+            del self._id_by_key[key]
+            index = bisect_left(self._sorted_keys, key)
+            if index < len(self._sorted_keys) and self._sorted_keys[index] == key:
+                del self._sorted_keys[index]
+        if self._id_by_compact.get(key.replace(" ", "")) == record.id:
+            del self._id_by_compact[key.replace(" ", "")]
+        for gram in _trigrams(key):
+            ids = self._trigram_ids.get(gram)
+            if ids is not None:
+                ids.discard(record.id)
+                if not ids:
+                    del self._trigram_ids[gram]
+        self._trigram_counts.pop(record.id, None)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _is_newer(self, record: ProductRecord) -> bool:
+        """Whether a row read from the database differs from, and is not older than, the indexed copy"""
+        previous = self._by_id.get(record.id)
+        if previous is None:
+            return True
+        if previous.updated_at and record.updated_at and record.updated_at < previous.updated_at:
+            return False
+        return record != previous
+
+    def _advance_watermark(self, records: List[ProductRecord]) -> None:
+        """Move the refresh watermark to the newest updated_at read from the database"""
+        newest = max((record.updated_at for record in records if record.updated_at), default=None)
+        with self._lock:
+            if newest is not None and (self._watermark is None or newest > self._watermark):
+                self._watermark = newest
+
+    def _apply_committed(self, records: List[ProductRecord], deleted_ids: List[int]) -> None:
+        with self._lock:
+            self._stats["invalidations"] += len(records) + len(deleted_ids)
+        self.upsert_many(records)
+        for product_id in deleted_ids:
+            self.remove(product_id)
+
+catalog_index = CatalogIndex(
+    fuzzy_threshold=settings.CATALOG_FUZZY_THRESHOLD,
+    overlap_seconds=settings.CATALOG_REFRESH_OVERLAP_SECONDS,
+)
+
+def product_by_name_query(product_name: str):
+    return select(Product).filter(func.lower(Product.name) == product_name.lower()).limit(1)
+
+async def find_product(db: AsyncSession, product_name: str):
+    """
+    Resolve a product name through the in-process catalog index
+    
+    The index tolerates case, punctuation and small paraphrases and doesn't
+    touch the database. Until it has been loaded, fall back to a
+    case-insensitive database lookup on the lower(name) index.
+    """
+    if catalog_index.loaded:
+        return catalog_index.resolve(product_name)
+    return (await db.execute(product_by_name_query(product_name))).scalars().first()
+
+# Keep the index in step with product changes committed by this process.
+# Changes are collected at flush time and only applied once the transaction
+# commits, so rolled-back stock or price edits never reach the index.
+_PENDING_KEY = "catalog_index_pending"
+
+def stage_product_update(session, record: ProductRecord) -> None:
+    """
+    Queue a product snapshot for the index once `session` commits
+
+    Flushed ORM changes are picked up automatically; use this for changes
+    made with UPDATE statements, which never pass through a flush.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, {"upserts": {}, "deleted": set()})
+    pending["upserts"][record.id] = record
+
+@event.listens_for(Session, "after_flush")
+def _collect_product_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {"upserts": {}, "deleted": set()})
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, Product) and instance.id is not None:
+            pending["upserts"][instance.id] = ProductRecord.from_model(instance)
+    for instance in session.deleted:
+        if isinstance(instance, Product) and instance.id is not None:
+            pending["deleted"].add(instance.id)
+
+@event.listens_for(Session, "after_commit")
+def _apply_product_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and catalog_index.loaded:
+        catalog_index._apply_committed(list(pending["upserts"].values()), list(pending["deleted"]))
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_product_changes(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
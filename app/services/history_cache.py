@@ -0,0 +1,110 @@
+from app.core.config import settings
+from app.db.models import Message
+from collections import OrderedDict, deque
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Deque, Dict, List, Tuple
+import threading
+import time
+
+def window_query(conversation_id: int, window: int):
+    """The last `window` turns of a conversation, newest first"""
+    return (
+        select(Message.content, Message.is_from_user)
+        .filter(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(window)
+    )
+
+class Turn:
+    """One message in a cached history window"""
+    __slots__ = ("content", "is_from_user")
+
+    def __init__(self, content: str, is_from_user: bool):
+        self.content = content
+        self.is_from_user = is_from_user
+
+    def to_dict(self) -> Dict:
+        return {"content": self.content, "is_from_user": self.is_from_user}
+
+class ConversationHistoryCache:
+    """
+    Recent turns per conversation, kept in memory with global LRU eviction
+
+    Each conversation holds a ring buffer of its last `window` turns. A
+    conversation is hydrated from the database on first access; after that
+    new turns are appended in memory, so sending a message doesn't re-read
+    history. Entries older than `ttl_seconds` are re-hydrated to pick up
+    turns written by other workers.
+    """
+
+    def __init__(self, max_conversations: int = 10000, window: int = 10, ttl_seconds: float = 300.0):
+        self.max_conversations = max_conversations
+        self.window = window
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, Deque[Turn]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "hydrations": 0, "evictions": 0, "appends": 0}
+
+    def contains(self, conversation_id: int) -> bool:
+        """Whether a fresh window for this conversation is cached"""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            return entry is not None and entry[0] > time.monotonic()
+
+    async def get_window(self, db: AsyncSession, conversation_id: int) -> List[Dict]:
+        """Return the recent turns, oldest first, hydrating from the database if needed"""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(conversation_id)
+                self._stats["hits"] += 1
+                return [turn.to_dict() for turn in entry[1]]
+
+        rows = (await db.execute(window_query(conversation_id, self.window))).all()
+        turns = deque((Turn(content, is_from_user) for content, is_from_user in reversed(rows)), maxlen=self.window)
+
+        with self._lock:
+            self._stats["hydrations"] += 1
+            self._store(conversation_id, turns)
+        return [turn.to_dict() for turn in turns]
+
+    def append(self, conversation_id: int, content: str, is_from_user: bool) -> None:
+        """Record a committed turn; ignored if the conversation isn't cached"""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return
+            entry[1].append(Turn(content, is_from_user))
+            self._entries.move_to_end(conversation_id)
+            self._stats["appends"] += 1
+
+    def invalidate(self, conversation_id: int) -> None:
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "conversations": len(self._entries),
+                "max_conversations": self.max_conversations,
+                "window": self.window,
+            }
+
+    def _store(self, conversation_id: int, turns: Deque[Turn]) -> None:
+        self._entries[conversation_id] = (time.monotonic() + self.ttl_seconds, turns)
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_conversations:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+history_cache = ConversationHistoryCache(
+    max_conversations=settings.HISTORY_CACHE_MAX_CONVERSATIONS,
+    window=settings.HISTORY_CACHE_WINDOW,
+    ttl_seconds=settings.HISTORY_CACHE_TTL_SECONDS,
+)
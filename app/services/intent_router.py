@@ -0,0 +1,243 @@
+from app.utils.response_cache import normalize_message
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import re
+import threading
+import time
+
+# Order numbers are 14 upper-case alphanumerics ending in a check digit
+# (app.services.order_numbers); older orders have 9, or 8 random ones.
+# Requiring a digit keeps ordinary words ("tomorrow", "shipping") from matching.
+ORDER_NUMBER_RE = re.compile(
+    r"(?<![A-Za-z0-9])#?((?=[A-Za-z0-9]{0,13}\d)(?:[A-Za-z0-9]{14}|[A-Za-z0-9]{8,9}))(?![A-Za-z0-9])"
+)
+
+_CANCEL_RE = re.compile(r"\bcancel\b")
+_ORDER_WORD_RE = re.compile(r"\border\b")
+_RETURN_RE = re.compile(r"\b(return|refund)\b")
+_NEGATION_RE = re.compile(r"\b(don t|dont|do not|not|never|no longer)\s+(want to\s+)?cancel\b")
+# Cancellation can't be undone, so only plain requests are routed; questions
+# ("how do I cancel ...", "can I cancel ...?") and conditionals go to the model
+_QUESTION_START_RE = re.compile(
+    r"^(how|what|why|when|where|which|who|can|could|should|would|will|do|does|did|is|are|may|might|if)\b"
+)
+_CONDITIONAL_RE = re.compile(r"\b(if|unless|whether|in case|what if|what happens)\b")
+_ORDER_STATUS_RES = [
+    re.compile(r"\bwhere s my (order|package|parcel|delivery)\b"),
+    re.compile(r"\bwhere is my (order|package|parcel|delivery)\b"),
+    re.compile(r"\b(status|track|tracking)\b.*\border\b"),
+    re.compile(r"\border\b.*\b(status|tracking)\b"),
+    re.compile(r"\bhas my order (shipped|arrived)\b"),
+]
+# A lookup has to be about the product named: the cue sits right before or after the name
+_LOOKUP_BEFORE_RE = re.compile(
+    r"\b(tell me about|describe|show me|look up|(details|info|information|specs) (of|on|about|for)|"
+    r"price of|cost of|how much (is|are|does|do|for)|what is|what s|what are)( the| a| an| your)?$"
+)
+_LOOKUP_AFTER_RE = re.compile(r"^((is|are) )?(price|prices|cost|costs|specs|details|info|information|in stock|available)\b")
+_PRODUCT_NEGATION_RE = re.compile(r"\b(don t|dont|do not|not|never|no longer|without)\b")
+_OTHER_INTENT_RE = re.compile(r"\b(cancel|return|refund|buy|purchase|order|ship to|deliver to)\b")
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton for finding many keywords in one pass
+
+    Matches are reported only on whole-word boundaries of the (already
+    normalized) text, longest match first where matches overlap.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        for keyword, value in keywords:
+            self.add(keyword, value)
+        self.build()
+
+    def add(self, keyword: str, value: Any) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(keyword), value))
+
+    def build(self) -> None:
+        """Compute failure links; must be called after the last add()"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Return non-overlapping whole-word matches as (start, end, value)"""
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                start, end = index - length + 1, index + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    matches.append((start, end, value))
+
+        matches.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        selected = []
+        last_end = -1
+        for start, end, value in matches:
+            if start >= last_end:
+                selected.append((start, end, value))
+                last_end = end
+        return selected
+
+class IntentRouter:
+    """
+    Resolve unambiguous customer messages without calling the LLM
+
+    route() returns a response dict in the same shape as
+    AIService.process_message when it is confident about the intent, and
+    None otherwise so the caller falls back to the model.
+    """
+
+    def __init__(self, llm_latency_alpha: float = 0.2):
+        self._products = KeywordAutomaton()
+        self._product_count = 0
+        self._llm_latency_alpha = llm_latency_alpha
+        self._llm_latency_ewma: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "routed": 0,
+            "fallbacks": 0,
+            "by_intent": {},
+            "route_seconds": 0.0,
+            "estimated_seconds_saved": 0.0,
+        }
+
+    def load_products(self, product_names: Iterable[str]) -> None:
+        """Rebuild the product-name automaton from catalog names"""
+        names = {normalize_message(name): name for name in product_names if name}
+        self._products = KeywordAutomaton((key, name) for key, name in names.items() if key)
+        self._product_count = len(names)
+
+    def route(self, message: str) -> Optional[Dict]:
+        """Return a routed response for high-confidence intents, else None"""
+        start = time.perf_counter()
+        response = self._classify(message)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            if response is None:
+                self._stats["fallbacks"] += 1
+                return None
+            intent = response["action_needed"]
+            self._stats["routed"] += 1
+            self._stats["by_intent"][intent] = self._stats["by_intent"].get(intent, 0) + 1
+            self._stats["route_seconds"] += elapsed
+            if self._llm_latency_ewma is not None:
+                self._stats["estimated_seconds_saved"] += max(self._llm_latency_ewma - elapsed, 0.0)
+        return response
+
+    def find_products(self, message: str) -> List[str]:
+        """Catalog names mentioned in a message, in order of appearance"""
+        names = []
+        for _, _, name in self._products.find_all(normalize_message(message)):
+            if name not in names:
+                names.append(name)
+        return names
+
+    def record_llm_latency(self, seconds: float) -> None:
+        """Feed the latency of a turn that went to the model, used to estimate savings"""
+        with self._lock:
+            if self._llm_latency_ewma is None:
+                self._llm_latency_ewma = seconds
+            else:
+                alpha = self._llm_latency_alpha
+                self._llm_latency_ewma = alpha * seconds + (1 - alpha) * self._llm_latency_ewma
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._stats["routed"] + self._stats["fallbacks"]
+            return {
+                **self._stats,
+                "by_intent": dict(self._stats["by_intent"]),
+                "short_circuit_rate": self._stats["routed"] / total if total else 0.0,
+                "llm_latency_ewma_seconds": self._llm_latency_ewma,
+                "products_indexed": self._product_count,
+            }
+
+    def _classify(self, message: str) -> Optional[Dict]:
+        text = normalize_message(message)
+        if not text:
+            return None
+
+        if _CANCEL_RE.search(text):
+            return self._route_cancel(message, text)
+
+        if any(pattern.search(text) for pattern in _ORDER_STATUS_RES):
+            if _RETURN_RE.search(text):
+                return None
+            return _routed(
+                "Check order status",
+                {},
+                "I couldn't find a recent order on your account. Could you share your order number?"
+            )
+
+        return self._route_product_lookup(text)
+
+    def _route_cancel(self, message: str, text: str) -> Optional[Dict]:
+        if _NEGATION_RE.search(text) or not _ORDER_WORD_RE.search(text):
+            return None
+        if message.strip().endswith("?") or _QUESTION_START_RE.search(text) or _CONDITIONAL_RE.search(text):
+            return None
+        if _RETURN_RE.search(text):
+            return None
+        order_numbers = {match.upper() for match in ORDER_NUMBER_RE.findall(message)}
+        if len(order_numbers) != 1:
+            return None
+        order_number = order_numbers.pop()
+        return _routed(
+            "Cancel order",
+            {"order_number": order_number},
+            f"Let me cancel order {order_number} for you."
+        )
+
+    def _route_product_lookup(self, text: str) -> Optional[Dict]:
+        matches = self._products.find_all(text)
+        if len({name for _, _, name in matches}) != 1:
+            return None
+        start, end, product = matches[0]
+        if text != normalize_message(product):
+            if _OTHER_INTENT_RE.search(text) or _PRODUCT_NEGATION_RE.search(text):
+                return None
+            if not (_LOOKUP_BEFORE_RE.search(text[:start].strip()) or _LOOKUP_AFTER_RE.search(text[end:].strip())):
+                return None
+        return _routed(
+            "Look up product information",
+            {"product": product},
+            f"Let me look up the {product} for you."
+        )
+
+def _routed(action: str, action_data: Dict, response: str) -> Dict:
+    return {
+        "response": response,
+        "action_needed": action,
+        "action_data": action_data,
+        "routed_by": "intent_router",
+    }
+
+intent_router = IntentRouter()
@@ -0,0 +1,128 @@
+from app.db.models import Order, OrderItem, Product
+from app.services.catalog_index import catalog_index, stage_product_update
+from dataclasses import dataclass, replace
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
+import threading
+
+@dataclass(frozen=True)
+class Reservation:
+    """Stock taken for one order line, with the product's price at that moment"""
+    __slots__ = ("product_id", "quantity", "price", "remaining")
+
+    product_id: int
+    quantity: int
+    price: float
+    remaining: int
+
+def parse_quantity(value: Any) -> Optional[int]:
+    """A positive whole quantity from model output, or None if it isn't one"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity > 0 else None
+
+class InventoryService:
+    """
+    Stock reservations done as single conditional UPDATEs
+
+    A reservation is `UPDATE products SET stock = stock - :qty WHERE id = :id
+    AND stock >= :qty`: the database checks and decrements in one statement,
+    so concurrent buyers of the same product can't oversell it and nobody
+    holds a lock across a read-modify-write round trip. The row lock is
+    only held from the UPDATE until the caller commits, so reserve as late
+    in the transaction as possible.
+
+    Nothing here commits; reservations and releases become visible (and
+    reach the catalog index) with the caller's transaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"reserved": 0, "rejected": 0, "released": 0}
+
+    async def reserve(self, db: AsyncSession, product_id: int, quantity: int) -> Optional[Reservation]:
+        """Take `quantity` units of a product; None if there isn't enough stock"""
+        if quantity < 1:
+            raise ValueError("quantity must be positive")
+        now = datetime.utcnow()
+        row = (await db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.stock >= quantity)
+            .values(stock=Product.stock - quantity, updated_at=now)
+            .returning(Product.stock, Product.price)
+            .execution_options(synchronize_session=False)
+        )).first()
+        if row is None:
+            self._count("rejected")
+            return None
+        self._count("reserved")
+        self._stage(db, product_id, row.stock, now)
+        return Reservation(product_id=product_id, quantity=quantity, price=row.price, remaining=row.stock)
+
+    async def release(self, db: AsyncSession, product_id: int, quantity: int) -> Optional[int]:
+        """Return `quantity` units to stock; the new stock level, or None if the product is gone"""
+        now = datetime.utcnow()
+        row = (await db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(stock=Product.stock + quantity, updated_at=now)
+            .returning(Product.stock)
+            .execution_options(synchronize_session=False)
+        )).first()
+        if row is None:
+            return None
+        self._count("released")
+        self._stage(db, product_id, row.stock, now)
+        return row.stock
+
+    async def cancel_order(self, db: AsyncSession, order_id: int, user_id: Optional[int] = None) -> bool:
+        """
+        Mark an order cancelled and put its items back in stock
+
+        The status change is conditional too, so two concurrent
+        cancellations release the stock once; returns False for the loser,
+        for orders that were already cancelled and, when `user_id` is
+        given, for orders that belong to someone else.
+        """
+        conditions = [Order.id == order_id, Order.status != "Cancelled"]
+        if user_id is not None:
+            conditions.append(Order.user_id == user_id)
+        result = await db.execute(
+            update(Order)
+            .where(*conditions)
+            .values(status="Cancelled", updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+        # Release in product id order so concurrent cancellations lock rows in the same order
+        items = (await db.execute(
+            select(OrderItem.product_id, OrderItem.quantity)
+            .filter(OrderItem.order_id == order_id)
+            .order_by(OrderItem.product_id)
+        )).all()
+        for product_id, quantity in items:
+            if product_id is not None and quantity:
+                await self.release(db, product_id, quantity)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _stage(self, db: AsyncSession, product_id: int, stock: int, updated_at: datetime) -> None:
+        record = catalog_index.get(product_id)
+        if record is not None:
+            stage_product_update(db, replace(record, stock=stock, updated_at=updated_at))
+
+inventory = InventoryService()
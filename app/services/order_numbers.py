@@ -0,0 +1,145 @@
+from app.core.config import settings
+from app.db.models import IdAllocation
+from sqlalchemy import insert, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import random
+import secrets
+import string
+import threading
+
+ALPHABET = string.digits + string.ascii_uppercase
+SEQUENCE_LENGTH = 8
+# The first number is "10000000" so numbers keep their width from day one
+FIRST_VALUE = len(ALPHABET) ** (SEQUENCE_LENGTH - 1)
+# Random characters after the sequence, so knowing one order number doesn't
+# reveal its neighbours (36 ** 5, about 60 million, candidates per sequence value)
+SUFFIX_LENGTH = 5
+
+def encode_base36(value: int, width: int = SEQUENCE_LENGTH) -> str:
+    digits = []
+    while value:
+        value, remainder = divmod(value, len(ALPHABET))
+        digits.append(ALPHABET[remainder])
+    return "".join(reversed(digits)).rjust(width, "0")
+
+def check_digit(sequence: str) -> str:
+    """Weighted checksum digit; catches single-character typos and most transpositions"""
+    return str(sum((position + 1) * ALPHABET.index(char) for position, char in enumerate(sequence)) % 10)
+
+def random_suffix(rng: Optional[random.Random] = None) -> str:
+    """SUFFIX_LENGTH random base-36 characters; from a CSPRNG unless `rng` is given (seed data)"""
+    choice = secrets.choice if rng is None else rng.choice
+    return "".join(choice(ALPHABET) for _ in range(SUFFIX_LENGTH))
+
+def format_order_number(value: int, suffix: str = "") -> str:
+    """
+    The base-36 sequence value, a random suffix and a check digit
+
+    Allocated numbers are fourteen characters. Without a suffix the result
+    is the nine-character form orders were numbered with before suffixes.
+    """
+    body = encode_base36(value) + suffix
+    return body + check_digit(body)
+
+class OrderNumberAllocator:
+    """
+    Hands out unique, increasing, hard-to-guess order numbers without a uniqueness check
+
+    Values come from a counter row in `id_allocations`. Each process claims
+    a block of `block_size` values with one atomic UPDATE ... RETURNING in
+    a short transaction of its own, then serves the block from memory.
+    Blocks never overlap, so numbers are unique across workers and nodes,
+    and since blocks are claimed in increasing order the numbers are
+    roughly time-sorted, which keeps inserts into the order_number index
+    near its right-hand edge. Values in a block that is never used (e.g. a
+    worker restarts) are simply skipped. The random suffix after the
+    sequence keeps neighbouring numbers from being guessed; uniqueness
+    still comes from the sequence alone.
+    """
+
+    def __init__(self, name: str = "order_number", block_size: int = 1000, first_value: int = FIRST_VALUE):
+        self.name = name
+        self.block_size = block_size
+        self.first_value = first_value
+        self._next = 0
+        self._end = 0
+        self._async_lock = asyncio.Lock()
+        self._sync_lock = threading.Lock()
+        self._stats = {"allocated": 0, "blocks_claimed": 0}
+
+    async def next(self, engine: AsyncEngine) -> str:
+        """Allocate the next order number, claiming a new block through `engine` if needed"""
+        if self._next >= self._end:
+            async with self._async_lock:
+                if self._next >= self._end:
+                    async with engine.begin() as conn:
+                        start = await self._claim_async(conn)
+                    self._use_block(start)
+        return self._take()
+
+    def next_sync(self, engine: Engine) -> str:
+        """Same as next, for scripts that use the sync engine"""
+        with self._sync_lock:
+            if self._next >= self._end:
+                with engine.begin() as conn:
+                    start = self._claim_sync(conn)
+                self._use_block(start)
+            return self._take()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "block_size": self.block_size,
+            "remaining_in_block": self._end - self._next,
+        }
+
+    def _take(self) -> str:
+        value = self._next
+        self._next += 1
+        self._stats["allocated"] += 1
+        return format_order_number(value, random_suffix())
+
+    def _use_block(self, start: int) -> None:
+        self._next, self._end = start, start + self.block_size
+        self._stats["blocks_claimed"] += 1
+
+    def _statements(self) -> Tuple[Any, Any]:
+        advance = (
+            update(IdAllocation)
+            .where(IdAllocation.name == self.name)
+            .values(next_value=IdAllocation.next_value + self.block_size)
+            .returning(IdAllocation.next_value)
+        )
+        create = insert(IdAllocation).values(name=self.name, next_value=self.first_value + self.block_size)
+        return advance, create
+
+    async def _claim_async(self, conn: AsyncConnection) -> int:
+        advance, create = self._statements()
+        end = (await conn.execute(advance)).scalar()
+        if end is None:
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(create)
+                return self.first_value
+            except IntegrityError:
+                # Another worker created the counter first
+                end = (await conn.execute(advance)).scalar_one()
+        return end - self.block_size
+
+    def _claim_sync(self, conn: Connection) -> int:
+        advance, create = self._statements()
+        end = conn.execute(advance).scalar()
+        if end is None:
+            try:
+                with conn.begin_nested():
+                    conn.execute(create)
+                return self.first_value
+            except IntegrityError:
+                end = conn.execute(advance).scalar_one()
+        return end - self.block_size
+
+order_numbers = OrderNumberAllocator(block_size=settings.ORDER_NUMBER_BLOCK_SIZE)
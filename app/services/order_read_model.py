@@ -0,0 +1,155 @@
+from app.db.models import Order, OrderItem, Product
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+@dataclass(frozen=True)
+class OrderItemView:
+    """One line of an order, with the product name already joined in"""
+    __slots__ = ("product_id", "product_name", "quantity", "price")
+
+    product_id: int
+    product_name: Optional[str]
+    quantity: int
+    price: float
+
+    def to_dict(self) -> Dict:
+        return {
+            "product_id": self.product_id,
+            "product_name": self.product_name,
+            "quantity": self.quantity,
+            "price": self.price,
+        }
+
+@dataclass(frozen=True)
+class OrderView:
+    """Read-only projection of an order and its items"""
+    __slots__ = (
+        "id", "order_number", "user_id", "status", "total_amount",
+        "payment_method", "shipping_address", "created_at", "items",
+    )
+
+    id: int
+    order_number: Optional[str]
+    user_id: Optional[int]
+    status: Optional[str]
+    total_amount: Optional[float]
+    payment_method: Optional[str]
+    shipping_address: Optional[str]
+    created_at: Optional[datetime]
+    items: Tuple[OrderItemView, ...]
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "order_number": self.order_number,
+            "user_id": self.user_id,
+            "status": self.status,
+            "total_amount": self.total_amount,
+            "payment_method": self.payment_method,
+            "shipping_address": self.shipping_address,
+            "created_at": self.created_at,
+            "items": [item.to_dict() for item in self.items],
+        }
+
+_ORDER_COLUMNS = (
+    Order.id,
+    Order.order_number,
+    Order.user_id,
+    Order.status,
+    Order.total_amount,
+    Order.payment_method,
+    Order.shipping_address,
+    Order.created_at,
+)
+
+def orders_query(user_id: Optional[int], order_number: Optional[str], limit: Optional[int]) -> Select:
+    """Order columns, newest first; served by the (created_at, id) and (user_id, created_at) indexes"""
+    query = select(*_ORDER_COLUMNS)
+    if user_id is not None:
+        query = query.filter(Order.user_id == user_id)
+    if order_number is not None:
+        query = query.filter(Order.order_number == order_number)
+    query = query.order_by(Order.created_at.desc(), Order.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def order_status_query(order_number: str, user_id: Optional[int] = None) -> Select:
+    """Just the id and status of one order, for handlers that only need those; scoped to `user_id` if given"""
+    query = select(Order.id, Order.status).filter(Order.order_number == order_number)
+    if user_id is not None:
+        query = query.filter(Order.user_id == user_id)
+    return query.limit(1)
+
+def items_query(order_ids: Sequence[int]) -> Select:
+    """Items of the given orders with product names; served by the (order_id, id) index"""
+    return (
+        select(OrderItem.order_id, OrderItem.product_id, Product.name, OrderItem.quantity, OrderItem.price)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .filter(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    )
+
+def _assemble(order_rows: Iterable, item_rows: Iterable) -> List[OrderView]:
+    items_by_order: Dict[int, List[OrderItemView]] = {}
+    for order_id, product_id, product_name, quantity, price in item_rows:
+        items_by_order.setdefault(order_id, []).append(
+            OrderItemView(product_id=product_id, product_name=product_name, quantity=quantity, price=price)
+        )
+    return [
+        OrderView(
+            id=row.id,
+            order_number=row.order_number,
+            user_id=row.user_id,
+            status=row.status,
+            total_amount=row.total_amount,
+            payment_method=row.payment_method,
+            shipping_address=row.shipping_address,
+            created_at=row.created_at,
+            items=tuple(items_by_order.get(row.id, ())),
+        )
+        for row in order_rows
+    ]
+
+async def list_orders(
+    db: AsyncSession,
+    user_id: Optional[int] = None,
+    order_number: Optional[str] = None,
+    limit: Optional[int] = 20
+) -> List[OrderView]:
+    """
+    Load orders newest first with their items and product names
+
+    Always runs at most two queries (orders, then all of their items), no
+    matter how many orders or items are returned.
+    """
+    order_rows = (await db.execute(orders_query(user_id, order_number, limit))).all()
+    if not order_rows:
+        return []
+    item_rows = (await db.execute(items_query([row.id for row in order_rows]))).all()
+    return _assemble(order_rows, item_rows)
+
+async def get_latest_order(db: AsyncSession, user_id: Optional[int] = None) -> Optional[OrderView]:
+    orders = await list_orders(db, user_id=user_id, limit=1)
+    return orders[0] if orders else None
+
+async def get_order_by_number(db: AsyncSession, order_number: str) -> Optional[OrderView]:
+    orders = await list_orders(db, order_number=order_number, limit=1)
+    return orders[0] if orders else None
+
+def list_orders_sync(
+    db: Session,
+    user_id: Optional[int] = None,
+    order_number: Optional[str] = None,
+    limit: Optional[int] = 20
+) -> List[OrderView]:
+    """Same as list_orders, for scripts that use the sync SessionLocal"""
+    order_rows = db.execute(orders_query(user_id, order_number, limit)).all()
+    if not order_rows:
+        return []
+    item_rows = db.execute(items_query([row.id for row in order_rows])).all()
+    return _assemble(order_rows, item_rows)
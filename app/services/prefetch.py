@@ -0,0 +1,200 @@
+from app.core.config import settings
+from app.services.catalog_index import catalog_index, find_product
+from app.services.intent_router import ORDER_NUMBER_RE, intent_router
+from app.services.order_read_model import OrderView, get_latest_order, order_status_query
+from app.utils.response_cache import may_request_mutation, normalize_message
+from dataclasses import dataclass
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+import asyncio
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Wording that usually ends in a "Check order status" action
+_ORDER_TALK_RE = re.compile(r"\b(order|orders|status|track|tracking|delivery|delivered|shipped|package|parcel)\b")
+
+@dataclass(frozen=True)
+class PrefetchPlan:
+    """The reads a message is likely to need once the model has picked an action"""
+    __slots__ = ("latest_order", "order_numbers", "products")
+
+    latest_order: bool
+    order_numbers: Tuple[str, ...]
+    products: Tuple[str, ...]
+
+    def keys(self) -> Set[Hashable]:
+        keys: Set[Hashable] = {("order_status", number) for number in self.order_numbers}
+        keys.update(("product", name.lower()) for name in self.products)
+        if self.latest_order:
+            keys.add(("latest_order", None))
+        return keys
+
+def plan_prefetch(message: str) -> PrefetchPlan:
+    """
+    Guess the reads a message will need
+
+    Order numbers in the message are looked up for a cancellation; order
+    talk that isn't a purchase or cancellation loads the latest order for a
+    status check. Product names only cost a query while the catalog index
+    isn't loaded, so they are only prefetched then.
+    """
+    order_numbers = tuple(dict.fromkeys(match.upper() for match in ORDER_NUMBER_RE.findall(message)))
+    latest_order = (
+        _ORDER_TALK_RE.search(normalize_message(message)) is not None
+        and not may_request_mutation(message)
+    )
+    products = () if catalog_index.loaded else tuple(intent_router.find_products(message))
+    return PrefetchPlan(latest_order=latest_order, order_numbers=order_numbers, products=products)
+
+class Prefetcher:
+    """
+    Process-wide switch and counters for speculative prefetching
+
+    hits/misses count handler reads a started prefetch did or didn't
+    cover, unused counts prefetched reads no handler asked for. wait_seconds is
+    the part of fetch_seconds handlers still had to wait for; the rest was
+    hidden behind the model call.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "unused": 0,
+            "cancelled": 0,
+            "errors": 0,
+            "fetch_seconds": 0.0,
+            "wait_seconds": 0.0,
+        }
+
+    def reads(self, message: str = "", engine: Optional[AsyncEngine] = None, user_id: Optional[int] = None) -> "Prefetch":
+        """Reads for one request on behalf of `user_id`; nothing is fetched until start() is called"""
+        return Prefetch(self, message, engine, user_id)
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            reads = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "enabled": self.enabled,
+                "hit_rate": self._stats["hits"] / reads if reads else 0.0,
+                "hidden_seconds": max(self._stats["fetch_seconds"] - self._stats["wait_seconds"], 0.0),
+            }
+
+class Prefetch:
+    """
+    The reads of one chat request, started early where they can be guessed
+
+    start() runs the planned reads in a session of their own while the
+    model call is in flight. Handlers then read through latest_order(),
+    order_status() and product(): a read the prefetch covered is served
+    from it, anything else goes to the handler's session as before. The
+    data is at most one model call old, and writes always re-check it
+    (stock reservations and cancellations are conditional updates).
+    Order reads only see orders of `user_id` when one is given.
+    """
+
+    def __init__(
+        self,
+        owner: Prefetcher,
+        message: str = "",
+        engine: Optional[AsyncEngine] = None,
+        user_id: Optional[int] = None,
+    ):
+        self._owner = owner
+        self._message = message
+        self._engine = engine
+        self.user_id = user_id
+        self._keys: Set[Hashable] = set()
+        self._used: Set[Hashable] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> bool:
+        """Start the planned reads in the background; returns whether anything was started"""
+        if not self._owner.enabled or self._engine is None or self._task is not None:
+            return False
+        plan = plan_prefetch(self._message)
+        self._keys = plan.keys()
+        if not self._keys:
+            return False
+        self._task = asyncio.ensure_future(self._fetch(plan))
+        self._owner._count("started")
+        return True
+
+    async def _fetch(self, plan: PrefetchPlan) -> Dict[Hashable, Any]:
+        start = time.perf_counter()
+        results: Dict[Hashable, Any] = {}
+        async with AsyncSession(self._engine, expire_on_commit=False) as session:
+            if plan.latest_order:
+                results[("latest_order", None)] = await get_latest_order(session, self.user_id)
+            for number in plan.order_numbers:
+                results[("order_status", number)] = (
+                    await session.execute(order_status_query(number, self.user_id))
+                ).first()
+            for name in plan.products:
+                results[("product", name.lower())] = await find_product(session, name)
+        self._owner._count("fetch_seconds", time.perf_counter() - start)
+        return results
+
+    async def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        if self._task is None:
+            return False, None
+        if key not in self._keys:
+            self._owner._count("misses")
+            return False, None
+        start = time.perf_counter()
+        try:
+            results = await asyncio.shield(self._task)
+        except Exception as e:
+            logger.warning("Prefetch failed, reading directly: %s", e)
+            self._owner._count("misses")
+            return False, None
+        finally:
+            self._owner._count("wait_seconds", time.perf_counter() - start)
+        self._used.add(key)
+        self._owner._count("hits")
+        return True, results[key]
+
+    async def latest_order(self, db: AsyncSession) -> Optional[OrderView]:
+        hit, order = await self._lookup(("latest_order", None))
+        return order if hit else await get_latest_order(db, self.user_id)
+
+    async def order_status(self, db: AsyncSession, order_number: str):
+        """The (id, status) row of an order, or None"""
+        hit, row = await self._lookup(("order_status", order_number))
+        return row if hit else (await db.execute(order_status_query(order_number, self.user_id))).first()
+
+    async def product(self, db: AsyncSession, product_name: str):
+        hit, product = await self._lookup(("product", product_name.lower()))
+        return product if hit else await find_product(db, product_name)
+
+    def close(self) -> None:
+        """Count the outcome once the prefetch is done; reads nobody used are counted as unused"""
+        if self._task is None:
+            return
+        # A read still running is left to finish: cancelling it mid-query would discard the connection
+        if self._task.done():
+            self._settle(self._task)
+        else:
+            self._task.add_done_callback(self._settle)
+
+    def _settle(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self._owner._count("cancelled")
+        elif task.exception() is not None:
+            self._owner._count("errors")
+        else:
+            self._owner._count("unused", len(self._keys - self._used))
+
+prefetcher = Prefetcher(enabled=settings.PREFETCH_ENABLED)
@@ -11,8 +11,8 @@ async function sendMessage() {
     input.value = '';
     
     try {
-        // Send message to backend
-        const response = await fetch('/api/chat', {
+        // Stream the reply from the backend as newline-delimited JSON
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -23,18 +23,47 @@ async function sendMessage() {
             })
         });
         
-        const data = await response.json();
+        // Show the agent message as soon as the first text arrives
+        const messageContent = addMessage('', 'agent');
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let finalFrame = null;
         
-        // Add agent response to chat
-        addMessage(data.response, 'agent');
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const frame = JSON.parse(line);
+                if (frame.type === 'delta') {
+                    messageContent.textContent += frame.text;
+                    scrollToBottom();
+                } else if (frame.type === 'final') {
+                    finalFrame = frame;
+                }
+            }
+        }
+        
+        if (!finalFrame) {
+            throw new Error('Stream ended without a final frame');
+        }
+        
+        // The final frame carries the response after any database work
+        messageContent.textContent = finalFrame.response;
         
         // Update debug info
-        updateDebugInfo(data.debug_info);
+        updateDebugInfo(finalFrame.debug_info);
         
         // Update conversation history
         conversationHistory.push(
             { role: 'user', content: message },
-            { role: 'assistant', content: data.response }
+            { role: 'assistant', content: finalFrame.response }
         );
         
     } catch (error) {
@@ -56,6 +85,13 @@ function addMessage(content, sender) {
     messagesDiv.appendChild(messageDiv);
     
     // Scroll to bottom
+    scrollToBottom();
+    
+    return messageContent;
+}
+
+function scrollToBottom() {
+    const messagesDiv = document.getElementById('chatMessages');
     messagesDiv.scrollTop = messagesDiv.scrollHeight;
 }
 
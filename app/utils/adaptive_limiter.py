@@ -0,0 +1,160 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple, Type
+import asyncio
+import time
+
+class OverloadedError(RuntimeError):
+    """Raised when a call is shed instead of waiting for a concurrency slot"""
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for calls to a rate-limited upstream
+
+    The limit grows by about one slot per limit's worth of successful calls
+    while it is fully used, and is multiplied by `backoff_ratio` when a call
+    fails with one of `overload_errors` (e.g. 429s) or takes longer than
+    `latency_target`. Only calls that started after the last decrease can
+    trigger another, so one burst of slow calls shrinks the limit once.
+
+    Callers beyond the limit wait in a FIFO queue of at most `max_queue`
+    entries until their deadline (`queue_timeout` from now by default).
+    A full queue or a missed deadline raises OverloadedError right away,
+    so callers can answer with a fallback instead of piling up.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 32,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        max_queue: int = 512,
+        queue_timeout: float = 2.0,
+        latency_target: float = 10.0,
+        backoff_ratio: float = 0.5,
+        overload_errors: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.overload_errors = overload_errors
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self._stats = {
+            "acquired": 0,
+            "queued": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "overloads": 0,
+            "slow_calls": 0,
+            "decreases": 0,
+        }
+
+    def _has_capacity(self) -> bool:
+        return self._in_flight < int(self.limit)
+
+    async def acquire(self, deadline: Optional[float] = None) -> float:
+        """
+        Take a slot, waiting until `deadline` (a time.monotonic() value)
+
+        Returns the time the slot was taken, to pass back to release().
+        """
+        if not self._waiters and self._has_capacity():
+            self._in_flight += 1
+            self._stats["acquired"] += 1
+            return time.monotonic()
+
+        if len(self._waiters) >= self.max_queue:
+            self._stats["shed_queue_full"] += 1
+            raise OverloadedError(f"{len(self._waiters)} calls already waiting")
+        if deadline is None:
+            deadline = time.monotonic() + self.queue_timeout
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            self._stats["shed_deadline"] += 1
+            raise OverloadedError("Deadline passed before a slot was free")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        try:
+            await asyncio.wait((waiter,), timeout=timeout)
+        except asyncio.CancelledError:
+            # A slot handed over just as the caller went away goes to the next waiter
+            if waiter.done():
+                self._in_flight -= 1
+                self._wake()
+            else:
+                self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            self._stats["shed_deadline"] += 1
+            raise OverloadedError(f"No slot free within {timeout:.2f}s")
+        self._stats["acquired"] += 1
+        return time.monotonic()
+
+    def release(self, started_at: float, overloaded: bool = False) -> None:
+        """Return a slot and adjust the limit from how the call went"""
+        saturated = self._in_flight >= int(self.limit)
+        self._in_flight -= 1
+        now = time.monotonic()
+        slow = now - started_at > self.latency_target
+        if overloaded or slow:
+            self._stats["overloads" if overloaded else "slow_calls"] += 1
+            if started_at >= self._last_decrease:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+                self._last_decrease = now
+                self._stats["decreases"] += 1
+        elif saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._wake()
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        """Drop a waiter that gave up, so it no longer counts against the queue"""
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        # Capacity may have been left idle behind the departed waiter
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters in arrival order"""
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a slot for the body of the block; overload errors raised in it shrink the limit"""
+        started_at = await self.acquire(deadline)
+        overloaded = False
+        try:
+            yield
+        except self.overload_errors:
+            overloaded = True
+            raise
+        finally:
+            self.release(started_at, overloaded)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current limit, queue depth and shedding counters"""
+        return {
+            **self._stats,
+            "limit": round(self.limit, 2),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "max_queue": self.max_queue,
+        }
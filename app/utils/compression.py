@@ -0,0 +1,51 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.http_cache import add_vary
+import gzip
+import io
+
+class _SyncFlushGzipFile(gzip.GzipFile):
+    """A GzipFile whose every write ends on a flushed, decodable block"""
+
+    def write(self, data) -> int:
+        written = super().write(data)
+        if written:
+            self.flush()
+        return written
+
+class _StreamingGZipResponder(GZipResponder):
+    def __init__(self, app: ASGIApp, minimum_size: int, compresslevel: int = 9) -> None:
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        # Swap in a flushing file; the parent's is closed while its buffer is still unused
+        self.gzip_file.close()
+        self.gzip_buffer = io.BytesIO()
+        self.gzip_file = _SyncFlushGzipFile(mode="wb", fileobj=self.gzip_buffer, compresslevel=compresslevel)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Starlette appends Accept-Encoding to Vary even when the app already set it
+        async def send_with_merged_vary(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                add_vary(MutableHeaders(raw=message["headers"]))
+            await send(message)
+
+        await super().__call__(scope, receive, send_with_merged_vary)
+
+class StreamingGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that doesn't hold back streamed responses
+
+    Starlette's responder keeps streamed chunks in the compressor until it
+    has a full block, so NDJSON chat frames would arrive all at once at the
+    end. Here each chunk is sync-flushed and reaches the client as soon as
+    it is produced, at the cost of a few bytes per chunk. Responses that
+    already carry a Content-Encoding (precompressed static files) pass
+    through untouched.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _StreamingGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,133 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import asyncio
+import math
+import threading
+import time
+
+T = TypeVar("T")
+
+def deadline_in(seconds: float) -> float:
+    """A deadline `seconds` from now, as a time.monotonic() value"""
+    return time.monotonic() + seconds
+
+def time_left(deadline: float) -> float:
+    """Seconds until `deadline`, never negative"""
+    return max(0.0, deadline - time.monotonic())
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls, for percentile lookups"""
+
+    def __init__(self, size: int = 512, min_samples: int = 50):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile (nearest rank), or None until enough calls have been seen"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+class Hedger:
+    """
+    Runs a call against a deadline, optionally hedging slow calls
+
+    With hedging enabled, a call that hasn't answered by the `percentile`
+    latency of recent calls gets a second, identical call. Whichever
+    succeeds first wins and the other is cancelled. If one call fails,
+    the other is still awaited. Hedging waits until the window has
+    `min_samples` latencies, so only the slowest few percent of calls
+    cost a second request.
+
+    The call is given a queue deadline for its concurrency slot: None for
+    the first call (wait as usual) and "now" for the hedge, so a hedge is
+    only sent when a slot is free right away.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = 95.0, window: Optional[LatencyWindow] = None):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.latencies = window or LatencyWindow()
+        self._stats = {
+            "calls": 0,
+            "timeouts": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+        }
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging, or None when hedging is off"""
+        if not self.enabled:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    async def run(self, call: Callable[[Optional[float]], Awaitable[T]], deadline: float) -> T:
+        """
+        Await `call`, raising asyncio.TimeoutError once `deadline` passes
+
+        Args:
+            call: Makes one attempt; takes the queue deadline for its slot
+            deadline: time.monotonic() value by which an answer is needed
+        """
+        self._stats["calls"] += 1
+        primary = asyncio.ensure_future(self._timed(call, None))
+        attempts = [primary]
+        try:
+            delay = self.hedge_delay()
+            if delay is not None and delay < time_left(deadline):
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    self._stats["hedges"] += 1
+                    attempts.append(asyncio.ensure_future(self._timed(call, time.monotonic())))
+
+            pending = set(attempts)
+            primary_error: Optional[BaseException] = None
+            hedge_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=time_left(deadline), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    self._stats["timeouts"] += 1
+                    raise asyncio.TimeoutError("Deadline passed before the model answered")
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not primary:
+                            self._stats["hedge_wins"] += 1
+                        return attempt.result()
+                    # Report the first call's error; a shed hedge is not the interesting failure
+                    if attempt is primary:
+                        primary_error = attempt.exception()
+                    else:
+                        hedge_error = attempt.exception()
+            raise primary_error or hedge_error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _timed(self, call: Callable[[Optional[float]], Awaitable[T]], queue_deadline: Optional[float]) -> T:
+        start = time.monotonic()
+        result = await call(queue_deadline)
+        self.latencies.record(time.monotonic() - start)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hedging counters and the current hedge delay"""
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "hedge_delay_seconds": self.hedge_delay(),
+            "samples": len(self.latencies),
+        }
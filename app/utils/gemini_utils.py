@@ -1,36 +1,293 @@
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from app.core.config import settings
+from app.schemas.agent import ActionType, AgentReply, response_schema
+from app.utils.adaptive_limiter import AdaptiveLimiter
+from app.utils.deadlines import Hedger, LatencyWindow, deadline_in, time_left
+from app.utils.prompt_builder import is_customer_turn
+from app.utils.replay_store import ReplayMissError, ReplayStore
+from pydantic import ValidationError
+import asyncio
 import json
-from typing import Dict, List, Optional
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Adaptive cap on the Gemini calls in flight per worker. The limit backs off
+# on 429s and slow calls; calls that can't get a slot before the queue
+# deadline raise OverloadedError instead of waiting.
+gemini_limiter = AdaptiveLimiter(
+    initial_limit=settings.GEMINI_INITIAL_CONCURRENT_REQUESTS,
+    min_limit=settings.GEMINI_MIN_CONCURRENT_REQUESTS,
+    max_limit=settings.GEMINI_MAX_CONCURRENT_REQUESTS,
+    max_queue=settings.GEMINI_QUEUE_SIZE,
+    queue_timeout=settings.GEMINI_QUEUE_TIMEOUT_SECONDS,
+    latency_target=settings.GEMINI_LATENCY_TARGET_SECONDS,
+    overload_errors=(
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+    ),
+)
+
+JSON_INSTRUCTIONS = f"""
+IMPORTANT: You MUST respond in valid JSON format with the following structure:
+{{
+    "response": "Your response to the customer",
+    "action_needed": "action_type or null",
+    "action_data": {{}} or null
+}}
+
+action_needed must be one of: {", ".join(action.value for action in ActionType)}; use null for anything else.
+action_data may contain product, quantity, shipping_address, payment_method and order_number.
+
+Do not include any text outside of the JSON structure.
+"""
+
+# Native JSON mode: the reply is constrained to the AgentReply schema
+_STRUCTURED_OUTPUT_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": response_schema(),
+}
+
+def structured_output_config() -> Optional[Dict[str, Any]]:
+    """Generation config requesting schema-constrained JSON, or None when GEMINI_JSON_MODE is off"""
+    return _STRUCTURED_OUTPUT_CONFIG if settings.GEMINI_JSON_MODE else None
 
 def configure_gemini():
     """Configure the Gemini API with the API key"""
     genai.configure(api_key=settings.GEMINI_API_KEY)
 
-def get_gemini_model(model_name: str = "gemini-2.0-flash"):
-    """Get a Gemini model instance"""
-    return genai.GenerativeModel(model_name)
+class GeminiModelRegistry:
+    """
+    Process-wide registry of configured Gemini model clients
+    
+    The API client is configured once and each model is built once per
+    (model name, generation config, system instruction), so chat turns
+    reuse the same client and its open transport instead of repeating the
+    setup.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str, Optional[str]], genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+        self._configured = False
+        self._stats = {
+            "configure_calls": 0,
+            "models_created": 0,
+            "model_reuses": 0,
+            "setup_seconds": 0.0,
+            "warmups": 0,
+            "warmup_failures": 0,
+            "last_warmup_seconds": None,
+        }
+
+    @staticmethod
+    def _config_key(generation_config: Optional[Dict[str, Any]]) -> str:
+        return json.dumps(generation_config or {}, sort_keys=True, default=str)
+
+    def configure(self) -> None:
+        """Configure the Gemini API client if it hasn't been configured yet"""
+        with self._lock:
+            if self._configured:
+                return
+            start = time.perf_counter()
+            configure_gemini()
+            self._configured = True
+            self._stats["configure_calls"] += 1
+            self._stats["setup_seconds"] += time.perf_counter() - start
+
+    def get_model(
+        self,
+        model_name: str = "gemini-2.0-flash",
+        generation_config: Optional[Dict[str, Any]] = None,
+        system_instruction: Optional[str] = None
+    ) -> genai.GenerativeModel:
+        """Return the shared model for this name, config and instruction, creating it on first use"""
+        key = (model_name, self._config_key(generation_config), system_instruction)
+        model = self._models.get(key)
+        if model is not None:
+            self._stats["model_reuses"] += 1
+            return model
+
+        self.configure()
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                if system_instruction is None:
+                    model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                else:
+                    model = genai.GenerativeModel(
+                        model_name,
+                        generation_config=generation_config,
+                        system_instruction=system_instruction,
+                    )
+                self._models[key] = model
+                self._stats["models_created"] += 1
+                self._stats["setup_seconds"] += time.perf_counter() - start
+            else:
+                self._stats["model_reuses"] += 1
+        return model
+
+    async def warm_up(
+        self,
+        model_name: str = "gemini-2.0-flash",
+        generation_config: Optional[Dict[str, Any]] = None,
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Open the model's connection ahead of the first chat turn
+        
+        Sends a cheap count_tokens request so the async transport is
+        established at startup. Failures, including a request that takes
+        longer than `timeout` (GEMINI_WARMUP_TIMEOUT_SECONDS by default), are
+        logged rather than raised so the app can still start when Gemini is
+        unreachable.
+        """
+        if timeout is None:
+            timeout = settings.GEMINI_WARMUP_TIMEOUT_SECONDS
+        model = self.get_model(model_name, generation_config, system_instruction)
+        start = time.perf_counter()
+        self._stats["warmups"] += 1
+        try:
+            await asyncio.wait_for(model.count_tokens_async("ping"), timeout)
+        except asyncio.TimeoutError:
+            self._stats["warmup_failures"] += 1
+            logger.warning("Gemini warm-up for %s timed out after %.1fs", model_name, timeout)
+            return False
+        except Exception as e:
+            self._stats["warmup_failures"] += 1
+            logger.warning("Gemini warm-up for %s failed: %s", model_name, e)
+            return False
+        finally:
+            self._stats["last_warmup_seconds"] = time.perf_counter() - start
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return setup and reuse counters for the registry"""
+        return {
+            **self._stats,
+            "configured": self._configured,
+            "models": [
+                {
+                    "model_name": name,
+                    "generation_config": json.loads(config),
+                    "system_instruction_chars": len(instruction) if instruction else 0,
+                }
+                for name, config, instruction in self._models
+            ],
+        }
+
+    def clear(self) -> None:
+        """Drop all cached models so the next call reconfigures the client"""
+        with self._lock:
+            self._models.clear()
+            self._configured = False
+
+model_registry = GeminiModelRegistry()
+
+class TokenUsage:
+    """
+    Running totals of the token counts Gemini reports per call
+
+    Read from each response's usage_metadata, so these are the billed
+    counts rather than estimates. cached_tokens is the part of the prompt
+    served from provider-side context caching, if any.
+    """
+
+    _FIELDS = (
+        ("prompt_tokens", "prompt_token_count"),
+        ("cached_tokens", "cached_content_token_count"),
+        ("output_tokens", "candidates_token_count"),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._calls = 0
+        self._totals = {name: 0 for name, _ in self._FIELDS}
+        self._max_prompt_tokens = 0
+        self._last: Optional[Dict[str, int]] = None
+
+    def record(self, usage_metadata: Any) -> None:
+        """Add one response's usage_metadata; responses without it are ignored"""
+        if usage_metadata is None:
+            return
+        counts = {name: int(getattr(usage_metadata, field, 0) or 0) for name, field in self._FIELDS}
+        with self._lock:
+            self._calls += 1
+            for name, value in counts.items():
+                self._totals[name] += value
+            self._max_prompt_tokens = max(self._max_prompt_tokens, counts["prompt_tokens"])
+            self._last = counts
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._calls
+            return {
+                "calls": calls,
+                **{f"{name}_total": value for name, value in self._totals.items()},
+                "prompt_tokens_avg": self._totals["prompt_tokens"] / calls if calls else 0.0,
+                "prompt_tokens_max": self._max_prompt_tokens,
+                "last": self._last,
+            }
+
+token_usage = TokenUsage()
+
+# Deadline enforcement for async calls, plus an optional second call for
+# the ones slower than GEMINI_HEDGE_PERCENTILE of recent calls
+gemini_hedger = Hedger(
+    enabled=settings.GEMINI_HEDGE_ENABLED,
+    percentile=settings.GEMINI_HEDGE_PERCENTILE,
+    window=LatencyWindow(min_samples=settings.GEMINI_HEDGE_MIN_SAMPLES),
+)
+
+# Record/replay of raw responses (GEMINI_REPLAY_MODE): "record" stores every
+# live response by prompt hash, "replay" serves only stored responses so
+# recorded conversations can be re-run offline against new builds.
+replay_store = ReplayStore(settings.GEMINI_REPLAY_PATH, mode=settings.GEMINI_REPLAY_MODE)
+
+def _replay_prompt(prompt: str, system_instruction: Optional[str]) -> str:
+    """The text recordings are keyed by; includes the system instruction when one is sent"""
+    return prompt if system_instruction is None else f"{system_instruction}\n\n{prompt}"
+
+def _replayed_text(model_name: str, full_prompt: str) -> Optional[str]:
+    """The recorded response in replay mode, None otherwise; a replay miss raises ReplayMissError"""
+    if replay_store.mode != "replay":
+        return None
+    text = replay_store.get(model_name, full_prompt)
+    if text is None:
+        key = ReplayStore.make_key(model_name, full_prompt).hex()
+        raise ReplayMissError(f"No recorded {model_name} response for prompt {key}")
+    return text
+
+def _record(model_name: str, full_prompt: str, text: str) -> None:
+    if replay_store.mode == "record":
+        replay_store.put(model_name, full_prompt, text)
+
+def get_gemini_model(model_name: str = "gemini-2.0-flash", system_instruction: Optional[str] = None):
+    """Get the shared Gemini model instance from the registry"""
+    return model_registry.get_model(model_name, structured_output_config(), system_instruction)
 
 def format_conversation_history(history: List[Dict]) -> str:
     """Format conversation history for the prompt"""
     return "\n".join([
-        f"{'Customer' if msg['is_from_user'] else 'Agent'}: {msg['content']}"
+        f"{'Customer' if is_customer_turn(msg) else 'Agent'}: {msg['content']}"
         for msg in history[-5:]  # Last 5 messages for context
     ])
 
 def format_prompt_for_json(base_prompt: str, conversation_history: Optional[List[Dict]] = None) -> str:
     """Format the prompt to explicitly request JSON output"""
     # Add JSON formatting instructions to the prompt
-    json_instructions = """
-    IMPORTANT: You MUST respond in valid JSON format with the following structure:
-    {
-        "response": "Your response to the customer",
-        "action_needed": "action_type or null",
-        "action_data": {} or null
-    }
-    
-    Do not include any text outside of the JSON structure.
-    """
+    json_instructions = JSON_INSTRUCTIONS
     
     # Add conversation history if provided
     if conversation_history:
@@ -39,36 +296,82 @@ def format_prompt_for_json(base_prompt: str, conversation_history: Optional[List
     
     return f"{base_prompt}\n{json_instructions}"
 
+class ReplyParser:
+    """
+    Decodes model replies into AgentReply, counting how each one went
+    
+    Schema-constrained replies are decoded and validated in one pass by
+    pydantic's native JSON parser. Anything else (fenced or chatty text,
+    recordings made before JSON mode, unknown actions) goes through the
+    salvage path: the outermost {...} is parsed and unknown actions are
+    dropped. Replies that still don't fit are returned as plain text
+    with no action and counted as failures.
+    """
+
+    _ACTIONS = {action.value for action in ActionType}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"parsed": 0, "salvaged": 0, "unknown_actions": 0, "failed": 0}
+
+    def parse(self, response_text: str) -> AgentReply:
+        try:
+            reply = AgentReply.model_validate_json(response_text)
+        except ValidationError:
+            return self._salvage(response_text)
+        self._count("parsed")
+        return reply
+
+    def _salvage(self, response_text: str) -> AgentReply:
+        start = response_text.find("{")
+        end = response_text.rfind("}") + 1
+        data = None
+        if 0 <= start < end:
+            try:
+                data = json.loads(response_text[start:end])
+            except ValueError:
+                pass
+        if isinstance(data, dict):
+            action = data.get("action_needed")
+            if action is not None and action not in self._ACTIONS:
+                self._count("unknown_actions")
+                data["action_needed"] = None
+            try:
+                reply = AgentReply.model_validate(data)
+            except ValidationError:
+                pass
+            else:
+                self._count("salvaged")
+                return reply
+        self._count("failed")
+        logger.warning("Unparseable model reply (%d chars)", len(response_text))
+        return AgentReply(response=response_text)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return parse outcome counters"""
+        with self._lock:
+            total = self._stats["parsed"] + self._stats["salvaged"] + self._stats["failed"]
+            return {
+                **self._stats,
+                "salvage_rate": self._stats["salvaged"] / total if total else 0.0,
+                "failure_rate": self._stats["failed"] / total if total else 0.0,
+            }
+
+reply_parser = ReplyParser()
+
 def parse_gemini_response(response_text: str) -> Dict:
     """Parse the Gemini response into a structured format"""
-    # Try to find JSON in the response
-    try:
-        # First attempt: try to parse the entire response as JSON
-        return json.loads(response_text)
-    except json.JSONDecodeError:
-        # Second attempt: try to find JSON within the response
-        try:
-            # Look for JSON-like structure
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = response_text[start_idx:end_idx]
-                return json.loads(json_str)
-        except (json.JSONDecodeError, ValueError):
-            pass
-        
-        # If all attempts fail, create a structured response
-        return {
-            "response": response_text,
-            "action_needed": None,
-            "action_data": None
-        }
+    return reply_parser.parse(response_text).to_dict()
 
 def generate_structured_response(
     prompt: str,
     conversation_history: Optional[List[Dict]] = None,
-    model_name: str = "gemini-2.0-flash"
+    model_name: str = "gemini-2.0-flash",
+    system_instruction: Optional[str] = None
 ) -> Dict:
     """
     Generate a structured response from Gemini
@@ -77,21 +380,160 @@ def generate_structured_response(
         prompt: The system prompt or base prompt
         conversation_history: Optional conversation history
         model_name: The Gemini model to use
+        system_instruction: Optional static prefix sent as the model's
+            system instruction; when given, `prompt` is sent as is
         
     Returns:
         A structured response dictionary
     """
-    # Configure Gemini
-    configure_gemini()
+    # Format the prompt with JSON instructions, unless they travel in the system instruction
+    if system_instruction is None:
+        full_prompt = format_prompt_for_json(prompt, conversation_history)
+    else:
+        full_prompt = prompt
+    replay_key = _replay_prompt(full_prompt, system_instruction)
     
-    # Get the model
-    model = get_gemini_model(model_name)
+    replayed = _replayed_text(model_name, replay_key)
+    if replayed is not None:
+        return parse_gemini_response(replayed)
     
-    # Format the prompt with JSON instructions
-    full_prompt = format_prompt_for_json(prompt, conversation_history)
+    # Get the shared, already configured model
+    model = get_gemini_model(model_name, system_instruction)
     
     # Generate response
-    response = model.generate_content(full_prompt)
+    response = model.generate_content(full_prompt, request_options={"timeout": settings.GEMINI_TIMEOUT_SECONDS})
+    token_usage.record(getattr(response, "usage_metadata", None))
+    _record(model_name, replay_key, response.text)
     
     # Parse and return the response
-    return parse_gemini_response(response.text) 
\ No newline at end of file
+    return parse_gemini_response(response.text)
+
+async def generate_structured_response_async(
+    prompt: str,
+    conversation_history: Optional[List[Dict]] = None,
+    model_name: str = "gemini-2.0-flash",
+    system_instruction: Optional[str] = None,
+    deadline: Optional[float] = None
+) -> Dict:
+    """
+    Generate a structured response from Gemini without blocking the event loop
+    
+    Uses the SDK's async client, so other requests on the same worker keep
+    being served while the model is generating. Calls go through
+    gemini_limiter and raise OverloadedError when they are shed, and raise
+    asyncio.TimeoutError once the deadline passes. Slow calls may be
+    hedged by gemini_hedger.
+    
+    Args:
+        prompt: The system prompt or base prompt
+        conversation_history: Optional conversation history
+        model_name: The Gemini model to use
+        system_instruction: Optional static prefix sent as the model's
+            system instruction; when given, `prompt` is sent as is
+        deadline: time.monotonic() value to answer by; defaults to
+            GEMINI_TIMEOUT_SECONDS from now
+        
+    Returns:
+        A structured response dictionary
+    """
+    if deadline is None:
+        deadline = deadline_in(settings.GEMINI_TIMEOUT_SECONDS)
+    
+    # Format the prompt with JSON instructions, unless they travel in the system instruction
+    if system_instruction is None:
+        full_prompt = format_prompt_for_json(prompt, conversation_history)
+    else:
+        full_prompt = prompt
+    replay_key = _replay_prompt(full_prompt, system_instruction)
+    
+    replayed = _replayed_text(model_name, replay_key)
+    if replayed is not None:
+        return parse_gemini_response(replayed)
+    
+    # Get the shared, already configured model
+    model = get_gemini_model(model_name, system_instruction)
+    
+    # Generate response, waiting for a free slot if the limit is reached
+    async def attempt(queue_deadline: Optional[float]):
+        async with gemini_limiter.slot(queue_deadline):
+            return await model.generate_content_async(
+                full_prompt,
+                request_options={"timeout": time_left(deadline)}
+            )
+    
+    response = await gemini_hedger.run(attempt, deadline)
+    token_usage.record(getattr(response, "usage_metadata", None))
+    _record(model_name, replay_key, response.text)
+    
+    # Parse and return the response
+    return parse_gemini_response(response.text)
+
+async def stream_structured_response_async(
+    prompt: str,
+    conversation_history: Optional[List[Dict]] = None,
+    model_name: str = "gemini-2.0-flash",
+    system_instruction: Optional[str] = None,
+    deadline: Optional[float] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the raw text of a structured Gemini response as it is generated
+    
+    Yields text chunks in arrival order. The concurrency slot is held until
+    the stream is exhausted or closed. Waiting past the deadline for the
+    next chunk raises asyncio.TimeoutError; streams are never hedged since
+    their first chunks have already been sent on.
+    
+    Args:
+        prompt: The system prompt or base prompt
+        conversation_history: Optional conversation history
+        model_name: The Gemini model to use
+        system_instruction: Optional static prefix sent as the model's
+            system instruction; when given, `prompt` is sent as is
+        deadline: time.monotonic() value by which the stream must finish;
+            defaults to GEMINI_TIMEOUT_SECONDS from now
+    """
+    if deadline is None:
+        deadline = deadline_in(settings.GEMINI_TIMEOUT_SECONDS)
+    
+    # Format the prompt with JSON instructions, unless they travel in the system instruction
+    if system_instruction is None:
+        full_prompt = format_prompt_for_json(prompt, conversation_history)
+    else:
+        full_prompt = prompt
+    replay_key = _replay_prompt(full_prompt, system_instruction)
+    
+    replayed = _replayed_text(model_name, replay_key)
+    if replayed is not None:
+        yield replayed
+        return
+    
+    # Get the shared, already configured model
+    model = get_gemini_model(model_name, system_instruction)
+    
+    received = []
+    async with gemini_limiter.slot():
+        response = await asyncio.wait_for(
+            model.generate_content_async(
+                full_prompt,
+                stream=True,
+                request_options={"timeout": time_left(deadline)}
+            ),
+            time_left(deadline)
+        )
+        chunks = response.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), time_left(deadline))
+            except StopAsyncIteration:
+                break
+            # Chunks without text parts (e.g. the final finish_reason chunk) raise here
+            try:
+                text = chunk.text
+            except ValueError:
+                continue
+            if text:
+                received.append(text)
+                yield text
+    # Usage metadata is final once the stream is exhausted; only complete streams are recorded
+    token_usage.record(getattr(response, "usage_metadata", None))
+    _record(model_name, replay_key, "".join(received))
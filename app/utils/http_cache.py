@@ -0,0 +1,40 @@
+from datetime import datetime
+from fastapi import Response
+from starlette.datastructures import MutableHeaders
+from typing import Any, Optional
+import hashlib
+
+def make_etag(*parts: Any) -> str:
+    """A weak ETag over the given values (ids, updated_at timestamps, ...)"""
+    raw = "|".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def cache_control(max_age: int, stale_while_revalidate: int = 0, public: bool = True) -> str:
+    directives = ["public" if public else "private", f"max-age={max_age}"]
+    if stale_while_revalidate:
+        directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+    return ", ".join(directives)
+
+def not_modified(etag: str, cache_control_value: str) -> Response:
+    """A 304 carrying the validators a cache needs to keep serving its copy"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control_value})
+
+def add_vary(headers: MutableHeaders, *tokens: str) -> None:
+    """Merge `tokens` into Vary, collapsing repeated Vary headers and tokens into one header"""
+    merged = []
+    for value in headers.getlist("vary") + list(tokens):
+        for token in value.split(","):
+            token = token.strip()
+            if token and token.lower() not in (existing.lower() for existing in merged):
+                merged.append(token)
+    if merged:
+        headers["Vary"] = ", ".join(merged)
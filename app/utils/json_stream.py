@@ -0,0 +1,135 @@
+from typing import Optional
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+class IncrementalFieldExtractor:
+    """
+    Pull a top-level string field out of a JSON object while it is still being generated
+
+    Feed raw model output chunk by chunk. Each call to feed() returns the
+    decoded characters of the target field that became available with that
+    chunk, so they can be forwarded to the client straight away. Anything
+    before the first "{" (such as a Markdown code fence) is ignored, and once
+    the object closes `complete` is set and `raw` holds the object text for a
+    full parse.
+    """
+
+    def __init__(self, field: str = "response"):
+        self.field = field
+        self.complete = False
+        self._parts = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = None
+        self._pending_surrogate = None
+        self._expect_key = False
+        self._key_chars = None
+        self._last_key = None
+        self._in_target = False
+
+    @property
+    def raw(self) -> str:
+        """The object text seen so far, starting at its opening brace"""
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of model output and return newly decoded field text"""
+        if self.complete or not chunk:
+            return ""
+
+        if not self._started:
+            start = chunk.find("{")
+            if start < 0:
+                return ""
+            chunk = chunk[start:]
+            self._started = True
+
+        out = []
+        consumed = len(chunk)
+        for index, char in enumerate(chunk):
+            if self._in_string:
+                self._consume_string_char(char, out)
+            elif char == '"':
+                self._open_string()
+            elif char in "{[":
+                self._depth += 1
+                self._expect_key = self._depth == 1 and char == "{"
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    consumed = index + 1
+                    break
+            elif self._depth == 1:
+                if char == ",":
+                    self._expect_key = True
+                elif char == ":":
+                    self._expect_key = False
+
+        self._parts.append(chunk[:consumed])
+        return "".join(out)
+
+    def _open_string(self) -> None:
+        self._in_string = True
+        if self._depth != 1:
+            return
+        if self._expect_key:
+            self._key_chars = []
+        else:
+            self._in_target = self._last_key == self.field
+
+    def _close_string(self) -> None:
+        self._in_string = False
+        if self._key_chars is not None:
+            self._last_key = "".join(self._key_chars)
+            self._key_chars = None
+        self._in_target = False
+
+    def _consume_string_char(self, char: str, out: list) -> None:
+        if self._escape is not None:
+            decoded = self._decode_escape(char)
+            if decoded:
+                self._emit(decoded, out)
+            return
+        if char == "\\":
+            self._escape = ""
+        elif char == '"':
+            self._close_string()
+        else:
+            self._emit(char, out)
+
+    def _decode_escape(self, char: str) -> Optional[str]:
+        """Advance the current escape sequence; return its text once complete"""
+        sequence = self._escape + char
+        if sequence[0] != "u":
+            self._escape = None
+            return _SIMPLE_ESCAPES.get(char, char)
+        if len(sequence) < 5:
+            self._escape = sequence
+            return None
+
+        self._escape = None
+        code = int(sequence[1:], 16)
+        if 0xD800 <= code < 0xDC00:
+            self._pending_surrogate = code
+            return None
+        if 0xDC00 <= code < 0xE000 and self._pending_surrogate is not None:
+            code = 0x10000 + ((self._pending_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._pending_surrogate = None
+        return chr(code)
+
+    def _emit(self, text: str, out: list) -> None:
+        if self._key_chars is not None:
+            self._key_chars.append(text)
+        elif self._in_target:
+            out.append(text)
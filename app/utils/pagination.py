@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Any, Tuple
+import base64
+import binascii
+import json
+
+def encode_cursor(*values: Any) -> str:
+    """Encode a keyset position (e.g. created_at, id) as an opaque URL-safe token"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> Tuple:
+    """
+    Decode a token produced by encode_cursor back into typed values
+
+    Raises ValueError if the token is malformed or doesn't match `types`.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for value, expected in zip(payload, types):
+        if expected is datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError) as e:
+                raise ValueError("Invalid cursor") from e
+        elif not isinstance(value, expected):
+            raise ValueError("Invalid cursor")
+        values.append(value)
+    return tuple(values)
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import math
+import re
+import threading
+
+# Gemini averages roughly four characters per token on English text. The
+# estimate only decides how much history fits; billed counts come back in
+# the response's usage metadata.
+CHARS_PER_TOKEN = 4
+
+_BLANK_RUNS_RE = re.compile(r"\n{3,}")
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text` without a count_tokens round trip"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+def compile_instruction(*sections: str) -> str:
+    """Join prompt sections, dropping source-code indentation and extra blank lines"""
+    text = "\n\n".join("\n".join(line.strip() for line in section.strip().splitlines()) for section in sections)
+    return _BLANK_RUNS_RE.sub("\n\n", text)
+
+def is_customer_turn(turn: Dict) -> bool:
+    """Whether a history turn came from the customer; accepts stored messages and chat-widget turns"""
+    if "is_from_user" in turn:
+        return bool(turn["is_from_user"])
+    return turn.get("role") == "user"
+
+@dataclass(frozen=True)
+class BuiltPrompt:
+    """A prompt split into the static system instruction and the per-turn contents"""
+    __slots__ = ("system_instruction", "contents", "context", "history_turns", "dropped_turns", "estimated_tokens")
+
+    system_instruction: str
+    contents: str
+    # The history section of contents, i.e. everything in it but the customer message
+    context: str
+    history_turns: int
+    dropped_turns: int
+    estimated_tokens: int
+
+class PromptBuilder:
+    """
+    Builds per-turn prompts around a precompiled static prefix
+
+    The system prompt and output instructions are compiled once and sent
+    as the model's system instruction, so each turn only carries the
+    conversation context and the customer message. History is filled
+    newest turn first until `history_token_budget` (estimated) tokens are
+    used; older turns are dropped whole.
+    """
+
+    def __init__(self, system_instruction: str, history_token_budget: int = 800):
+        self.system_instruction = system_instruction
+        self.prefix_tokens = estimate_tokens(system_instruction)
+        self.history_token_budget = history_token_budget
+        self._lock = threading.Lock()
+        self._stats = {
+            "prompts": 0,
+            "history_turns_included": 0,
+            "history_turns_dropped": 0,
+            "estimated_tokens_total": 0,
+            "estimated_tokens_max": 0,
+        }
+
+    def build(self, message: str, conversation_history: Optional[List[Dict]] = None) -> BuiltPrompt:
+        history = conversation_history or []
+        lines = []
+        used = 0
+        for turn in reversed(history):
+            line = f"{'Customer' if is_customer_turn(turn) else 'Agent'}: {turn.get('content', '')}"
+            cost = estimate_tokens(line) + 1
+            if used + cost > self.history_token_budget:
+                break
+            lines.append(line)
+            used += cost
+        lines.reverse()
+
+        context = "Current conversation context:\n" + "\n".join(lines) if lines else ""
+        sections = [context] if context else []
+        sections.append(f"Customer message: {message}")
+        contents = "\n\n".join(sections)
+
+        prompt = BuiltPrompt(
+            system_instruction=self.system_instruction,
+            contents=contents,
+            context=context,
+            history_turns=len(lines),
+            dropped_turns=len(history) - len(lines),
+            estimated_tokens=self.prefix_tokens + estimate_tokens(contents),
+        )
+        with self._lock:
+            self._stats["prompts"] += 1
+            self._stats["history_turns_included"] += prompt.history_turns
+            self._stats["history_turns_dropped"] += prompt.dropped_turns
+            self._stats["estimated_tokens_total"] += prompt.estimated_tokens
+            self._stats["estimated_tokens_max"] = max(self._stats["estimated_tokens_max"], prompt.estimated_tokens)
+        return prompt
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            prompts = self._stats["prompts"]
+            return {
+                **self._stats,
+                "prefix_tokens": self.prefix_tokens,
+                "history_token_budget": self.history_token_budget,
+                "estimated_tokens_avg": self._stats["estimated_tokens_total"] / prompts if prompts else 0.0,
+            }
@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so record from a single process there
+    fcntl = None
+
+REPLAY_MODES = ("off", "record", "replay")
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a prompt was never recorded"""
+
+class ReplayStore:
+    """
+    Append-only on-disk store of raw model responses keyed by prompt hash
+
+    Each record is a 20-byte SHA-1 of (model name, prompt), a 4-byte
+    little-endian length and the UTF-8 response text. The file is scanned
+    once on open to build an in-memory key -> (offset, length) index and
+    read through mmap afterwards, so a lookup is a dict hit plus a slice
+    of the mapped file. Records are never rewritten; recording the same
+    prompt again keeps the first response. A torn record at the end of
+    the file (e.g. from a crash mid-write) is cut off on open.
+
+    Several processes (uvicorn workers) may record to the same file. Each
+    append holds an exclusive lock on it and first indexes whatever the
+    other writers appended since, so offsets always match the file and a
+    prompt is recorded once. Lookups that miss re-scan the tail too.
+
+    The file is opened on first use, so a store in "off" mode costs
+    nothing.
+    """
+
+    _HEADER = struct.Struct("<20sI")
+
+    def __init__(self, path: str, mode: str = "off"):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}; expected one of {', '.join(REPLAY_MODES)}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._size = 0
+        self._stats = {"hits": 0, "misses": 0, "recorded": 0, "duplicates": 0}
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> bytes:
+        return hashlib.sha1(f"{model_name}\n{prompt}".encode("utf-8")).digest()
+
+    def get(self, model_name: str, prompt: str) -> Optional[str]:
+        """The recorded response for this prompt, or None"""
+        key = self.make_key(model_name, prompt)
+        with self._lock:
+            self._ensure_open()
+            location = self._index.get(key)
+            if location is None:
+                # Another process may have recorded it since
+                self._catch_up(repair=False)
+                location = self._index.get(key)
+            if location is None:
+                self._stats["misses"] += 1
+                return None
+            offset, length = location
+            if self._map is None or offset + length > len(self._map):
+                self._remap()
+            self._stats["hits"] += 1
+            return self._map[offset:offset + length].decode("utf-8")
+
+    def put(self, model_name: str, prompt: str, text: str) -> bool:
+        """Append a response; returns False if this prompt was already recorded"""
+        key = self.make_key(model_name, prompt)
+        payload = text.encode("utf-8")
+        with self._lock:
+            self._ensure_open()
+            with self._exclusive():
+                self._catch_up(repair=True)
+                if key in self._index:
+                    self._stats["duplicates"] += 1
+                    return False
+                # Caught up under the lock, so the append lands at self._size
+                self._file.write(self._HEADER.pack(key, len(payload)) + payload)
+                self._file.flush()
+                self._index[key] = (self._size + self._HEADER.size, len(payload))
+                self._size += self._HEADER.size + len(payload)
+                self._stats["recorded"] += 1
+                return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_open()
+            return len(self._index)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "mode": self.mode,
+                "path": self.path,
+                "records": len(self._index),
+                "bytes": self._size,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._index.clear()
+            self._size = 0
+
+    def _ensure_open(self) -> None:
+        if self._file is not None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a+b")
+        with self._exclusive():
+            self._catch_up(repair=True)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the cross-process write lock on the file"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _catch_up(self, repair: bool) -> None:
+        """
+        Index complete records appended past self._size
+
+        With `repair` (only under the write lock) a torn tail is cut off so
+        the next append starts on a record boundary; without it the tail
+        is left alone, as it may be a record another writer is still writing.
+        """
+        file_size = os.fstat(self._file.fileno()).st_size
+        if file_size <= self._size:
+            return
+        self._remap(file_size)
+
+        offset = self._size
+        while offset + self._HEADER.size <= file_size:
+            key, length = self._HEADER.unpack_from(self._map, offset)
+            end = offset + self._HEADER.size + length
+            if end > file_size:
+                break
+            self._index.setdefault(key, (offset + self._HEADER.size, length))
+            offset = end
+        self._size = offset
+        if repair and offset < file_size:
+            self._remap(0)
+            self._file.truncate(offset)
+            self._remap(offset)
+
+    def _remap(self, length: Optional[int] = None) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        length = self._size if length is None else length
+        if length:
+            self._map = mmap.mmap(self._file.fileno(), length, access=mmap.ACCESS_READ)
@@ -0,0 +1,124 @@
+from app.core.config import settings
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import copy
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+
+# Actions that change orders or stock. Replies carrying them must always
+# go to the model so every request is processed on its own.
+MUTATING_ACTIONS = {"Place order", "Cancel order"}
+
+# Wording that asks for an order or stock change, checked before the
+# reply is known
+_MUTATING_REQUEST_RE = re.compile(
+    r"\b(buy|purchase|cancel|place an? order|(want|like|need) to order|ship to|deliver to)\b"
+)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_message(message: str) -> str:
+    """Normalize a customer message so trivially different phrasings share a key"""
+    text = unicodedata.normalize("NFKC", message).casefold()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+def may_request_mutation(message: str) -> bool:
+    """Whether a customer message looks like it asks to place or cancel an order"""
+    return _MUTATING_REQUEST_RE.search(normalize_message(message)) is not None
+
+def fingerprint_context(*parts: str) -> str:
+    """Hash the exact prompt text sent alongside the message (model, system instruction, history)"""
+    if not any(parts):
+        return ""
+    return hashlib.sha1("\x00".join(parts).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    TTL + LRU cache of structured LLM replies
+
+    Entries are keyed on the normalized message and a fingerprint of
+    everything else the prompt carries, so two requests only share a reply
+    when the model would have seen the same context. Values are copied on
+    the way in and out because callers rewrite the reply in place.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "skipped": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def make_key(self, message: str, *context: str) -> Tuple[str, str]:
+        """Build the cache key for a message and the prompt context sent with it"""
+        return (normalize_message(message), fingerprint_context(*context))
+
+    @staticmethod
+    def is_cacheable(response: Dict) -> bool:
+        """Replies that trigger state-changing actions are never cached"""
+        return response.get("action_needed") not in MUTATING_ACTIONS
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict]:
+        """Return a copy of the cached reply, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return copy.deepcopy(value)
+
+    def set(self, key: Tuple[str, str], response: Dict) -> bool:
+        """Store a reply unless it is state-changing; returns whether it was stored"""
+        if not self.is_cacheable(response):
+            with self._lock:
+                self._stats["skipped"] += 1
+            return False
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
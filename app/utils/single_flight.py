@@ -0,0 +1,71 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import copy
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one
+
+    The first caller for a key starts the call; callers arriving with the
+    same key while it is in flight wait for that call instead of starting
+    their own, and every caller gets its own deep copy of the result. The
+    call runs as a separate task, so a caller that disconnects doesn't
+    cancel it for the others. Once the call finishes the key is forgotten,
+    so only requests that overlap in time are merged.
+
+    A result that fails `shareable` is only given to the caller that
+    started the call; the waiting callers each make their own call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {
+            "calls": 0,
+            "merged": 0,
+            "bypassed": 0,
+            "unshareable": 0,
+            "errors": 0,
+        }
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        shareable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """Run `fn`, or wait for the in-flight call with the same key"""
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self._stats["calls"] += 1
+            return copy.deepcopy(await asyncio.shield(call))
+
+        self._stats["merged"] += 1
+        result = await asyncio.shield(call)
+        if shareable is not None and not shareable(result):
+            self._stats["unshareable"] += 1
+            return await fn()
+        return copy.deepcopy(result)
+
+    def bypass(self) -> None:
+        """Count a call that was made without coalescing"""
+        self._stats["bypassed"] += 1
+
+    def _forget(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled() and call.exception() is not None:
+            self._stats["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call and merge counters"""
+        requests = self._stats["calls"] + self._stats["merged"]
+        return {
+            **self._stats,
+            "in_flight": len(self._calls),
+            "merge_rate": self._stats["merged"] / requests if requests else 0.0,
+        }
+
+single_flight = SingleFlight()
@@ -0,0 +1,74 @@
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.types import Scope
+from app.utils.http_cache import add_vary
+from typing import Set
+import mimetypes
+import re
+
+# Names written by scripts/build_static.py: <stem>.<10 hex digits of sha256>.<ext>
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{10}\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content codings an Accept-Encoding header allows (q=0 excludes one)"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().lower()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves the .br/.gz variant built next to a file
+
+    The variant is picked from Accept-Encoding and served with the
+    original content type. Fingerprinted files never change under their
+    name and are cached for a year; everything else (index.html) must be
+    revalidated, which the ETag/Last-Modified of StaticFiles makes cheap.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        response = None
+        for coding, suffix in PRECOMPRESSED:
+            if coding not in accepted and "*" not in accepted:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            response.headers["Content-Encoding"] = coding
+            if response.status_code == 200:
+                response.headers["Content-Type"] = _content_type(path)
+            break
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            add_vary(response.headers, "Accept-Encoding")
+            response.headers["Cache-Control"] = (
+                IMMUTABLE_CACHE_CONTROL if FINGERPRINT_RE.search(path) else REVALIDATE_CACHE_CONTROL
+            )
+        return response
+
+def _content_type(path: str) -> str:
+    media_type = mimetypes.guess_type(path)[0] or "text/plain"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
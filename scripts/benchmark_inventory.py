@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db.base import Base
+from app.db.models import Order, OrderItem, Product
+from app.db.session import build_async_engine, build_sync_engine
+from app.services.inventory import InventoryService
+
+BENCHMARK_SKU = "Benchmark Hot SKU"
+
+def prepare(url: str, stock: int) -> int:
+    """Create the hot product with `stock` units, dropping leftovers from earlier runs"""
+    engine = build_sync_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        old_ids = select(Product.id).filter(Product.name == BENCHMARK_SKU).scalar_subquery()
+        old_orders = conn.execute(select(OrderItem.order_id).filter(OrderItem.product_id.in_(old_ids))).scalars().all()
+        conn.execute(delete(OrderItem).filter(OrderItem.product_id.in_(old_ids)))
+        conn.execute(delete(Order).filter(Order.id.in_(old_orders)))
+        conn.execute(delete(Product).filter(Product.name == BENCHMARK_SKU))
+        product_id = conn.execute(
+            insert(Product).values(name=BENCHMARK_SKU, price=10.0, stock=stock).returning(Product.id)
+        ).scalar_one()
+    engine.dispose()
+    return product_id
+
+async def run(url: str, product_id: int, clients: int, orders_per_client: int):
+    """Have every client place orders for the hot product, one transaction per order like the chat endpoint"""
+    engine = build_async_engine(url)
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    inventory = InventoryService()
+    latencies = []
+    sold = 0
+
+    async def client(number: int):
+        nonlocal sold
+        for n in range(orders_per_client):
+            start = time.perf_counter()
+            async with Session() as db:
+                order = Order(
+                    order_number=f"BENCH{number:04d}{n:06d}",
+                    status="Pending",
+                    total_amount=10.0,
+                    created_at=datetime.utcnow(),
+                    updated_at=datetime.utcnow()
+                )
+                db.add(order)
+                await db.flush()
+                reservation = await inventory.reserve(db, product_id, 1)
+                if reservation is None:
+                    await db.rollback()
+                else:
+                    db.add(OrderItem(order_id=order.id, product_id=product_id, quantity=1, price=reservation.price))
+                    await db.commit()
+                    sold += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    async with Session() as db:
+        remaining = (await db.execute(select(Product.stock).filter(Product.id == product_id))).scalar_one()
+    await engine.dispose()
+    return elapsed, sold, remaining, sorted(latencies), inventory.stats()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure orders/sec against a single hot SKU")
+    parser.add_argument("--url", help="Database to use (default: a temporary SQLite file)")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--orders", type=int, default=20, help="Orders each client attempts")
+    parser.add_argument("--stock", type=int, default=500, help="Starting stock of the hot SKU")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'inventory_benchmark.db')}"
+    product_id = prepare(url, args.stock)
+    elapsed, sold, remaining, latencies, stats = asyncio.run(run(url, product_id, args.clients, args.orders))
+
+    attempts = len(latencies)
+    percentile = lambda p: latencies[min(int(p * attempts), attempts - 1)] * 1000
+    print(f"{attempts} order attempts from {args.clients} clients in {elapsed:.2f}s")
+    print(f"  throughput: {attempts / elapsed:.1f} attempts/sec, {sold / elapsed:.1f} orders/sec")
+    print(f"  latency ms: p50 {percentile(0.50):.1f}  p95 {percentile(0.95):.1f}  p99 {percentile(0.99):.1f}")
+    print(f"  sold {sold}, rejected {stats['rejected']}, stock left {remaining}")
+
+    if sold + remaining != args.stock or remaining < 0:
+        print(f"FAIL: stock started at {args.stock} but {sold} sold and {remaining} left")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
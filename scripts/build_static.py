@@ -0,0 +1,125 @@
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+from dotenv import load_dotenv
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional; without it only .gz variants are written
+    brotli = None
+
+# Pages keep their name so "/" can find them; they reference everything else by fingerprint
+PAGE_SUFFIXES = (".html",)
+COMPRESSIBLE_SUFFIXES = (".html", ".js", ".css", ".svg", ".json", ".txt", ".map")
+MIN_COMPRESS_SIZE = 256
+MANIFEST_NAME = "manifest.json"
+
+_REFERENCE_RE = re.compile(r"""(["'(])/static/([^"'()?#]+)""")
+
+def fingerprint(name: str, content: bytes) -> str:
+    """script.js -> script.<first 10 hex digits of sha256>.js"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+def rewrite_references(html: str, manifest: dict) -> str:
+    """Point /static/<name> references at their fingerprinted names"""
+    def replace(match):
+        name = match.group(2)
+        return f"{match.group(1)}/static/{manifest.get(name, name)}"
+    return _REFERENCE_RE.sub(replace, html)
+
+def compress(path: str) -> list:
+    """Write .gz (and .br when brotli is installed) next to `path` where it saves bytes"""
+    with open(path, "rb") as f:
+        content = f.read()
+    if len(content) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content, quality=11)))
+    written = []
+    for suffix, data in variants:
+        if len(data) < len(content):
+            with open(path + suffix, "wb") as f:
+                f.write(data)
+            written.append(path + suffix)
+    return written
+
+def build_static(source: str, output: str) -> dict:
+    """
+    Build `source` into `output`, replacing whatever was there
+
+    Assets are copied under fingerprinted names, pages are copied under
+    their own names with references rewritten, and every text file gets
+    precompressed variants. Returns the {name: fingerprinted name}
+    manifest, which is also written to output/manifest.json.
+    """
+    source = os.path.abspath(source)
+    output = os.path.abspath(output)
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+
+    manifest = {}
+    pages = []
+    for root, dirs, files in os.walk(source):
+        # Don't build an output directory that lives inside the source
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != output]
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, source).replace(os.sep, "/")
+            if filename.endswith(PAGE_SUFFIXES):
+                pages.append(name)
+                continue
+            with open(path, "rb") as f:
+                content = f.read()
+            manifest[name] = fingerprint(name, content)
+            target = os.path.join(output, manifest[name])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(content)
+
+    for name in pages:
+        with open(os.path.join(source, name), encoding="utf-8") as f:
+            html = f.read()
+        target = os.path.join(output, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(rewrite_references(html, manifest))
+
+    for name in pages + list(manifest.values()):
+        if name.endswith(COMPRESSIBLE_SUFFIXES):
+            compress(os.path.join(output, name))
+
+    with open(os.path.join(output, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the static assets")
+    parser.add_argument("--source", default=settings.STATIC_SOURCE_DIR, help="Static source directory")
+    parser.add_argument("--output", default=settings.STATIC_BUILD_DIR, help="Build directory the app serves")
+    args = parser.parse_args()
+
+    manifest = build_static(args.source, args.output)
+    for name, built in sorted(manifest.items()):
+        print(f"{name} -> {built}")
+    if brotli is None:
+        print("brotli is not installed; only gzip variants were written")
+    print(f"Built {len(manifest)} assets into {args.output}")
+
+if __name__ == "__main__":
+    main()
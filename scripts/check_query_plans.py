@@ -0,0 +1,86 @@
+import os
+import sys
+import argparse
+import tempfile
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+from app.db.base import Base
+from app.db.models import Product
+from app.db.query_plans import explain, sequential_scans
+from app.api.api_v1.endpoints.chat import transcript_query
+from app.api.api_v1.endpoints.products import products_query
+from app.services.catalog_index import product_by_name_query
+from app.services.history_cache import window_query
+from app.services.order_read_model import items_query, orders_query
+from seed_database import bulk_seed
+
+# Tables that grow with traffic; a full scan of any of them on a hot path is a regression
+WATCHED_TABLES = ("messages", "orders", "order_items", "products", "conversations")
+
+EPOCH = datetime(2025, 1, 1)
+
+def hot_queries():
+    """The statements the routers run per request, with representative parameters"""
+    return {
+        "transcript page": transcript_query(1).limit(101),
+        "transcript page after cursor": transcript_query(1, (EPOCH, 1)).limit(101),
+        "history window": window_query(1, 10),
+        "latest order": orders_query(None, None, 1),
+        "latest order for user": orders_query(1, None, 1),
+        "order by number": orders_query(None, "ORDER00000001", 1),
+        "order items": items_query([1, 2, 3]),
+        "product by name": product_by_name_query("Smartphone X"),
+        "product page": products_query(None, 1).limit(51),
+        "product page in category": products_query("Electronics", 1).limit(51),
+        "catalog refresh": select(Product).filter(Product.updated_at > EPOCH),
+    }
+
+def check_query_plans(engine: Engine, verbose: bool = False):
+    """Return {query name: [full scan plan nodes]} for every hot query that doesn't use an index"""
+    failures = {}
+    with engine.connect() as conn:
+        for name, statement in hot_queries().items():
+            if verbose:
+                print(f"{name}:")
+                for node in explain(conn, statement):
+                    print(f"    {node.description}")
+            scans = sequential_scans(conn, statement, WATCHED_TABLES)
+            if scans:
+                failures[name] = scans
+    return failures
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail if a hot query plans a sequential scan")
+    parser.add_argument("--url", help="Database to check (default: a temporary SQLite file)")
+    parser.add_argument("--scale", type=int, default=20000, help="Dataset size, as in seed_database.py --scale")
+    parser.add_argument("--no-seed", action="store_true", help="Check an existing database as is")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_plans.db')}"
+    engine = create_engine(url)
+    if not args.no_seed:
+        Base.metadata.create_all(engine)
+        print(f"Seeding scale {args.scale} dataset into {engine.url.render_as_string(hide_password=True)}...")
+        bulk_seed(engine, args.scale, quiet=True)
+
+    failures = check_query_plans(engine, verbose=args.verbose)
+    engine.dispose()
+    for name, scans in failures.items():
+        print(f"FAIL {name}: {'; '.join(scans)}")
+    if failures:
+        return 1
+    print(f"All {len(hot_queries())} hot queries use an index.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from dotenv import load_dotenv
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.main import app
+from app.db.base import Base
+from app.db.models import Conversation
+from app.db.query_counter import count_queries
+from app.db.session import build_async_engine, build_sync_engine, get_db
+from app.services import ai_service as ai_service_module
+from app.services.catalog_index import catalog_index
+from app.services.history_cache import history_cache
+from app.services.intent_router import intent_router
+from app.utils.response_cache import response_cache
+from seed_database import bulk_seed
+
+class LatencyDistribution:
+    """
+    Seconds to wait per stub LLM call, parsed from a spec string
+
+    fixed:MS, uniform:LOW_MS:HIGH_MS, normal:MEAN_MS:STD_MS or
+    lognormal:MEDIAN_MS:SIGMA. Samples never go below zero.
+    """
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    def __init__(self, spec: str, seed_value: int = 0):
+        kind, *params = spec.split(":")
+        if kind not in self.KINDS or len(params) != self.KINDS[kind]:
+            raise ValueError(f"Invalid latency spec {spec!r}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(param) for param in params]
+        self._rng = random.Random(seed_value)
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = self._rng.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = self._rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = self._rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return max(ms, 0.0) / 1000
+
+# Canned replies keyed by a phrase in the customer message; the first match wins
+CANNED_RESPONSES = [
+    ("price of", {
+        "response": "Let me look that up for you.",
+        "action_needed": "Look up product information",
+        "action_data": {"product": "Product 1"},
+    }),
+    ("where is my order", {
+        "response": "Let me check on your order.",
+        "action_needed": "Check order status",
+        "action_data": {},
+    }),
+    ("i want to buy", {
+        "response": "I'll place that order for you.",
+        "action_needed": "Place order",
+        "action_data": {"product": "Product 2", "quantity": 1, "shipping_address": "1 Main St", "payment_method": "Credit Card"},
+    }),
+]
+DEFAULT_RESPONSE = {
+    "response": "Happy to help! Is there anything else you'd like to know?",
+    "action_needed": None,
+    "action_data": None,
+}
+
+# (message, weight) mix sent to the chat endpoints
+CHAT_MESSAGES = [
+    ("What's the price of Product 1?", 3),
+    ("Where is my order?", 3),
+    ("I want to buy Product 2, ship it to 1 Main St", 1),
+    ("Do you offer gift wrapping?", 3),
+]
+
+class StubLLM:
+    """Stands in for Gemini: waits a sampled latency, then answers with a canned payload"""
+
+    def __init__(self, latency: LatencyDistribution, canned=CANNED_RESPONSES, default=DEFAULT_RESPONSE):
+        self.latency = latency
+        self.canned = canned
+        self.default = default
+        self.calls = 0
+
+    def respond(self, prompt: str) -> dict:
+        message = prompt.rsplit("Customer message:", 1)[-1].lower()
+        for phrase, payload in self.canned:
+            if phrase in message:
+                return json.loads(json.dumps(payload))
+        return json.loads(json.dumps(self.default))
+
+    async def generate(self, prompt, conversation_history=None, model_name=None, system_instruction=None, deadline=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample())
+        return self.respond(prompt)
+
+    async def stream(self, prompt, conversation_history=None, model_name=None, system_instruction=None, deadline=None):
+        """Yield the JSON reply in four chunks, spreading the sampled latency across them"""
+        self.calls += 1
+        text = json.dumps(self.respond(prompt))
+        delay = self.latency.sample() / 4
+        step = math.ceil(len(text) / 4)
+        for start in range(0, len(text), step):
+            await asyncio.sleep(delay)
+            yield text[start:start + step]
+
+    def install(self):
+        """Patch the AI service to call this stub; returns a function that undoes it"""
+        originals = (
+            ai_service_module.generate_structured_response_async,
+            ai_service_module.stream_structured_response_async,
+        )
+        ai_service_module.generate_structured_response_async = self.generate
+        ai_service_module.stream_structured_response_async = self.stream
+
+        def restore():
+            (ai_service_module.generate_structured_response_async,
+             ai_service_module.stream_structured_response_async) = originals
+        return restore
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(latencies, errors, elapsed, queries):
+    latencies = sorted(latencies)
+    requests = len(latencies)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "mean": round(sum(latencies) / requests * 1000, 2) if requests else 0.0,
+        },
+        "db_queries_per_request": round(queries / requests, 2) if requests else 0.0,
+    }
+
+def build_phases(conversation_count, seed_value=0):
+    """(name, request factory) per endpoint; each factory returns (method, url, kwargs) for request n"""
+    rng = random.Random(seed_value)
+    messages = [message for message, weight in CHAT_MESSAGES for _ in range(weight)]
+
+    def chat_body(n):
+        # A unique suffix keeps the response cache from answering every repeat
+        return {"json": {"message": f"{rng.choice(messages)} (ref {n})", "conversation_history": []}}
+
+    return [
+        ("POST /api/chat", lambda n: ("POST", "/api/chat", chat_body(n))),
+        ("POST /api/chat/stream", lambda n: ("POST", "/api/chat/stream", chat_body(n))),
+        ("POST /api/v1/chat/conversations/", lambda n: ("POST", "/api/v1/chat/conversations/", {"params": {"user_id": 1}})),
+        ("POST /api/v1/chat/conversations/{id}/messages/", lambda n: (
+            "POST", f"/api/v1/chat/conversations/{rng.randint(1, conversation_count)}/messages/",
+            {"json": {"content": f"{rng.choice(messages)} (ref {n})"}},
+        )),
+        ("GET /api/v1/chat/conversations/{id}/messages/", lambda n: (
+            "GET", f"/api/v1/chat/conversations/{rng.randint(1, conversation_count)}/messages/",
+            {"params": {"limit": 50}},
+        )),
+    ]
+
+async def run_phase(client, engine, make_request, requests, concurrency):
+    """Send `requests` requests from `concurrency` concurrent clients; returns the phase summary"""
+    latencies = []
+    errors = 0
+    next_request = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for n in next_request:
+            method, url, kwargs = make_request(n)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    with count_queries(engine) as counter:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, errors, elapsed, counter.count)
+
+async def run_load_test(engine, llm_latency, requests=200, concurrency=20, seed_value=0, load_catalog=True):
+    """
+    Drive every endpoint in turn against `engine` with the stub LLM installed
+
+    Requests go through the ASGI app in-process, so the figures cover the
+    app and the database but not the network or a real model.
+    """
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with Session() as session:
+            yield session
+
+    async with Session() as db:
+        conversation_count = (await db.execute(select(func.count()).select_from(Conversation))).scalar() or 1
+        if load_catalog:
+            await catalog_index.load(db)
+            intent_router.load_products(catalog_index.names())
+
+    stub = StubLLM(LatencyDistribution(llm_latency, seed_value))
+    restore = stub.install()
+    app.dependency_overrides[get_db] = override_get_db
+    response_cache.clear()
+    history_cache.clear()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            for name, make_request in build_phases(conversation_count, seed_value):
+                results[name] = await run_phase(client, engine, make_request, requests, concurrency)
+    finally:
+        restore()
+        app.dependency_overrides.pop(get_db, None)
+        response_cache.clear()
+        history_cache.clear()
+    return {
+        "config": {
+            "llm_latency": llm_latency,
+            "requests_per_endpoint": requests,
+            "concurrency": concurrency,
+            "seed": seed_value,
+            "database": engine.dialect.name,
+        },
+        "llm_calls": stub.calls,
+        "endpoints": results,
+    }
+
+def compare(baseline, current):
+    """Lines describing how each endpoint moved relative to a saved baseline"""
+    lines = []
+    for name, result in current["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            lines.append(f"{name}: new endpoint")
+            continue
+        changes = []
+        for label, old, new in (
+            ("p50", previous["latency_ms"]["p50"], result["latency_ms"]["p50"]),
+            ("p95", previous["latency_ms"]["p95"], result["latency_ms"]["p95"]),
+            ("p99", previous["latency_ms"]["p99"], result["latency_ms"]["p99"]),
+            ("rps", previous["requests_per_second"], result["requests_per_second"]),
+            ("queries", previous["db_queries_per_request"], result["db_queries_per_request"]),
+        ):
+            delta = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            changes.append(f"{label} {old} -> {new} ({delta})")
+        lines.append(f"{name}: " + ", ".join(changes))
+    return lines
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the chat endpoints with a stub LLM")
+    parser.add_argument("--url", help="Seeded database to use (default: a temporary SQLite file seeded with --scale)")
+    parser.add_argument("--scale", type=int, default=2000, help="Dataset size for the temporary database")
+    parser.add_argument("--llm-latency", default="lognormal:400:0.5",
+                        help="Stub LLM latency: fixed:MS, uniform:LOW:HIGH, normal:MEAN:STD or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for message mix and latency sampling")
+    parser.add_argument("--output", default="loadtest-results.json", help="Where to save the results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+        sync_engine = build_sync_engine(url)
+        Base.metadata.create_all(sync_engine)
+        print(f"Seeding scale {args.scale} dataset...")
+        bulk_seed(sync_engine, args.scale, quiet=True)
+        sync_engine.dispose()
+
+    async def run():
+        engine = build_async_engine(url)
+        try:
+            return await run_load_test(engine, args.llm_latency, args.requests, args.concurrency, args.seed)
+        finally:
+            await engine.dispose()
+
+    results = asyncio.run(run())
+    for name, result in results["endpoints"].items():
+        latency = result["latency_ms"]
+        print(f"{name}")
+        print(f"  {result['requests_per_second']} req/s, p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+              f"p99 {latency['p99']} ms, {result['db_queries_per_request']} queries/req, {result['errors']} errors")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        for line in compare(baseline, results):
+            print(f"  {line}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,10 @@
+import io
 import os
 import sys
+import csv
+import time
 import random
+import argparse
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
@@ -10,15 +14,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Load environment variables
 load_dotenv()
 
-from app.db.session import SessionLocal
-from app.db.models import User, Product, Order, OrderItem, Message, Conversation
+from sqlalchemy import delete, func, insert, select, text, update
+from app.db.session import SessionLocal, engine
+from app.db.models import User, Product, Order, OrderItem, Message, Conversation, IdAllocation
 from app.core.security import get_password_hash
-from app.services.ai_service import AIService
+from app.services.order_numbers import FIRST_VALUE, format_order_number, order_numbers, random_suffix
 
 def generate_order_number():
-    """Generate a random order number"""
-    ai_service = AIService()
-    return ai_service.generate_order_number()
+    """Allocate the next order number"""
+    return order_numbers.next_sync(engine)
 
 def seed_database(force_reseed=False):
     """Seed the database with test data"""
@@ -177,7 +181,219 @@ def seed_database(force_reseed=False):
     finally:
         db.close()
 
+# Parent rows generated per unit of --scale
+SCALE_RATIOS = {
+    "users": 1,
+    "products": 0.01,
+    "conversations": 1,
+    "orders": 2,
+}
+MESSAGES_PER_CONVERSATION = 6
+ITEMS_PER_ORDER = 2
+EPOCH = datetime(2024, 1, 1)
+CATEGORIES = ["Electronics", "Wearables", "Kitchen", "Home", "Outdoors", "Books", "Toys", "Beauty"]
+STATUSES = ["Pending", "Processing", "Shipped", "Delivered", "Cancelled"]
+PAYMENT_METHODS = ["Credit Card", "PayPal", "Bank Transfer", "Cash on Delivery"]
+
+def scaled_counts(scale):
+    """Rows per table for a scale; --scale 1000000 comes to about 14 million rows"""
+    counts = {table: max(int(scale * ratio), 1) for table, ratio in SCALE_RATIOS.items()}
+    counts["messages"] = counts["conversations"] * MESSAGES_PER_CONVERSATION
+    counts["order_items"] = counts["orders"] * ITEMS_PER_ORDER
+    return counts
+
+def _order_line(order_id, line, product_count):
+    """Product and quantity of one order line, derived from ids so orders and items agree without shared state"""
+    product_id = (order_id * 7919 + line * 104729) % product_count + 1
+    quantity = (order_id + line) % 3 + 1
+    return product_id, quantity
+
+def generate_rows(scale, seed_value=42):
+    """
+    Yield (table, columns, rows) for every table, parents before children
+
+    Ids are assigned here, so foreign keys are known without reading
+    anything back, and the same seed always produces the same database.
+    """
+    rng = random.Random(seed_value)
+    counts = scaled_counts(scale)
+    # Every synthetic user shares one password; bcrypt per row would dominate the run
+    password_hash = get_password_hash("password123")
+    prices = [round(rng.uniform(5, 1000), 2) for _ in range(counts["products"])]
+    span = timedelta(days=365).total_seconds()
+
+    def timestamp(n, total):
+        return EPOCH + timedelta(seconds=span * n / total)
+
+    yield User.__table__, ("id", "email", "hashed_password", "full_name", "is_active", "is_superuser", "created_at"), (
+        (n, f"user{n}@example.com", password_hash, f"User {n}", True, False, timestamp(n, counts["users"]))
+        for n in range(1, counts["users"] + 1)
+    )
+    yield Product.__table__, ("id", "name", "description", "price", "stock", "category", "created_at", "updated_at"), (
+        (n, f"Product {n}", f"Synthetic product number {n}", prices[n - 1], rng.randint(0, 500),
+         CATEGORIES[n % len(CATEGORIES)], EPOCH, timestamp(n, counts["products"]))
+        for n in range(1, counts["products"] + 1)
+    )
+    yield Conversation.__table__, ("id", "user_id", "created_at", "updated_at"), (
+        (n, rng.randint(1, counts["users"]), timestamp(n, counts["conversations"]), timestamp(n, counts["conversations"]))
+        for n in range(1, counts["conversations"] + 1)
+    )
+    yield Message.__table__, ("id", "conversation_id", "content", "is_from_user", "created_at"), (
+        (n, (n - 1) // MESSAGES_PER_CONVERSATION + 1, f"Synthetic message {n}", n % 2 == 1, timestamp(n, counts["messages"]))
+        for n in range(1, counts["messages"] + 1)
+    )
+
+    def order_row(n):
+        total = 0.0
+        for line in range(ITEMS_PER_ORDER):
+            product_id, quantity = _order_line(n, line, counts["products"])
+            total += prices[product_id - 1] * quantity
+        created_at = timestamp(n, counts["orders"])
+        return (n, rng.randint(1, counts["users"]), format_order_number(FIRST_VALUE + n - 1, random_suffix(rng)), created_at,
+                rng.choice(STATUSES), round(total, 2), rng.choice(PAYMENT_METHODS),
+                f"{n} Main St, Anytown, USA", created_at, created_at)
+
+    yield Order.__table__, ("id", "user_id", "order_number", "order_date", "status", "total_amount",
+                            "payment_method", "shipping_address", "created_at", "updated_at"), (
+        order_row(n) for n in range(1, counts["orders"] + 1)
+    )
+
+    def item_row(n):
+        order_id, line = divmod(n - 1, ITEMS_PER_ORDER)
+        product_id, quantity = _order_line(order_id + 1, line, counts["products"])
+        return (n, order_id + 1, product_id, quantity, prices[product_id - 1])
+
+    yield OrderItem.__table__, ("id", "order_id", "product_id", "quantity", "price"), (
+        item_row(n) for n in range(1, counts["order_items"] + 1)
+    )
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _copy_batch(raw_connection, table, columns, batch):
+    """PostgreSQL: stream the batch through COPY ... FROM STDIN as CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow(["\\N" if value is None else value for value in row])
+    buffer.seek(0)
+    with raw_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+def _executemany_batch(raw_connection, table, columns, batch, placeholder):
+    """SQLite and others: one prepared INSERT run over the whole batch"""
+    cursor = raw_connection.cursor()
+    placeholders = ", ".join(placeholder for _ in columns)
+    cursor.executemany(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})", batch)
+    cursor.close()
+
+def bulk_seed(target_engine, scale, seed_value=42, batch_size=10000, quiet=False):
+    """
+    Load a synthetic dataset of the given scale into empty tables
+
+    Uses COPY on PostgreSQL and executemany elsewhere, one transaction per
+    table. Returns the number of rows written per table.
+    """
+    use_copy = target_engine.dialect.name == "postgresql"
+    placeholder = "?" if target_engine.dialect.paramstyle == "qmark" else "%s"
+    written = {}
+    started = time.perf_counter()
+    raw_connection = target_engine.raw_connection()
+    try:
+        if target_engine.dialect.name == "sqlite":
+            # Throwaway load: skip fsyncs; the file is consistent once the script exits
+            raw_connection.cursor().execute("PRAGMA synchronous = OFF")
+        for table, columns, rows in generate_rows(scale, seed_value):
+            table_started = time.perf_counter()
+            count = 0
+            for batch in _batches(rows, batch_size):
+                if use_copy:
+                    _copy_batch(raw_connection, table, columns, batch)
+                else:
+                    _executemany_batch(raw_connection, table, columns, batch, placeholder)
+                count += len(batch)
+                if not quiet:
+                    rate = count / max(time.perf_counter() - table_started, 1e-9)
+                    print(f"\r  {table.name}: {count:,} rows ({rate:,.0f} rows/sec)", end="", flush=True)
+            raw_connection.commit()
+            written[table.name] = count
+            if not quiet:
+                print()
+    finally:
+        raw_connection.close()
+
+    with target_engine.begin() as conn:
+        _sync_counters(conn, written.get("orders", 0))
+        if target_engine.dialect.name == "postgresql":
+            # Give the planner statistics for the new rows
+            conn.execute(text("ANALYZE"))
+
+    if not quiet:
+        total = sum(written.values())
+        elapsed = time.perf_counter() - started
+        print(f"Wrote {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/sec)")
+    return written
+
+def _sync_counters(conn, orders):
+    """Move id sequences and the order number allocator past the explicitly assigned values"""
+    if conn.dialect.name == "postgresql":
+        for table in (User.__table__, Product.__table__, Conversation.__table__, Message.__table__,
+                      Order.__table__, OrderItem.__table__):
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+            ))
+    next_value = FIRST_VALUE + orders
+    current = conn.execute(
+        select(IdAllocation.next_value).where(IdAllocation.name == order_numbers.name)
+    ).scalar()
+    if current is None:
+        conn.execute(insert(IdAllocation).values(name=order_numbers.name, next_value=next_value))
+    elif current < next_value:
+        conn.execute(
+            update(IdAllocation).where(IdAllocation.name == order_numbers.name).values(next_value=next_value)
+        )
+
+def clear_database(target_engine):
+    """Delete every seeded row, children first"""
+    with target_engine.begin() as conn:
+        for model in (OrderItem, Order, Message, Conversation, Product, User):
+            conn.execute(delete(model))
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with test data")
+    parser.add_argument("--force", action="store_true", help="Clear existing data first")
+    parser.add_argument("--scale", type=int, help="Generate a synthetic dataset instead, about 14 rows per unit")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for --scale (same seed, same data)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows per COPY/executemany batch")
+    args = parser.parse_args()
+
+    if args.scale is None:
+        seed_database(args.force)
+        return
+
+    with engine.connect() as conn:
+        seeded = conn.execute(select(func.count()).select_from(User)).scalar() > 0
+    if seeded and not args.force:
+        print("Database already seeded. Use --force to clear it first.")
+        return
+    if seeded:
+        print("Clearing existing data...")
+        clear_database(engine)
+    counts = scaled_counts(args.scale)
+    print(f"Generating scale {args.scale:,} dataset (seed {args.seed}): "
+          + ", ".join(f"{count:,} {table}" for table, count in counts.items()))
+    bulk_seed(engine, args.scale, seed_value=args.seed, batch_size=args.batch_size)
+
 if __name__ == "__main__":
-    # Check if force reseed flag is provided
-    force_reseed = "--force" in sys.argv
-    seed_database(force_reseed) 
\ No newline at end of file
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from app.db.base import Base, get_db
+from app.main import app
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    """A fresh SQLite database with the full schema and nothing in it"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seed(sync_engine):
+    """Add rows to the test database and commit them; each module seeds only what it needs"""
+    def add(*rows):
+        with Session(sync_engine) as db:
+            db.add_all(rows)
+            db.commit()
+    return add
+
+
+@pytest.fixture
+def async_engine(sync_engine):
+    """An aiosqlite engine on the same database file as sync_engine"""
+    engine = create_async_engine(str(sync_engine.url).replace("sqlite://", "sqlite+aiosqlite://"))
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def client(async_engine):
+    """A test client whose requests use the test database"""
+    TestingSessionLocal = async_sessionmaker(async_engine)
+
+    async def override_get_db():
+        async with TestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import pytest
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.utils import gemini_utils
+from app.utils.adaptive_limiter import AdaptiveLimiter, OverloadedError
+
+
+class RateLimited(Exception):
+    pass
+
+
+async def hold(limiter, seconds, fail=False):
+    async with limiter.slot():
+        await asyncio.sleep(seconds)
+        if fail:
+            raise RateLimited()
+
+
+def test_calls_beyond_the_limit_wait_their_turn():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+
+    async def run():
+        await asyncio.gather(*[hold(limiter, 0.02) for _ in range(6)])
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["acquired"] == 6
+    assert stats["queued"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_full_queue_sheds_immediately():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1, max_queue=1)
+
+    async def run():
+        busy = asyncio.ensure_future(hold(limiter, 0.05))
+        queued = asyncio.ensure_future(hold(limiter, 0))
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        with pytest.raises(OverloadedError):
+            await limiter.acquire()
+        shed_after = time.perf_counter() - start
+        await asyncio.gather(busy, queued)
+        return shed_after
+
+    assert asyncio.run(run()) < 0.01
+    assert limiter.stats()["shed_queue_full"] == 1
+
+
+def test_waiters_are_shed_at_their_deadline():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1, queue_timeout=0.02)
+
+    async def run():
+        busy = asyncio.ensure_future(hold(limiter, 0.1))
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError):
+            await limiter.acquire()
+        await busy
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["shed_deadline"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_timed_out_and_cancelled_waiters_leave_the_queue():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1, max_queue=2, queue_timeout=0.01)
+
+    async def run():
+        busy = asyncio.ensure_future(hold(limiter, 0.2))
+        await asyncio.sleep(0)
+        # Fill the queue with callers that give up: one times out, one is cancelled
+        with pytest.raises(OverloadedError):
+            await limiter.acquire()
+        cancelled = asyncio.ensure_future(limiter.acquire(deadline=time.monotonic() + 1))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        with pytest.raises(OverloadedError):
+            await limiter.acquire()
+        assert limiter.stats()["waiting"] == 0
+
+        # Nobody is waiting any more, so a new caller is queued rather than shed as "queue full"
+        started_at = await limiter.acquire(deadline=time.monotonic() + 1)
+        limiter.release(started_at)
+        await busy
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["shed_queue_full"] == 0
+    assert stats["shed_deadline"] == 2
+    assert stats["waiting"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_overload_errors_cut_the_limit_once_per_burst():
+    limiter = AdaptiveLimiter(initial_limit=8, min_limit=1, overload_errors=(RateLimited,))
+
+    async def run():
+        await asyncio.gather(*[hold(limiter, 0.01, fail=True) for _ in range(4)], return_exceptions=True)
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["overloads"] == 4
+    assert stats["decreases"] == 1
+    assert stats["limit"] == 4
+
+
+def test_slow_calls_cut_the_limit_and_saturated_success_grows_it():
+    limiter = AdaptiveLimiter(initial_limit=4, latency_target=0.01)
+    asyncio.run(hold(limiter, 0.02))
+    assert limiter.limit == 2
+
+    limiter.latency_target = 10
+
+    async def run():
+        await asyncio.gather(*[hold(limiter, 0.01) for _ in range(2)])
+
+    asyncio.run(run())
+    assert limiter.limit > 2
+
+
+def test_shed_requests_get_the_fallback_reply(monkeypatch):
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1, max_queue=0)
+    monkeypatch.setattr(gemini_utils, "gemini_limiter", limiter)
+    monkeypatch.setattr(ai_service_module.settings, "RESPONSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai_service_module.settings, "SINGLE_FLIGHT_ENABLED", False)
+
+    async def run():
+        async with limiter.slot():
+            return await AIService().process_message("How long does shipping take?", [])
+
+    response = asyncio.run(run())
+    assert response == AIService()._fallback_response()
+    assert limiter.stats()["shed_queue_full"] == 1
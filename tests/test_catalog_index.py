@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.db.models import Product
+from app.services import catalog_index as catalog_module
+from app.services.catalog_index import CatalogIndex, ProductRecord
+
+PRODUCTS = [
+    (1, "Smartphone X", 999.99),
+    (2, "Laptop Pro", 1499.99),
+    (3, "Wireless Headphones", 199.99),
+    (4, "Smart Watch", 299.99),
+    (5, "Coffee Maker", 79.99),
+]
+
+
+@pytest.fixture
+def index():
+    index = CatalogIndex()
+    index.upsert_many(
+        ProductRecord(id=id, name=name, description=None, price=price, stock=10, category=None, updated_at=None)
+        for id, name, price in PRODUCTS
+    )
+    return index
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Smartphone X", "Smartphone X"),
+    ("smartphone x", "Smartphone X"),
+    ("Smartphone-X", "Smartphone X"),
+    ("smartphonex", "Smartphone X"),
+    ("laptop", "Laptop Pro"),
+    ("wireless headphone", "Wireless Headphones"),
+    ("cofee maker", "Coffee Maker"),
+])
+def test_resolve_tolerates_paraphrased_names(index, query, expected):
+    assert index.resolve(query).name == expected
+
+
+@pytest.mark.parametrize("query", ["smart", "garden hose", ""])
+def test_resolve_returns_none_when_ambiguous_or_unknown(index, query):
+    assert index.resolve(query) is None
+
+
+def test_upsert_reindexes_renamed_products(index):
+    index.upsert(ProductRecord(id=2, name="Laptop Air", description=None, price=1299.0, stock=5, category=None, updated_at=None))
+    assert index.resolve("laptop air").price == 1299.0
+    index.remove(2)
+    assert index.resolve("laptop air") is None
+
+
+def test_committed_changes_update_the_index_and_refresh_is_incremental(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'catalog.db'}"
+    Base.metadata.create_all(create_engine(url))
+    SyncSession = sessionmaker(bind=create_engine(url), expire_on_commit=False)
+    AsyncSession = async_sessionmaker(create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://")))
+
+    with SyncSession() as db:
+        db.add(Product(name="Coffee Maker", price=79.99, stock=40))
+        db.commit()
+
+    index = CatalogIndex()
+    monkeypatch.setattr(catalog_module, "catalog_index", index)
+
+    async def load():
+        async with AsyncSession() as db:
+            await index.load(db)
+
+    asyncio.run(load())
+    assert index.resolve("coffee maker").stock == 40
+
+    with SyncSession() as db:
+        product = db.query(Product).first()
+        product.stock = 39
+        db.commit()
+    assert index.resolve("coffee maker").stock == 39
+
+    with SyncSession() as db:
+        product = db.query(Product).first()
+        product.price = 1.0
+        db.flush()
+        db.rollback()
+    assert index.resolve("coffee maker").price == 79.99
+
+    async def refresh():
+        async with AsyncSession() as db:
+            return await index.refresh(db)
+
+    assert asyncio.run(refresh()) == 0
+
+
+def test_refresh_catches_rows_committed_behind_local_changes(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'catalog.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    SyncSession = sessionmaker(bind=engine)
+    AsyncSession = async_sessionmaker(create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://")))
+    loaded_at = datetime(2025, 1, 1)
+
+    with SyncSession() as db:
+        db.add(Product(id=1, name="Coffee Maker", price=79.99, stock=40, updated_at=loaded_at))
+        db.add(Product(id=2, name="Smart Watch", price=299.99, stock=15, updated_at=loaded_at))
+        db.commit()
+
+    index = CatalogIndex(overlap_seconds=5)
+    monkeypatch.setattr(catalog_module, "catalog_index", index)
+
+    async def load():
+        async with AsyncSession() as db:
+            await index.load(db)
+
+    async def refresh():
+        async with AsyncSession() as db:
+            return await index.refresh(db)
+
+    asyncio.run(load())
+
+    # A local commit reaches the index through the hooks...
+    with SyncSession() as db:
+        product = db.get(Product, 1)
+        product.stock = 39
+        product.updated_at = loaded_at + timedelta(seconds=10)
+        db.commit()
+    # ...while another process commits an earlier-stamped change the hooks never see
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id == 2)
+                     .values(stock=14, updated_at=loaded_at + timedelta(seconds=8)))
+
+    assert asyncio.run(refresh()) == 1
+    assert index.resolve("smart watch").stock == 14
+    assert index.resolve("coffee maker").stock == 39
+    # The overlap re-reads both rows next time, but neither has changed
+    assert asyncio.run(refresh()) == 0
+    assert index.stats()["watermark"] == (loaded_at + timedelta(seconds=10)).isoformat()
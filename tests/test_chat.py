@@ -2,7 +2,8 @@ from fastapi.testclient import TestClient
 from app.main import app
 import pytest
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.api.api_v1.endpoints import chat as chat_endpoints
 from app.db.base import Base, get_db
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -10,7 +11,8 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+TestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture
 def test_db():
@@ -19,19 +21,21 @@ def test_db():
     Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture
-def client(test_db):
-    def override_get_db():
-        try:
-            db = TestingSessionLocal()
+def client(test_db, monkeypatch):
+    async def override_get_db():
+        async with TestingSessionLocal() as db:
             yield db
-        finally:
-            db.close()
     
+    async def process_message(message, conversation_history, deadline=None):
+        return {"response": "Sure, what is your order number?", "action_needed": None, "action_data": None}
+    
+    monkeypatch.setattr(chat_endpoints.ai_service, "process_message", process_message)
     app.dependency_overrides[get_db] = override_get_db
-    return TestClient(app)
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
 
 def test_create_conversation(client):
-    response = client.post("/api/v1/chat/conversations/", json={"user_id": 1})
+    response = client.post("/api/v1/chat/conversations/", params={"user_id": 1})
     assert response.status_code == 200
     data = response.json()
     assert "id" in data
@@ -39,7 +43,7 @@ def test_create_conversation(client):
 
 def test_create_message(client):
     # First create a conversation
-    conv_response = client.post("/api/v1/chat/conversations/", json={"user_id": 1})
+    conv_response = client.post("/api/v1/chat/conversations/", params={"user_id": 1})
     conversation_id = conv_response.json()["id"]
     
     # Then create a message
@@ -48,14 +52,15 @@ def test_create_message(client):
         json={"content": "Hello, I need help with my order"}
     )
     assert response.status_code == 200
+    # The reply to the message is returned
     data = response.json()
-    assert data["content"] == "Hello, I need help with my order"
+    assert data["content"] == "Sure, what is your order number?"
     assert data["conversation_id"] == conversation_id
-    assert data["is_from_user"] == True
+    assert data["is_from_user"] == False
 
 def test_get_conversation_messages(client):
     # First create a conversation
-    conv_response = client.post("/api/v1/chat/conversations/", json={"user_id": 1})
+    conv_response = client.post("/api/v1/chat/conversations/", params={"user_id": 1})
     conversation_id = conv_response.json()["id"]
     
     # Create a message
@@ -68,5 +73,6 @@ def test_get_conversation_messages(client):
     response = client.get(f"/api/v1/chat/conversations/{conversation_id}/messages/")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) > 0
-    assert data[0]["content"] == "Hello, I need help with my order" 
\ No newline at end of file
+    assert len(data) == 2
+    assert data[0]["content"] == "Hello, I need help with my order"
+    assert data[0]["is_from_user"] == True
@@ -0,0 +1,53 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from app.db.models import Conversation, Message
+
+MESSAGE_COUNT = 25
+
+
+@pytest.fixture
+def client(client, seed):
+    start = datetime(2025, 1, 1)
+    # Pairs of messages share a timestamp so the id tie-breaker is exercised
+    seed(Conversation(id=1, user_id=1),
+         *(Message(conversation_id=1, content=f"message {n}", is_from_user=n % 2 == 0,
+                   created_at=start + timedelta(seconds=n // 2))
+           for n in range(MESSAGE_COUNT)))
+    return client
+
+
+def test_keyset_pages_cover_the_transcript_once(client):
+    contents = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["after"] = cursor
+        response = client.get("/api/v1/chat/conversations/1/messages/", params=params)
+        assert response.status_code == 200
+        contents += [message["content"] for message in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert contents == [f"message {n}" for n in range(MESSAGE_COUNT)]
+
+
+def test_ndjson_stream_returns_every_message_after_the_cursor(client):
+    first_page = client.get("/api/v1/chat/conversations/1/messages/", params={"limit": 5})
+    cursor = first_page.headers["X-Next-Cursor"]
+
+    response = client.get("/api/v1/chat/conversations/1/messages/", params={"after": cursor, "stream": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["content"] for line in lines] == [f"message {n}" for n in range(5, MESSAGE_COUNT)]
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/v1/chat/conversations/1/messages/", params={"after": "not-a-cursor"})
+    assert response.status_code == 400
@@ -6,8 +6,10 @@ from sqlalchemy.orm import Session
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, engine
 from app.db.models import User, Product, Order, OrderItem
+from app.db.query_counter import assert_max_queries
+from app.services.order_read_model import list_orders_sync
 from app.services.ai_service import AIService
 from app.core.security import verify_password
 
@@ -31,17 +33,17 @@ def test_database_retrieval():
         for product in products:
             print(f"Product: {product.name} - ${product.price} (Stock: {product.stock})")
 
-        # Test order retrieval with items
+        # Test order retrieval with items, loaded in a fixed number of queries
         print("\nTesting Order Retrieval:")
-        orders = db.query(Order).all()
+        with assert_max_queries(engine, 2):
+            orders = list_orders_sync(db, limit=None)
         for order in orders:
             print(f"\nOrder for user {order.user_id}:")
             print(f"Status: {order.status}")
             print(f"Total Amount: ${order.total_amount}")
             print("Order Items:")
             for item in order.items:
-                product = db.query(Product).filter(Product.id == item.product_id).first()
-                print(f"  - {product.name} x{item.quantity} @ ${item.price}")
+                print(f"  - {item.product_name} x{item.quantity} @ ${item.price}")
 
     finally:
         db.close()
@@ -0,0 +1,125 @@
+import asyncio
+import time
+import pytest
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.utils import gemini_utils
+from app.utils.deadlines import Hedger, LatencyWindow, deadline_in
+
+
+def primed_hedger(latency=0.01, samples=20):
+    window = LatencyWindow(min_samples=samples)
+    for _ in range(samples):
+        window.record(latency)
+    return Hedger(enabled=True, percentile=95, window=window)
+
+
+def scripted(delays):
+    """A call whose n-th attempt takes delays[n] seconds and returns n"""
+    started = []
+
+    async def call(queue_deadline):
+        attempt = len(started)
+        started.append(queue_deadline)
+        await asyncio.sleep(delays[attempt])
+        return attempt
+
+    return call, started
+
+
+def test_percentile_needs_enough_samples():
+    window = LatencyWindow(min_samples=3)
+    window.record(0.1)
+    window.record(0.3)
+    assert window.percentile(95) is None
+    window.record(0.2)
+    assert window.percentile(50) == 0.2
+    assert window.percentile(95) == 0.3
+
+
+def test_deadline_raises_timeout():
+    hedger = Hedger()
+    call, _ = scripted([1.0])
+
+    async def run():
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await hedger.run(call, deadline_in(0.05))
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < 0.5
+    assert hedger.stats()["timeouts"] == 1
+
+
+def test_slow_call_is_hedged_and_hedge_wins():
+    hedger = primed_hedger()
+    call, started = scripted([1.0, 0.01])
+
+    result = asyncio.run(hedger.run(call, deadline_in(2)))
+
+    assert result == 1
+    assert started[0] is None
+    assert started[1] is not None
+    stats = hedger.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_fast_call_is_not_hedged():
+    hedger = primed_hedger(latency=0.5)
+    call, started = scripted([0.01])
+
+    assert asyncio.run(hedger.run(call, deadline_in(2))) == 0
+    assert len(started) == 1
+    assert hedger.stats()["hedges"] == 0
+
+
+def test_failed_hedge_falls_back_to_first_call():
+    hedger = primed_hedger()
+    attempts = []
+
+    async def call(queue_deadline):
+        attempts.append(queue_deadline)
+        if len(attempts) == 2:
+            raise RuntimeError("shed")
+        await asyncio.sleep(0.05)
+        return "first"
+
+    assert asyncio.run(hedger.run(call, deadline_in(2))) == "first"
+    assert len(attempts) == 2
+
+
+def test_first_call_error_wins_over_a_failed_hedge():
+    hedger = primed_hedger()
+    attempts = []
+
+    async def call(queue_deadline):
+        attempts.append(queue_deadline)
+        if len(attempts) == 2:
+            raise RuntimeError("shed")
+        await asyncio.sleep(0.05)
+        raise ValueError("model error")
+
+    # The hedge fails first, but the first call's error is the one reported
+    with pytest.raises(ValueError):
+        asyncio.run(hedger.run(call, deadline_in(2)))
+    assert len(attempts) == 2
+
+
+def test_process_message_falls_back_at_the_deadline(monkeypatch):
+    class StuckModel:
+        async def generate_content_async(self, prompt, **kwargs):
+            await asyncio.sleep(5)
+
+    monkeypatch.setattr(gemini_utils, "get_gemini_model", lambda model_name="gemini-2.0-flash", system_instruction=None: StuckModel())
+    monkeypatch.setattr(gemini_utils, "gemini_hedger", Hedger())
+    monkeypatch.setattr(ai_service_module.settings, "RESPONSE_CACHE_ENABLED", False)
+
+    async def run():
+        start = time.perf_counter()
+        response = await AIService().process_message("How long does shipping take?", [], deadline_in(0.05))
+        return response, time.perf_counter() - start
+
+    response, elapsed = asyncio.run(run())
+    assert response == AIService()._fallback_response()
+    assert elapsed < 1
@@ -0,0 +1,129 @@
+import asyncio
+import time
+import pytest
+from app.utils import gemini_utils
+from app.utils.adaptive_limiter import AdaptiveLimiter
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return FakeResponse('{"response": "ok", "action_needed": null, "action_data": null}')
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(gemini_utils, "configure_gemini", lambda: None)
+    monkeypatch.setattr(gemini_utils, "get_gemini_model", lambda model_name="gemini-2.0-flash", system_instruction=None: model)
+    return model
+
+
+def test_async_generation_does_not_block_event_loop(fake_model):
+    async def run():
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            gemini_utils.generate_structured_response_async("hello") for _ in range(20)
+        ])
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    assert all(result["response"] == "ok" for result in results)
+    assert fake_model.max_in_flight == 20
+    assert elapsed < 20 * fake_model.delay / 2
+
+
+def test_async_generation_respects_concurrency_cap(fake_model, monkeypatch):
+    monkeypatch.setattr(gemini_utils, "gemini_limiter", AdaptiveLimiter(initial_limit=3, max_limit=3))
+
+    async def run():
+        await asyncio.gather(*[
+            gemini_utils.generate_structured_response_async("hello") for _ in range(10)
+        ])
+
+    asyncio.run(run())
+    assert fake_model.max_in_flight == 3
+
+
+def test_model_registry_reuses_configured_models(monkeypatch):
+    configure_calls = []
+    monkeypatch.setattr(gemini_utils, "configure_gemini", lambda: configure_calls.append(1))
+    monkeypatch.setattr(gemini_utils.genai, "GenerativeModel", lambda name, generation_config=None: FakeModel())
+    registry = gemini_utils.GeminiModelRegistry()
+
+    first = registry.get_model("gemini-2.0-flash")
+    second = registry.get_model("gemini-2.0-flash")
+    other = registry.get_model("gemini-2.0-flash", {"temperature": 0.2})
+
+    assert first is second
+    assert other is not first
+    assert len(configure_calls) == 1
+    stats = registry.stats()
+    assert stats["models_created"] == 2
+    assert stats["model_reuses"] == 1
+
+
+def test_warm_up_gives_up_after_the_timeout(monkeypatch):
+    class HangingModel:
+        async def count_tokens_async(self, contents):
+            await asyncio.sleep(10)
+
+    monkeypatch.setattr(gemini_utils, "configure_gemini", lambda: None)
+    monkeypatch.setattr(gemini_utils.genai, "GenerativeModel", lambda name, **kwargs: HangingModel())
+    registry = gemini_utils.GeminiModelRegistry()
+
+    start = time.perf_counter()
+    assert asyncio.run(registry.warm_up(timeout=0.05)) is False
+    assert time.perf_counter() - start < 1
+    assert registry.stats()["warmup_failures"] == 1
+
+
+class FakeUsage:
+    def __init__(self, prompt, cached, output):
+        self.prompt_token_count = prompt
+        self.cached_content_token_count = cached
+        self.candidates_token_count = output
+
+
+def test_system_instruction_is_sent_separately_and_usage_recorded(monkeypatch):
+    sent = {}
+
+    class UsageModel(FakeModel):
+        async def generate_content_async(self, prompt, **kwargs):
+            sent["prompt"] = prompt
+            response = FakeResponse('{"response": "ok", "action_needed": null, "action_data": null}')
+            response.usage_metadata = FakeUsage(120, 0, 30)
+            return response
+
+    def get_model(model_name="gemini-2.0-flash", system_instruction=None):
+        sent["system_instruction"] = system_instruction
+        return UsageModel()
+
+    usage = gemini_utils.TokenUsage()
+    monkeypatch.setattr(gemini_utils, "get_gemini_model", get_model)
+    monkeypatch.setattr(gemini_utils, "token_usage", usage)
+
+    result = asyncio.run(gemini_utils.generate_structured_response_async(
+        "Customer message: hi", system_instruction="Be helpful."
+    ))
+
+    assert result["response"] == "ok"
+    assert sent == {"prompt": "Customer message: hi", "system_instruction": "Be helpful."}
+    stats = usage.stats()
+    assert stats["calls"] == 1
+    assert stats["prompt_tokens_total"] == 120
+    assert stats["output_tokens_total"] == 30
+    assert stats["last"] == {"prompt_tokens": 120, "cached_tokens": 0, "output_tokens": 30}
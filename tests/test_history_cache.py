@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db.models import Conversation, Message
+from app.db.query_counter import count_queries
+from app.services.history_cache import ConversationHistoryCache
+
+
+@pytest.fixture
+def async_engine(async_engine, seed):
+    for conversation_id in (1, 2):
+        seed(Conversation(id=conversation_id, user_id=1),
+             *(Message(conversation_id=conversation_id, content=f"message {n}", is_from_user=n % 2 == 0)
+               for n in range(6)))
+    return async_engine
+
+
+def test_window_is_hydrated_once_then_served_from_memory(async_engine):
+    cache = ConversationHistoryCache(window=4)
+    Session = async_sessionmaker(async_engine)
+
+    async def run():
+        async with Session() as db:
+            with count_queries(async_engine) as counter:
+                first = await cache.get_window(db, 1)
+                cache.append(1, "message 6", True)
+                second = await cache.get_window(db, 1)
+            return first, second, counter.count
+
+    first, second, queries = asyncio.run(run())
+    assert [turn["content"] for turn in first] == ["message 2", "message 3", "message 4", "message 5"]
+    assert [turn["content"] for turn in second] == ["message 3", "message 4", "message 5", "message 6"]
+    assert second[-1]["is_from_user"] is True
+    assert queries == 1
+    assert cache.stats()["hydrations"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_conversation_is_evicted(async_engine):
+    cache = ConversationHistoryCache(max_conversations=1, window=4)
+    Session = async_sessionmaker(async_engine)
+
+    async def run():
+        async with Session() as db:
+            await cache.get_window(db, 1)
+            await cache.get_window(db, 2)
+
+    asyncio.run(run())
+    assert not cache.contains(1)
+    assert cache.contains(2)
+    assert cache.stats()["evictions"] == 1
+
+    cache.append(1, "dropped", True)
+    assert cache.stats()["appends"] == 0
@@ -0,0 +1,91 @@
+import pytest
+from app.services.intent_router import IntentRouter, KeywordAutomaton
+
+PRODUCTS = ["Smartphone X", "Laptop Pro", "Wireless Headphones", "Smart Watch", "Coffee Maker"]
+
+
+@pytest.fixture
+def router():
+    router = IntentRouter()
+    router.load_products(PRODUCTS)
+    return router
+
+
+def test_keyword_automaton_matches_whole_words_longest_first():
+    automaton = KeywordAutomaton([("smart", "Smart"), ("smart watch", "Smart Watch"), ("watch", "Watch")])
+    assert [value for _, _, value in automaton.find_all("is the smart watch waterproof")] == ["Smart Watch"]
+    assert automaton.find_all("smartwatches") == []
+
+
+@pytest.mark.parametrize("message, order_number", [
+    ("cancel order AB12CD34", "AB12CD34"),
+    ("Please cancel my order #ab12cd34.", "AB12CD34"),
+    ("cancel order 10000A2F7", "10000A2F7"),
+])
+def test_cancel_with_order_number_is_routed(router, message, order_number):
+    response = router.route(message)
+    assert response["action_needed"] == "Cancel order"
+    assert response["action_data"] == {"order_number": order_number}
+
+
+@pytest.mark.parametrize("message", [
+    "I want to cancel my order",
+    "don't cancel order AB12CD34",
+    "cancel order AB12CD34 or XY98ZW76",
+])
+def test_ambiguous_cancellations_fall_back(router, message):
+    assert router.route(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "How do I cancel order AB12CD34?",
+    "What happens if I cancel order AB12CD34?",
+    "Can I cancel order AB12CD34 and get a refund?",
+    "can i cancel order AB12CD34",
+    "cancel order AB12CD34 if it hasn't shipped yet",
+    "Should I cancel order AB12CD34",
+])
+def test_questions_about_cancelling_are_not_executed(router, message):
+    assert router.route(message) is None
+
+
+@pytest.mark.parametrize("message", ["Where is my order?", "where's my package", "What's the status of my order"])
+def test_order_status_is_routed(router, message):
+    assert router.route(message)["action_needed"] == "Check order status"
+
+
+@pytest.mark.parametrize("message", [
+    "Tell me about the Smartphone X",
+    "how much is the laptop pro?",
+    "Coffee Maker",
+    "is the Smart Watch in stock",
+    "Wireless Headphones price",
+])
+def test_product_lookup_is_routed(router, message):
+    response = router.route(message)
+    assert response["action_needed"] == "Look up product information"
+    assert response["action_data"]["product"] in PRODUCTS
+
+
+@pytest.mark.parametrize("message", [
+    "I want to buy a Smartphone X",
+    "Is the Laptop Pro better than the Smartphone X?",
+    "What is your return policy?",
+    "I dont want the Laptop Pro, what is the price of shipping",
+    "my Coffee Maker broke, how much is a repair",
+    "I already have a Smart Watch, tell me about your warranty",
+])
+def test_uncertain_messages_fall_back(router, message):
+    assert router.route(message) is None
+
+
+def test_stats_report_short_circuits_and_savings(router):
+    router.record_llm_latency(1.5)
+    router.route("where is my order")
+    router.route("hello there")
+
+    stats = router.stats()
+    assert stats["routed"] == 1
+    assert stats["fallbacks"] == 1
+    assert stats["by_intent"] == {"Check order status": 1}
+    assert 1.4 < stats["estimated_seconds_saved"] <= 1.5
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db.models import Order, OrderItem, Product
+from app.api.chat import execute_action
+from app.services.catalog_index import ProductRecord, catalog_index
+from app.services.inventory import InventoryService, parse_quantity
+
+
+@pytest.fixture
+def async_engine(async_engine, seed):
+    seed(
+        Product(id=1, name="Hot Item", price=20.0, stock=5),
+        Product(id=2, name="Other Item", price=5.0, stock=0),
+        Order(id=1, order_number="ORDER001", status="Pending", total_amount=25.0),
+        OrderItem(order_id=1, product_id=1, quantity=1, price=20.0),
+        OrderItem(order_id=1, product_id=2, quantity=1, price=5.0),
+    )
+    return async_engine
+
+
+async def _stock(Session, product_id):
+    async with Session() as db:
+        return (await db.execute(select(Product.stock).filter(Product.id == product_id))).scalar_one()
+
+
+def test_concurrent_reservations_never_oversell(async_engine):
+    inventory = InventoryService()
+    Session = async_sessionmaker(async_engine)
+
+    async def buy():
+        async with Session() as db:
+            reservation = await inventory.reserve(db, 1, 1)
+            await db.commit()
+            return reservation
+
+    async def run():
+        results = await asyncio.gather(*(buy() for _ in range(20)))
+        return results, await _stock(Session, 1)
+
+    results, stock = asyncio.run(run())
+    successful = [reservation for reservation in results if reservation is not None]
+    assert len(successful) == 5
+    assert sorted(reservation.remaining for reservation in successful) == [0, 1, 2, 3, 4]
+    assert stock == 0
+    assert inventory.stats() == {"reserved": 5, "rejected": 15, "released": 0}
+
+
+def test_rolled_back_reservation_restores_stock(async_engine):
+    inventory = InventoryService()
+    Session = async_sessionmaker(async_engine)
+
+    async def run():
+        async with Session() as db:
+            assert (await inventory.reserve(db, 1, 3)).price == 20.0
+            await db.rollback()
+        return await _stock(Session, 1)
+
+    assert asyncio.run(run()) == 5
+
+
+def test_cancel_order_releases_items_once(async_engine):
+    inventory = InventoryService()
+    Session = async_sessionmaker(async_engine)
+
+    async def run():
+        async with Session() as db:
+            first = await inventory.cancel_order(db, 1)
+            second = await inventory.cancel_order(db, 1)
+            await db.commit()
+        return first, second, await _stock(Session, 1), await _stock(Session, 2)
+
+    assert asyncio.run(run()) == (True, False, 6, 1)
+
+
+def test_only_the_owner_can_cancel_an_order(async_engine):
+    Session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def status():
+        async with Session() as db:
+            return (await db.execute(select(Order.status).filter(Order.id == 2))).scalar_one()
+
+    async def cancel(user_id):
+        response = {"response": "", "action_needed": "Cancel order", "action_data": {"order_number": "ORDER002"}}
+        async with Session() as db:
+            await execute_action(response, db, user_id=user_id)
+        return response["response"]
+
+    async def run():
+        async with Session() as db:
+            db.add(Order(id=2, user_id=1, order_number="ORDER002", status="Pending", total_amount=20.0))
+            db.add(OrderItem(order_id=2, product_id=1, quantity=1, price=20.0))
+            await db.commit()
+            # The conditional update itself refuses another user's order
+            assert not await InventoryService().cancel_order(db, 2, user_id=2)
+            await db.rollback()
+
+        # To another customer the order doesn't exist
+        assert "couldn't find" in await cancel(user_id=2)
+        assert await status() == "Pending"
+        assert "cancelled successfully" in await cancel(user_id=1)
+        assert await status() == "Cancelled"
+
+    asyncio.run(run())
+
+
+def test_parse_quantity():
+    assert parse_quantity(2) == 2
+    assert parse_quantity("3") == 3
+    assert parse_quantity(2.0) == 2
+    for value in (0, -1, 1.5, "two", None, True):
+        assert parse_quantity(value) is None
+
+
+def test_orders_are_priced_from_the_reservation(async_engine):
+    Session = async_sessionmaker(async_engine, expire_on_commit=False)
+    # The index still has the price from before a price rise
+    catalog_index.upsert(ProductRecord(id=1, name="Hot Item", description=None, price=20.0, stock=5,
+                                       category=None, updated_at=datetime(2025, 1, 1)))
+    loaded = catalog_index.loaded
+    catalog_index.loaded = True
+
+    async def place(payment_method):
+        response = {"response": "", "action_needed": "Place order",
+                    "action_data": {"product": "Hot Item", "quantity": 2, "shipping_address": "1 Main St",
+                                    "payment_method": payment_method}}
+        async with Session() as db:
+            query = await execute_action(response, db)
+        return response["response"], query
+
+    async def run():
+        async with Session() as db:
+            await db.execute(update(Product).where(Product.id == 1).values(price=60.0))
+            await db.commit()
+
+        # $120 at the current price is over the cash on delivery limit, and nothing stays reserved
+        response, query = await place("Cash on Delivery")
+        assert "only available for orders under $100" in response and "$120.00" in response
+        assert query is None
+        assert await _stock(Session, 1) == 5
+
+        response, query = await place("Credit Card")
+        assert query["result"]["total_amount"] == 120.0
+        async with Session() as db:
+            order = await db.get(Order, query["result"]["order_id"])
+            assert order.total_amount == 120.0
+        assert await _stock(Session, 1) == 3
+
+    try:
+        asyncio.run(run())
+    finally:
+        catalog_index.remove(1)
+        catalog_index.loaded = loaded
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import pytest
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.utils.json_stream import IncrementalFieldExtractor
+
+REPLY = {
+    "action_needed": "Look up product information",
+    "response": "The \"Smartphone X\" costs $999.99 — great value! \U0001F4F1\nAnything else?",
+    "action_data": {"product": "Smartphone X", "response": "nested field is ignored"},
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64])
+def test_extractor_streams_response_field_across_chunk_boundaries(chunk_size):
+    text = "```json\n" + json.dumps(REPLY) + "\n```"
+    extractor = IncrementalFieldExtractor("response")
+
+    streamed = "".join(
+        extractor.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)
+    )
+
+    assert streamed == REPLY["response"]
+    assert extractor.complete
+    assert json.loads(extractor.raw) == REPLY
+
+
+def test_extractor_emits_text_before_object_closes():
+    extractor = IncrementalFieldExtractor("response")
+    assert extractor.feed('{"response": "Hel') == "Hel"
+    assert extractor.feed('lo", "action_needed": nu') == "lo"
+    assert not extractor.complete
+    assert extractor.feed("ll}") == ""
+    assert extractor.complete
+
+
+def test_stream_message_yields_deltas_then_final(monkeypatch):
+    text = json.dumps(REPLY)
+
+    async def fake_stream(prompt, conversation_history=None, model_name=None, system_instruction=None, deadline=None):
+        for i in range(0, len(text), 7):
+            yield text[i:i + 7]
+
+    monkeypatch.setattr(ai_service_module, "stream_structured_response_async", fake_stream)
+    monkeypatch.setattr(ai_service_module.settings, "RESPONSE_CACHE_ENABLED", False)
+
+    async def collect():
+        return [event async for event in AIService().stream_message("smartphone x?", [])]
+
+    events = asyncio.run(collect())
+    deltas = [payload for event, payload in events if event == "delta"]
+    assert len(deltas) > 1
+    assert "".join(deltas) == REPLY["response"]
+    assert events[-1] == ("final", REPLY)
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from app.db.base import Base
+from app.services import ai_service as ai_service_module
+from load_test import LatencyDistribution, StubLLM, compare, percentile, run_load_test
+from seed_database import bulk_seed
+
+
+def test_latency_specs():
+    assert LatencyDistribution("fixed:250").sample() == 0.25
+    samples = [LatencyDistribution("uniform:100:200", seed_value=1).sample() for _ in range(20)]
+    assert all(0.1 <= sample <= 0.2 for sample in samples)
+    assert LatencyDistribution("normal:0:1000").sample() >= 0
+    for spec in ("gamma:1:2", "fixed", "uniform:1"):
+        with pytest.raises(ValueError):
+            LatencyDistribution(spec)
+
+
+def test_stub_picks_canned_payload_by_customer_message():
+    stub = StubLLM(LatencyDistribution("fixed:0"))
+    prompt = "You can't place order here.\n\nCustomer message: Where is my order?"
+    assert stub.respond(prompt)["action_needed"] == "Check order status"
+    assert stub.respond("Customer message: hi")["action_needed"] is None
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def test_run_reports_every_endpoint(tmp_path):
+    url = f"sqlite:///{tmp_path / 'loadtest.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    bulk_seed(engine, 50, quiet=True)
+    engine.dispose()
+    original = ai_service_module.generate_structured_response_async
+
+    async def run():
+        async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+        try:
+            return await run_load_test(async_engine, "fixed:0", requests=6, concurrency=2, load_catalog=False)
+        finally:
+            await async_engine.dispose()
+
+    results = asyncio.run(run())
+    assert ai_service_module.generate_structured_response_async is original
+    assert len(results["endpoints"]) == 5
+    for result in results["endpoints"].values():
+        assert result["requests"] == 6
+        assert result["errors"] == 0
+        assert result["db_queries_per_request"] > 0
+    assert results["endpoints"]["GET /api/v1/chat/conversations/{id}/messages/"]["db_queries_per_request"] == 1.0
+    assert all("(+0.0%)" in line for line in compare(results, results))
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.db.base import Base
+from app.db.models import IdAllocation
+from app.services.intent_router import ORDER_NUMBER_RE
+from app.services.order_numbers import (
+    FIRST_VALUE,
+    SEQUENCE_LENGTH,
+    OrderNumberAllocator,
+    check_digit,
+    encode_base36,
+    format_order_number,
+)
+
+
+@pytest.fixture
+def url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'order_numbers.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+def test_format_is_fixed_width_sortable_and_checked():
+    first, second, later = (format_order_number(value) for value in (FIRST_VALUE, FIRST_VALUE + 1, FIRST_VALUE + 36 ** 3))
+    assert first == "100000001"
+    assert len(first) == len(second) == len(later) == 9
+    assert first < second < later
+    assert check_digit(later[:-1]) == later[-1]
+    assert ORDER_NUMBER_RE.findall(f"cancel order {later}") == [later]
+
+
+def test_allocated_numbers_carry_a_random_suffix(url):
+    engine = create_engine(url)
+    allocator = OrderNumberAllocator(block_size=10)
+    numbers = [allocator.next_sync(engine) for _ in range(10)]
+    engine.dispose()
+
+    assert all(len(number) == 14 and check_digit(number[:-1]) == number[-1] for number in numbers)
+    assert all(ORDER_NUMBER_RE.findall(f"cancel order {number}") == [number] for number in numbers)
+    # Sequential prefixes, but the rest of a neighbour can't be derived from one number
+    assert numbers[0][:SEQUENCE_LENGTH] == encode_base36(FIRST_VALUE)
+    assert len({number[SEQUENCE_LENGTH:-1] for number in numbers}) > 1
+
+
+def test_workers_never_hand_out_the_same_number(url):
+    engine = create_engine(url)
+    workers = [OrderNumberAllocator(block_size=10) for _ in range(3)]
+    numbers = [worker.next_sync(engine) for _ in range(25) for worker in workers]
+
+    assert len(set(numbers)) == len(numbers)
+    # Each worker claimed three blocks of ten, one UPDATE per block
+    assert [worker.stats()["blocks_claimed"] for worker in workers] == [3, 3, 3]
+    with engine.connect() as conn:
+        assert conn.execute(select(IdAllocation.next_value)).scalar_one() == FIRST_VALUE + 90
+    engine.dispose()
+
+
+def test_async_allocation_claims_one_block_under_concurrency(url):
+    allocator = OrderNumberAllocator(block_size=100)
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+
+    async def run():
+        numbers = await asyncio.gather(*(allocator.next(async_engine) for _ in range(50)))
+        await async_engine.dispose()
+        return numbers
+
+    numbers = asyncio.run(run())
+    assert len(set(numbers)) == 50
+    assert [number[:SEQUENCE_LENGTH] for number in sorted(numbers)] == [encode_base36(FIRST_VALUE + n) for n in range(50)]
+    assert allocator.stats()["blocks_claimed"] == 1
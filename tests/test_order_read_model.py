@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app.db.models import Order, OrderItem, Product, User
+from app.db.query_counter import assert_max_queries, count_queries
+from app.services.order_read_model import get_order_by_number, list_orders, list_orders_sync
+
+
+@pytest.fixture(autouse=True)
+def orders(seed):
+    products = [Product(id=i, name=f"Product {i}", price=10.0 * i, stock=100) for i in range(1, 4)]
+    orders = [Order(id=n + 1, user_id=1, order_number=f"ORDER{n:03d}", status="Pending", total_amount=0)
+              for n in range(10)]
+    items = [OrderItem(order_id=n + 1, product_id=product.id, quantity=n + 1, price=product.price)
+             for n in range(10) for product in products]
+    seed(User(id=1, email="customer@example.com"), *products, *orders, *items)
+
+
+def test_list_orders_uses_a_fixed_number_of_queries(async_engine):
+    Session = async_sessionmaker(async_engine)
+
+    async def load():
+        async with Session() as db:
+            with assert_max_queries(async_engine, 2):
+                return await list_orders(db, limit=None)
+
+    orders = asyncio.run(load())
+    assert len(orders) == 10
+    assert all(len(order.items) == 3 for order in orders)
+    assert orders[0].items[0].product_name == "Product 1"
+
+
+def test_get_order_by_number_returns_projection(async_engine):
+    Session = async_sessionmaker(async_engine)
+
+    async def load():
+        async with Session() as db:
+            return await get_order_by_number(db, "ORDER004"), await get_order_by_number(db, "MISSING")
+
+    order, missing = asyncio.run(load())
+    assert missing is None
+    assert order.to_dict()["items"][2] == {"product_id": 3, "product_name": "Product 3", "quantity": 5, "price": 30.0}
+
+
+def test_assert_max_queries_catches_lazy_loading(sync_engine):
+    db = sessionmaker(bind=sync_engine)()
+    with pytest.raises(AssertionError, match="Expected at most 2 queries"):
+        with assert_max_queries(sync_engine, 2):
+            for order in db.query(Order).all():
+                for item in order.items:
+                    item.product.name
+
+    with count_queries(sync_engine) as counter:
+        list_orders_sync(db, limit=None)
+    assert counter.count == 2
+    db.close()
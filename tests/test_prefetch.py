@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Order, OrderItem, Product
+from app.services import prefetch as prefetch_module
+from app.services.intent_router import IntentRouter
+from app.services.prefetch import Prefetcher, plan_prefetch
+
+
+@pytest.fixture
+def async_engine(async_engine, seed):
+    seed(
+        Product(id=1, name="Smartphone X", price=999.99, stock=5),
+        Order(id=1, order_number="AB12CD34", status="Pending", total_amount=999.99),
+        OrderItem(order_id=1, product_id=1, quantity=1, price=999.99),
+    )
+    return async_engine
+
+
+@pytest.fixture
+def catalog_not_loaded(monkeypatch):
+    router = IntentRouter()
+    router.load_products(["Smartphone X", "Laptop Pro"])
+    monkeypatch.setattr(prefetch_module, "intent_router", router)
+    monkeypatch.setattr(prefetch_module.catalog_index, "loaded", False)
+
+
+def test_plan_guesses_reads_from_the_message(catalog_not_loaded):
+    status = plan_prefetch("Where is my order?")
+    assert status.latest_order and not status.order_numbers
+
+    cancel = plan_prefetch("Please cancel order #ab12cd34")
+    assert cancel.order_numbers == ("AB12CD34",)
+    assert not cancel.latest_order
+
+    product = plan_prefetch("How much is the smartphone x?")
+    assert product.products == ("Smartphone X",)
+
+    assert not plan_prefetch("What is your return policy?").keys()
+
+
+def test_prefetched_reads_skip_the_request_session(async_engine, catalog_not_loaded):
+    prefetcher = Prefetcher()
+
+    async def run():
+        reads = prefetcher.reads("where is my order? the smartphone x was for AB12CD34", async_engine)
+        assert reads.start()
+        # The handler's session is never touched for reads the prefetch covered
+        order = await reads.latest_order(None)
+        status = await reads.order_status(None, "AB12CD34")
+        product = await reads.product(None, "Smartphone X")
+        reads.close()
+        return order, status, product
+
+    order, status, product = asyncio.run(run())
+    assert order.order_number == "AB12CD34"
+    assert order.items[0].product_name == "Smartphone X"
+    assert tuple(status) == (1, "Pending")
+    assert product.stock == 5
+    stats = prefetcher.stats()
+    assert stats["hits"] == 3
+    assert stats["unused"] == 0
+
+
+def test_unplanned_reads_fall_back_to_the_request_session(async_engine, catalog_not_loaded):
+    prefetcher = Prefetcher()
+
+    async def run():
+        reads = prefetcher.reads("where is my order?", async_engine)
+        reads.start()
+        async with AsyncSession(async_engine) as db:
+            status = await reads.order_status(db, "AB12CD34")
+        reads.close()
+        for _ in range(100):
+            if prefetcher.stats()["unused"]:
+                break
+            await asyncio.sleep(0.01)
+        return status
+
+    assert tuple(asyncio.run(run())) == (1, "Pending")
+    stats = prefetcher.stats()
+    assert stats["misses"] == 1
+    # The latest order was fetched but the handler never asked for it
+    assert stats["unused"] == 1
+
+
+def test_disabled_prefetcher_starts_nothing(async_engine):
+    prefetcher = Prefetcher(enabled=False)
+
+    async def run():
+        reads = prefetcher.reads("where is my order?", async_engine)
+        started = reads.start()
+        reads.close()
+        return started
+
+    assert asyncio.run(run()) is False
+    assert prefetcher.stats()["started"] == 0
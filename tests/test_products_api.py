@@ -0,0 +1,100 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.db.models import Product
+from app.services.catalog_index import ProductRecord, catalog_index
+
+PRODUCT_COUNT = 12
+
+
+@pytest.fixture
+def client(client, seed):
+    seed(*(Product(name=f"Product {n}", price=10.0 + n, stock=5,
+                   category="Audio" if n % 3 == 0 else "Electronics",
+                   updated_at=datetime(2025, 1, 1))
+           for n in range(PRODUCT_COUNT)))
+    loaded = catalog_index.loaded
+    catalog_index.loaded = False
+    yield client
+    catalog_index.loaded = loaded
+
+
+def _all_pages(client, **params):
+    ids = []
+    cursor = None
+    while True:
+        query = {"limit": 5, **params}
+        if cursor:
+            query["after"] = cursor
+        response = client.get("/api/v1/products/", params=query)
+        assert response.status_code == 200
+        ids.extend(product["id"] for product in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+
+def test_keyset_pages_cover_the_catalog_once(client):
+    assert _all_pages(client) == list(range(1, PRODUCT_COUNT + 1))
+
+
+def test_category_filter(client):
+    ids = _all_pages(client, category="Audio")
+    assert ids == [n + 1 for n in range(PRODUCT_COUNT) if n % 3 == 0]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/api/v1/products/", params={"after": "not-a-cursor"}).status_code == 400
+
+
+def test_get_product_and_missing_product(client):
+    response = client.get("/api/v1/products/3")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Product 2"
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+    assert client.get("/api/v1/products/999").status_code == 404
+
+
+def test_if_none_match_returns_304(client):
+    first = client.get("/api/v1/products/3")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    revalidated = client.get("/api/v1/products/3", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+
+    page = client.get("/api/v1/products/", params={"limit": 5})
+    assert client.get("/api/v1/products/", params={"limit": 5},
+                      headers={"If-None-Match": f'"other", {page.headers["ETag"]}'}).status_code == 304
+
+
+def test_etag_changes_when_product_is_updated(client, sync_engine):
+    etag = client.get("/api/v1/products/3").headers["ETag"]
+    page_etag = client.get("/api/v1/products/", params={"limit": 5}).headers["ETag"]
+    with sync_engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id == 3)
+                     .values(stock=4, updated_at=datetime(2025, 1, 1) + timedelta(seconds=1)))
+
+    response = client.get("/api/v1/products/3", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["stock"] == 4
+    assert response.headers["ETag"] != etag
+    assert client.get("/api/v1/products/", params={"limit": 5},
+                      headers={"If-None-Match": page_etag}).status_code == 200
+
+
+def test_get_product_from_catalog_index(client):
+    etag = client.get("/api/v1/products/3").headers["ETag"]
+    # A different stock than the database row shows the index answered
+    catalog_index.upsert(ProductRecord(id=3, name="Product 2", description=None, price=12.0, stock=1,
+                                       category="Electronics", updated_at=datetime(2025, 1, 1)))
+    catalog_index.loaded = True
+    try:
+        response = client.get("/api/v1/products/3")
+        assert response.status_code == 200
+        assert response.json()["stock"] == 1
+        assert response.headers["ETag"] == etag
+    finally:
+        catalog_index.remove(3)
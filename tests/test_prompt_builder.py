@@ -0,0 +1,59 @@
+from app.utils.prompt_builder import PromptBuilder, compile_instruction, estimate_tokens
+
+
+def turn(content, from_user=True):
+    return {"content": content, "is_from_user": from_user}
+
+
+def test_compile_instruction_strips_indentation_and_blank_runs():
+    text = compile_instruction("""
+        Be helpful.
+        
+        
+        Be brief.
+    """, "  Reply in JSON.  ")
+    assert text == "Be helpful.\n\nBe brief.\n\nReply in JSON."
+
+
+def test_build_keeps_prefix_out_of_contents():
+    builder = PromptBuilder("Be helpful.", history_token_budget=100)
+    prompt = builder.build("where is my order?")
+
+    assert prompt.system_instruction == "Be helpful."
+    assert prompt.contents == "Customer message: where is my order?"
+    assert prompt.history_turns == 0
+    assert prompt.estimated_tokens == estimate_tokens("Be helpful.") + estimate_tokens(prompt.contents)
+
+
+def test_build_fills_budget_with_newest_turns():
+    history = [turn("a" * 40), turn("b" * 40, from_user=False), turn("c" * 40), turn("d" * 40, from_user=False)]
+    # Each turn costs about 13 tokens, so a 30 token budget fits the newest two
+    builder = PromptBuilder("Be helpful.", history_token_budget=30)
+    prompt = builder.build("thanks", history)
+
+    assert prompt.history_turns == 2
+    assert prompt.dropped_turns == 2
+    assert prompt.contents == (
+        "Current conversation context:\n"
+        f"Customer: {'c' * 40}\n"
+        f"Agent: {'d' * 40}\n\n"
+        "Customer message: thanks"
+    )
+
+
+def test_build_accepts_role_based_turns():
+    builder = PromptBuilder("Be helpful.")
+    prompt = builder.build("ok", [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+    assert "Customer: hi\nAgent: hello" in prompt.contents
+
+
+def test_stats_track_dropped_turns():
+    builder = PromptBuilder("Be helpful.", history_token_budget=0)
+    builder.build("hi", [turn("old")])
+    builder.build("hi")
+
+    stats = builder.stats()
+    assert stats["prompts"] == 2
+    assert stats["history_turns_dropped"] == 1
+    assert stats["history_turns_included"] == 0
+    assert stats["prefix_tokens"] == estimate_tokens("Be helpful.")
@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from app.db.base import Base
+from check_query_plans import check_query_plans
+from seed_database import bulk_seed
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    bulk_seed(engine, 300, quiet=True)
+    yield engine
+    engine.dispose()
+
+
+def test_hot_queries_use_indexes(engine):
+    assert check_query_plans(engine) == {}
+
+
+def test_missing_index_is_reported(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_messages_conversation_id_created_at_id"))
+
+    failures = check_query_plans(engine)
+    assert set(failures) == {"transcript page", "transcript page after cursor", "history window"}
+    assert failures["history window"] == ["SCAN messages"]
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from app.utils import gemini_utils
+from app.utils.replay_store import ReplayMissError, ReplayStore
+
+REPLY = '{"response": "recorded", "action_needed": null, "action_data": null}'
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        return FakeResponse(REPLY)
+
+
+def test_records_survive_reopen_and_duplicates_keep_the_first(tmp_path):
+    path = str(tmp_path / "replay.bin")
+    store = ReplayStore(path, mode="record")
+    assert store.put("model", "prompt one", "first")
+    assert store.put("model", "prompt two", "second ✓")
+    assert not store.put("model", "prompt one", "ignored")
+    assert store.get("model", "prompt one") == "first"
+    store.close()
+
+    reopened = ReplayStore(path, mode="replay")
+    assert len(reopened) == 2
+    assert reopened.get("model", "prompt two") == "second ✓"
+    assert reopened.get("other-model", "prompt two") is None
+    assert reopened.stats()["hits"] == 1
+    assert reopened.stats()["misses"] == 1
+    reopened.close()
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = tmp_path / "replay.bin"
+    store = ReplayStore(str(path), mode="record")
+    store.put("model", "kept", "ok")
+    store.close()
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 10)
+
+    reopened = ReplayStore(str(path), mode="record")
+    assert len(reopened) == 1
+    reopened.put("model", "after", "also ok")
+    reopened.close()
+    assert ReplayStore(str(path)).get("model", "after") == "also ok"
+
+
+def test_workers_recording_to_one_file_see_each_others_records(tmp_path):
+    path = str(tmp_path / "replay.bin")
+    first, second = ReplayStore(path, mode="record"), ReplayStore(path, mode="record")
+    assert first.put("model", "prompt one", "from the first worker")
+    assert second.put("model", "prompt two", "from the second worker")
+    # The second worker indexed the first one's record before appending
+    assert not second.put("model", "prompt one", "ignored")
+    assert first.put("model", "prompt three", "third")
+
+    assert first.get("model", "prompt two") == "from the second worker"
+    assert second.get("model", "prompt one") == "from the first worker"
+    assert second.get("model", "prompt three") == "third"
+    first.close()
+    second.close()
+
+    reopened = ReplayStore(path, mode="replay")
+    assert len(reopened) == 3
+    assert reopened.get("model", "prompt two") == "from the second worker"
+    reopened.close()
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ReplayStore(str(tmp_path / "replay.bin"), mode="sometimes")
+
+
+def test_record_then_replay_without_the_model(tmp_path, monkeypatch):
+    path = str(tmp_path / "replay.bin")
+    model = FakeModel()
+    monkeypatch.setattr(gemini_utils, "get_gemini_model", lambda model_name="gemini-2.0-flash", system_instruction=None: model)
+    monkeypatch.setattr(gemini_utils, "replay_store", ReplayStore(path, mode="record"))
+    history = [{"content": "hi", "is_from_user": True}]
+
+    recorded = asyncio.run(gemini_utils.generate_structured_response_async("hello", history))
+    gemini_utils.replay_store.close()
+    assert recorded["response"] == "recorded"
+    assert model.calls == 1
+
+    monkeypatch.setattr(gemini_utils, "replay_store", ReplayStore(path, mode="replay"))
+
+    async def replay():
+        response = await gemini_utils.generate_structured_response_async("hello", history)
+        chunks = [chunk async for chunk in gemini_utils.stream_structured_response_async("hello", history)]
+        return response, chunks
+
+    replayed, chunks = asyncio.run(replay())
+    assert replayed == recorded
+    assert chunks == [REPLY]
+    assert model.calls == 1
+
+    with pytest.raises(ReplayMissError):
+        asyncio.run(gemini_utils.generate_structured_response_async("never recorded"))
+    gemini_utils.replay_store.close()
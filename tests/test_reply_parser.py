@@ -0,0 +1,76 @@
+import json
+from google.generativeai.types import generation_types
+from app.schemas.agent import ActionType, AgentReply, response_schema
+from app.services.ai_service import SYSTEM_PROMPT
+from app.utils import gemini_utils
+from app.utils.gemini_utils import ReplyParser
+
+ORDER = {
+    "response": "Placing your order now.",
+    "action_needed": "Place order",
+    "action_data": {"product": "Smartphone X", "quantity": 2, "shipping_address": "1 Main St"},
+}
+
+
+def test_schema_reply_is_parsed_in_one_pass():
+    parser = ReplyParser()
+    reply = parser.parse(json.dumps(ORDER))
+
+    assert reply.action_needed is ActionType.PLACE_ORDER
+    assert reply.action_data.quantity == 2
+    # Unset fields are left out so handler defaults (e.g. payment method) still apply
+    assert reply.to_dict() == ORDER
+    assert parser.stats()["parsed"] == 1
+
+
+def test_fenced_reply_is_salvaged():
+    parser = ReplyParser()
+    reply = parser.parse("Sure!\n```json\n" + json.dumps(ORDER) + "\n```")
+
+    assert reply.to_dict() == ORDER
+    stats = parser.stats()
+    assert stats["salvaged"] == 1
+    assert stats["failure_rate"] == 0.0
+
+
+def test_unknown_action_is_dropped_and_counted():
+    parser = ReplyParser()
+    reply = parser.parse(json.dumps({"response": "Returns are free.", "action_needed": "Process returns", "action_data": {}}))
+
+    assert reply.response == "Returns are free."
+    assert reply.action_needed is None
+    assert parser.stats()["unknown_actions"] == 1
+
+
+def test_plain_text_reply_is_a_counted_failure():
+    parser = ReplyParser()
+    reply = parser.parse("Sorry, I can't help with that.")
+
+    assert reply.to_dict() == {"response": "Sorry, I can't help with that.", "action_needed": None, "action_data": None}
+    stats = parser.stats()
+    assert stats["failed"] == 1
+    assert stats["failure_rate"] == 1.0
+
+
+def test_non_numeric_quantity_is_kept_for_the_handler():
+    reply = AgentReply.model_validate_json(json.dumps({**ORDER, "action_data": {"product": "X", "quantity": "two"}}))
+    assert reply.action_data.quantity == "two"
+
+
+def test_response_schema_is_accepted_by_the_sdk(monkeypatch):
+    monkeypatch.setattr(gemini_utils.settings, "GEMINI_JSON_MODE", True)
+    config = generation_types.to_generation_config_dict(gemini_utils.structured_output_config())
+
+    action = config["response_schema"].properties["action_needed"]
+    assert list(action.enum) == [action_type.value for action_type in ActionType]
+    assert config["response_mime_type"] == "application/json"
+    assert response_schema()["required"] == ["response"]
+
+    monkeypatch.setattr(gemini_utils.settings, "GEMINI_JSON_MODE", False)
+    assert gemini_utils.structured_output_config() is None
+
+
+def test_system_prompt_only_offers_handled_actions():
+    listed = SYSTEM_PROMPT.split("Available actions:")[1].split("\n\n")[0]
+    actions = [line[2:] for line in listed.strip().splitlines()]
+    assert sorted(actions) == sorted(action.value for action in ActionType)
@@ -0,0 +1,72 @@
+import time
+from app.services.ai_service import AIService
+from app.utils.response_cache import ResponseCache, normalize_message
+
+
+def test_normalization_shares_keys_between_phrasings():
+    cache = ResponseCache()
+    assert normalize_message("  What is your RETURN policy?? ") == "what is your return policy"
+    assert cache.make_key("Do you ship internationally?") == cache.make_key("do you ship  internationally")
+
+
+def test_prompt_context_is_part_of_the_key():
+    cache = ResponseCache()
+    key = cache.make_key("where is my order", "gemini", "instruction", "Customer: Hi")
+    assert key == cache.make_key("Where is my order?", "gemini", "instruction", "Customer: Hi")
+    assert key != cache.make_key("where is my order", "gemini", "instruction", "Customer: Hello")
+    assert key != cache.make_key("where is my order", "other-model", "instruction", "Customer: Hi")
+
+
+def test_history_beyond_the_last_five_turns_is_part_of_the_key():
+    service = AIService()
+    recent = [{"content": f"turn {n}", "is_from_user": n % 2 == 0} for n in range(5)]
+    history = [{"content": "I ordered the Laptop Pro", "is_from_user": True}] + recent
+    other = [{"content": "I ordered the Coffee Maker", "is_from_user": True}] + recent
+
+    def key(history):
+        return service._cache_key("where is my order", service.prompt_builder.build("where is my order", history))
+
+    # Both older turns fit the token budget, so the prompts differ and so must the keys
+    assert key(history) != key(other)
+    assert key(history) == key(list(history))
+
+
+def test_hits_return_copies_and_count():
+    cache = ResponseCache()
+    key = cache.make_key("what is your return policy")
+    assert cache.get(key) is None
+    cache.set(key, {"response": "30 days", "action_needed": None, "action_data": None})
+
+    hit = cache.get(key)
+    hit["response"] = "rewritten by a handler"
+    assert cache.get(key)["response"] == "30 days"
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_state_changing_actions_are_not_cached():
+    cache = ResponseCache()
+    key = cache.make_key("cancel order AB12CD34")
+    stored = cache.set(key, {"response": "ok", "action_needed": "Cancel order", "action_data": {}})
+    assert not stored
+    assert cache.get(key) is None
+    assert cache.stats()["skipped"] == 1
+
+
+def test_lru_eviction_and_ttl_expiry():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0.05)
+    reply = {"response": "ok", "action_needed": None, "action_data": None}
+    cache.set(("a", ""), reply)
+    cache.set(("b", ""), reply)
+    cache.get(("a", ""))
+    cache.set(("c", ""), reply)
+
+    assert cache.get(("b", "")) is None
+    assert cache.get(("a", "")) is not None
+    assert cache.stats()["evictions"] == 1
+
+    time.sleep(0.06)
+    assert cache.get(("a", "")) is None
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,48 @@
+import pytest
+from datetime import timedelta
+from sqlalchemy import select
+from app.core.security import create_access_token, decode_access_token
+from app.db.models import Order
+from app.services.order_numbers import FIRST_VALUE, format_order_number
+
+ORDER_NUMBER = format_order_number(FIRST_VALUE, "Q7K2M")
+
+
+@pytest.fixture
+def client(client, seed):
+    seed(Order(id=1, user_id=1, order_number=ORDER_NUMBER, status="Pending", total_amount=20.0))
+    return client
+
+
+def _status(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(Order.status).filter(Order.id == 1)).scalar_one()
+
+
+def test_access_tokens_round_trip_and_expire():
+    assert decode_access_token(create_access_token(42)) == 42
+    with pytest.raises(ValueError):
+        decode_access_token(create_access_token(42, expires_delta=timedelta(seconds=-1)))
+    with pytest.raises(ValueError):
+        decode_access_token("not-a-token")
+
+
+def test_invalid_token_is_rejected(client):
+    response = client.post("/api/chat", json={"message": "hi", "conversation_history": []},
+                                headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+
+
+def test_user_id_comes_from_the_token_not_the_body(client, sync_engine):
+    message = {"message": f"cancel order {ORDER_NUMBER}", "conversation_history": [], "user_id": 1}
+
+    other = {"Authorization": f"Bearer {create_access_token(2)}"}
+    response = client.post("/api/chat", json=message, headers=other)
+    assert response.status_code == 200
+    assert "couldn't find" in response.json()["response"]
+    assert _status(sync_engine) == "Pending"
+
+    owner = {"Authorization": f"Bearer {create_access_token(1)}"}
+    response = client.post("/api/chat", json=message, headers=owner)
+    assert "cancelled successfully" in response.json()["response"]
+    assert _status(sync_engine) == "Cancelled"
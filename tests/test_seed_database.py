@@ -0,0 +1,45 @@
+import os
+import sys
+from sqlalchemy import create_engine, func, select
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from app.db.base import Base
+from app.db.models import IdAllocation, Order, OrderItem
+from app.services.order_numbers import FIRST_VALUE
+from seed_database import bulk_seed, scaled_counts
+
+
+def _seeded_engine(path, seed_value):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    written = bulk_seed(engine, 200, seed_value=seed_value, batch_size=64, quiet=True)
+    return engine, written
+
+
+def _orders(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(Order.user_id, Order.status, Order.total_amount).order_by(Order.id)).all()
+
+
+def test_bulk_seed_is_deterministic_and_consistent(tmp_path):
+    first, written = _seeded_engine(tmp_path / "first.db", 7)
+    second, _ = _seeded_engine(tmp_path / "second.db", 7)
+    other, _ = _seeded_engine(tmp_path / "other.db", 8)
+
+    assert written == scaled_counts(200)
+    assert _orders(first) == _orders(second)
+    assert _orders(first) != _orders(other)
+
+    with first.connect() as conn:
+        # Order totals agree with their items
+        totals = dict(conn.execute(
+            select(OrderItem.order_id, func.sum(OrderItem.price * OrderItem.quantity)).group_by(OrderItem.order_id)
+        ).all())
+        for order_id, total in conn.execute(select(Order.id, Order.total_amount)):
+            assert abs(totals[order_id] - total) < 0.01
+        # New orders get numbers past the generated ones
+        assert conn.execute(select(IdAllocation.next_value)).scalar_one() == FIRST_VALUE + written["orders"]
+
+    for engine in (first, second, other):
+        engine.dispose()
@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.utils.response_cache import ResponseCache, may_request_mutation
+from app.utils.single_flight import SingleFlight
+
+REPLY = {"response": "Shipping takes 3-5 days.", "action_needed": None, "action_data": None}
+ORDER_REPLY = {"response": "Order placed.", "action_needed": "Place order", "action_data": {"product_name": "X"}}
+
+
+def counting_call(reply, delay=0.05):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return dict(reply)
+
+    return fn, calls
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    fn, calls = counting_call(REPLY)
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", fn) for _ in range(10)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == REPLY for result in results)
+    results[0]["response"] = "rewritten by a handler"
+    assert results[1]["response"] == REPLY["response"]
+
+    stats = flight.stats()
+    assert stats["calls"] == 1
+    assert stats["merged"] == 9
+    assert stats["in_flight"] == 0
+
+
+def test_sequential_calls_are_not_merged():
+    flight = SingleFlight()
+    fn, calls = counting_call(REPLY, delay=0)
+
+    async def run():
+        await flight.do("key", fn)
+        await flight.do("key", fn)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_unshareable_results_are_recomputed_by_waiters():
+    flight = SingleFlight()
+    fn, calls = counting_call(ORDER_REPLY)
+
+    async def run():
+        return await asyncio.gather(*[
+            flight.do("key", fn, shareable=ResponseCache.is_cacheable) for _ in range(3)
+        ])
+
+    asyncio.run(run())
+    assert len(calls) == 3
+    assert flight.stats()["unshareable"] == 2
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("gemini unavailable")
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["errors"] == 1
+
+
+def test_order_requests_skip_coalescing():
+    assert may_request_mutation("I want to buy 2 Smartphone X")
+    assert may_request_mutation("please cancel order AB12CD34")
+    assert not may_request_mutation("Where is my order?")
+    assert not may_request_mutation("What is your return policy?")
+
+
+@pytest.fixture
+def service(monkeypatch):
+    calls = []
+
+    async def fake_generate(prompt, conversation_history=None, model_name=None, system_instruction=None, deadline=None):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return dict(REPLY)
+
+    monkeypatch.setattr(ai_service_module, "generate_structured_response_async", fake_generate)
+    monkeypatch.setattr(ai_service_module.settings, "RESPONSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai_service_module.settings, "SINGLE_FLIGHT_ENABLED", True)
+    svc = AIService()
+    svc.single_flight = SingleFlight()
+    return svc, calls
+
+
+def test_process_message_merges_identical_questions(service):
+    svc, calls = service
+
+    async def run():
+        return await asyncio.gather(
+            svc.process_message("How long does shipping take?", []),
+            svc.process_message("how long does shipping take", []),
+            svc.process_message("I want to buy 1 Smartphone X", []),
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert results[0] == results[1] == REPLY
+    assert svc.single_flight.stats()["merged"] == 1
+    assert svc.single_flight.stats()["bypassed"] == 1
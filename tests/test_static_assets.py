@@ -0,0 +1,160 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.datastructures import MutableHeaders
+from app.utils.compression import StreamingGZipMiddleware
+from app.utils.http_cache import add_vary
+from app.utils.static_files import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticFiles, accepted_encodings
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from build_static import build_static, fingerprint
+
+SCRIPT = b"function hello() { return 'hello'; }\n" * 50
+STYLES = b"body { margin: 0; padding: 0; }\n" * 50
+INDEX = """<html><head><link rel="stylesheet" href="/static/styles.css"></head>
+<body><script src="/static/script.js"></script></body></html>
+"""
+
+
+def _build(tmp_path):
+    source = tmp_path / "static"
+    source.mkdir()
+    (source / "script.js").write_bytes(SCRIPT)
+    (source / "styles.css").write_bytes(STYLES)
+    (source / "index.html").write_text(INDEX)
+    output = tmp_path / "build"
+    return build_static(str(source), str(output)), output
+
+
+def test_build_fingerprints_compresses_and_rewrites(tmp_path):
+    manifest, output = _build(tmp_path)
+    assert manifest == {"script.js": fingerprint("script.js", SCRIPT), "styles.css": fingerprint("styles.css", STYLES)}
+    assert json.loads((output / "manifest.json").read_text()) == manifest
+
+    built_script = output / manifest["script.js"]
+    assert built_script.read_bytes() == SCRIPT
+    assert gzip.decompress((output / (manifest["script.js"] + ".gz")).read_bytes()) == SCRIPT
+
+    index = (output / "index.html").read_text()
+    assert f'src="/static/{manifest["script.js"]}"' in index
+    assert f'href="/static/{manifest["styles.css"]}"' in index
+    assert "/static/script.js" not in index
+
+
+def test_rebuild_replaces_stale_fingerprints(tmp_path):
+    manifest, output = _build(tmp_path)
+    (tmp_path / "static" / "script.js").write_bytes(SCRIPT + b"// changed\n")
+    rebuilt = build_static(str(tmp_path / "static"), str(output))
+    assert rebuilt["script.js"] != manifest["script.js"]
+    assert not (output / manifest["script.js"]).exists()
+
+
+def test_serves_precompressed_variant_with_immutable_caching(tmp_path):
+    manifest, output = _build(tmp_path)
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(output)))
+    client = TestClient(app)
+
+    response = client.get(f"/static/{manifest['script.js']}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Type"].startswith("text/javascript")
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.content == SCRIPT
+
+    plain = client.get(f"/static/{manifest['script.js']}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.content == SCRIPT
+
+    index = client.get("/static/index.html", headers={"Accept-Encoding": "gzip"})
+    assert index.headers["Cache-Control"] == "no-cache"
+    revalidated = client.get("/static/index.html", headers={"Accept-Encoding": "gzip",
+                                                            "If-None-Match": index.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.parametrize("built", [True, False])
+def test_vary_lists_accept_encoding_once(tmp_path, built):
+    manifest, output = _build(tmp_path)
+    directory, name = (output, manifest["script.js"]) if built else (tmp_path / "static", "script.js")
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(directory)))
+    client = TestClient(StreamingGZipMiddleware(app, minimum_size=500))
+
+    for path in (f"/static/{name}", "/static/index.html"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        vary = response.headers.get_list("vary")
+        assert len(vary) == 1
+        assert [token.strip().lower() for token in vary[0].split(",")] == ["accept-encoding"]
+
+    # Precompressed with a build; compressed on the fly by the middleware without one
+    assert client.get(f"/static/{name}", headers={"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+
+
+def test_add_vary_merges_tokens():
+    headers = MutableHeaders(raw=[(b"vary", b"Origin"), (b"vary", b"accept-encoding")])
+    add_vary(headers, "Accept-Encoding", "Cookie")
+    assert headers.getlist("vary") == ["Origin, accept-encoding, Cookie"]
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip;q=0.5") == {"gzip"}
+    assert accepted_encodings("") == set()
+
+
+def _gzip_app():
+    app = FastAPI()
+
+    @app.get("/json")
+    async def big_json():
+        return {"items": ["product"] * 500}
+
+    @app.get("/stream")
+    async def stream():
+        async def frames():
+            for n in range(3):
+                yield json.dumps({"frame": n, "padding": "x" * 400}) + "\n"
+                await asyncio.sleep(0)
+        return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+    return StreamingGZipMiddleware(app, minimum_size=500, compresslevel=6)
+
+
+def test_json_responses_are_gzipped():
+    response = TestClient(_gzip_app()).get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == {"items": ["product"] * 500}
+
+
+def test_streamed_chunks_decode_as_they_arrive():
+    app = _gzip_app()
+    sent = []
+
+    async def receive():
+        # The client stays connected until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "root_path": "",
+             "scheme": "http", "query_string": b"", "headers": [(b"accept-encoding", b"gzip")],
+             "server": ("test", 80), "client": ("test", 1), "http_version": "1.1"}
+    asyncio.run(app(scope, receive, send))
+
+    bodies = [message["body"] for message in sent if message["type"] == "http.response.body"]
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # The first frame is complete without waiting for the rest of the stream
+    first = json.loads(decoder.decompress(bodies[0]).decode().splitlines()[0])
+    assert first["frame"] == 0